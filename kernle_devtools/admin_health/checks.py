@@ -0,0 +1,260 @@
+"""Concurrent structural checks with per-check timing.
+
+``run_structural_checks`` runs kernle's checks one after another and hands
+back only the combined findings. :func:`run_checks` runs each check as its
+own task on a thread pool, each worker with its own Kernle and therefore
+its own storage connections, and records how long each check took and how
+many records it read.
+
+For incremental sessions, :func:`affected_checks` works out which checks
+writes since an earlier session could have changed the verdict of; the
+rest can carry their findings over from that session's report.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from kernle.structural import (
+    StructuralFinding,
+    check_belief_contradictions,
+    check_low_confidence_beliefs,
+    check_orphaned_references,
+    check_stale_goals,
+    check_stale_relationships,
+)
+
+from kernle_devtools.dashboard.pool import ThreadLocalKernle
+from kernle_devtools.dashboard.queries import supports_keyset
+
+logger = logging.getLogger(__name__)
+
+# Check name (the findings' ``check``) -> function, in report order
+STRUCTURAL_CHECKS = {
+    "orphaned_reference": check_orphaned_references,
+    "low_confidence_belief": check_low_confidence_beliefs,
+    "stale_relationship": check_stale_relationships,
+    "belief_contradiction": check_belief_contradictions,
+    "stale_goal": check_stale_goals,
+}
+DEFAULT_JOBS = len(STRUCTURAL_CHECKS)
+
+# Storage reads whose returned records count as scanned
+SCAN_METHODS = ("get_episodes", "get_beliefs", "get_notes", "get_relationships", "get_goals")
+
+MEMORY_TABLES = (
+    "episodes",
+    "beliefs",
+    "notes",
+    "agent_values",
+    "goals",
+    "drives",
+    "relationships",
+    "raw_entries",
+)
+# Tables each check reads. Orphaned references also depend on whether the
+# memories they point at exist, which affected_checks() handles.
+CHECK_SOURCES = {
+    "orphaned_reference": ("episodes", "beliefs", "notes"),
+    "low_confidence_belief": ("beliefs",),
+    "stale_relationship": ("relationships",),
+    "belief_contradiction": ("beliefs",),
+    "stale_goal": ("goals",),
+}
+# Checks whose findings can change just because time passed. Low-confidence
+# findings say how long ago each belief was last verified.
+CLOCK_CHECKS = frozenset({"low_confidence_belief", "stale_relationship", "stale_goal"})
+
+
+@dataclass
+class CheckResult:
+    """The outcome of one structural check."""
+
+    check: str
+    findings: List[StructuralFinding] = field(default_factory=list)
+    seconds: float = 0.0
+    scanned: int = 0
+    error: Optional[str] = None
+    # Set when the findings are report dicts reused from an earlier report
+    carried: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "check": self.check,
+            "findings": len(self.findings),
+            "seconds": round(self.seconds, 4),
+            "scanned": self.scanned,
+            "error": self.error,
+            "carried": self.carried,
+        }
+
+
+@contextmanager
+def _counting_scans(k):
+    """Count records returned by ``k``'s storage list reads while active."""
+    storage = k._storage
+    own = vars(storage)
+    saved = {name: own[name] for name in SCAN_METHODS if name in own}
+    scanned = [0]
+
+    def counted(method):
+        def wrapper(*args, **kwargs):
+            result = method(*args, **kwargs)
+            try:
+                scanned[0] += len(result)
+            except TypeError:
+                pass
+            return result
+
+        return wrapper
+
+    for name in SCAN_METHODS:
+        method = getattr(storage, name, None)
+        if callable(method):
+            setattr(storage, name, counted(method))
+    try:
+        yield scanned
+    finally:
+        for name in SCAN_METHODS:
+            if name in saved:
+                setattr(storage, name, saved[name])
+            else:
+                own.pop(name, None)
+
+
+def run_check(k, name):
+    """Run the structural check ``name`` on ``k``, timing it.
+
+    A check that raises an ``Exception`` is reported with ``error`` set and
+    no findings rather than aborting the other checks; anything else, such
+    as a fleet timeout or ``KeyboardInterrupt``, propagates.
+    """
+    check = STRUCTURAL_CHECKS[name]
+    result = CheckResult(name)
+    start = time.perf_counter()
+    with _counting_scans(k) as scanned:
+        try:
+            result.findings = check(k)
+        except Exception as e:
+            logger.exception("Structural check %s failed", name)
+            result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - start
+    result.scanned = scanned[0]
+    return result
+
+
+def run_checks(k, jobs=DEFAULT_JOBS, checks=None, on_result=None):
+    """Run structural checks concurrently; return a :class:`CheckResult` per check.
+
+    Results come back in :data:`STRUCTURAL_CHECKS` order whatever order the
+    checks finish in. With one job, or a backend that can't be reopened per
+    thread (anything but SQLite), the checks run one at a time on ``k``.
+
+    Args:
+        k: Kernle instance.
+        jobs: Checks run at once, each on its own Kernle.
+        checks: Names of the checks to run (default: all).
+        on_result: Called in the calling thread with each result as soon
+            as its check finishes.
+    """
+    names = [name for name in STRUCTURAL_CHECKS if checks is None or name in checks]
+    jobs = max(1, min(jobs, len(names) or 1))
+    if jobs == 1 or not supports_keyset(k):
+        results = []
+        for name in names:
+            results.append(run_check(k, name))
+            if on_result is not None:
+                on_result(results[-1])
+        return results
+    handles = ThreadLocalKernle(k)
+    pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="doctor-check")
+
+    def run(name):
+        return run_check(handles.get(), name)
+
+    try:
+        futures = [pool.submit(run, name) for name in names]
+        for future in as_completed(futures):
+            if on_result is not None:
+                on_result(future.result())
+    except BaseException:
+        # Interrupted, e.g. by a fleet timeout: drop queued checks and let
+        # running ones finish on their own rather than waiting for them
+        pool.shutdown(wait=False, cancel_futures=True)
+        handles.close()
+        raise
+    pool.shutdown()
+    handles.close()
+    return [future.result() for future in futures]
+
+
+def findings_of(results):
+    """Flatten check results into one findings list, in check order."""
+    return [finding for result in results for finding in result.findings]
+
+
+def severity_counts(findings):
+    """Count report findings by severity in one pass; always has error, warning and info."""
+    counts = {"error": 0, "warning": 0, "info": 0}
+    for finding in findings:
+        severity = finding.get("severity")
+        counts[severity] = counts.get(severity, 0) + 1
+    return counts
+
+
+def failed_checks(checks):
+    """Names of the checks that failed, from :meth:`CheckResult.to_dict` records."""
+    return {check["check"] for check in checks if check.get("error")}
+
+
+def table_activity(k, since):
+    """Return ``{table: (written, deleted)}`` for writes to ``k``'s stack after ``since``.
+
+    ``since`` is an ISO timestamp, compared with each row's
+    ``local_updated_at``; deletes are soft, so they count as writes too.
+    Returns None for storage that can't be queried directly.
+    """
+    if not supports_keyset(k):
+        return None
+    storage = k._storage
+    activity = {}
+    with storage._connect() as conn:
+        for table in MEMORY_TABLES:
+            written, deleted = conn.execute(
+                f"SELECT COUNT(*) > 0, COALESCE(MAX(deleted), 0) FROM {table} "
+                "WHERE stack_id = ? AND local_updated_at > ?",
+                (storage.stack_id, since),
+            ).fetchone()
+            activity[table] = (bool(written), bool(deleted))
+    return activity
+
+
+def affected_checks(k, since, reported=()):
+    """Names of the checks whose findings may have changed since ``since``.
+
+    Args:
+        k: Kernle instance.
+        since: ISO timestamp the earlier findings were computed from.
+        reported: Checks that had findings in the earlier report.
+
+    Returns:
+        A set of check names, or None when changes can't be detected and
+        every check has to run.
+    """
+    activity = table_activity(k, since)
+    if activity is None:
+        return None
+    written = {table for table, (changed, _) in activity.items() if changed}
+    affected = set(CLOCK_CHECKS)
+    for name, tables in CHECK_SOURCES.items():
+        if written.intersection(tables):
+            affected.add(name)
+    # Deleting any memory can leave a reference dangling, and writing one
+    # (a sync, say) can restore the target of a reported orphan.
+    deleted = any(removed for _, removed in activity.values())
+    if deleted or (written and "orphaned_reference" in reported):
+        affected.add("orphaned_reference")
+    return affected
@@ -6,18 +6,36 @@ management with operator trust gating and privacy-preserving reports.
 """
 
 import json
+import logging
+import sys
 import uuid
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Callable, List, Optional
 
 try:
-    from kernle.structural import StructuralFinding, run_structural_checks
+    from kernle.structural import StructuralFinding
 except ImportError:
     raise ImportError(
         "kernle-devtools requires kernle>=0.12.4 (kernle.structural module). "
         "Please upgrade: pip install --upgrade kernle"
     )
 
+from kernle_devtools.admin_health.checks import (
+    DEFAULT_JOBS,
+    STRUCTURAL_CHECKS,
+    CheckResult,
+    affected_checks,
+    failed_checks,
+    run_checks,
+    severity_counts,
+)
+
+logger = logging.getLogger(__name__)
+
+# Stack setting holding the latest report's per-check results, as JSON
+CHECKS_SETTING = "doctor_last_checks"
+
 
 def _check_operator_consent(k, session_type: str) -> bool:
     """Check trust gate for operator-initiated sessions."""
@@ -60,9 +78,8 @@ def _recommendation_for(check: str) -> str:
 
 def _generate_summary(findings: List[dict]) -> str:
     """Generate a summary of diagnostic findings."""
-    errors = sum(1 for f in findings if f["severity"] == "error")
-    warnings = sum(1 for f in findings if f["severity"] == "warning")
-    infos = sum(1 for f in findings if f["severity"] == "info")
+    counts = severity_counts(findings)
+    errors, warnings, infos = counts["error"], counts["warning"], counts["info"]
     total = len(findings)
     if total == 0:
         return "No issues found. Memory graph is healthy."
@@ -76,34 +93,158 @@ def _generate_summary(findings: List[dict]) -> str:
     return f"Found {total} finding(s): {', '.join(parts)}"
 
 
-def cmd_doctor_session_start(args, k):
-    """Start a new diagnostic session."""
-    from kernle.storage.base import DiagnosticSession
+def _by_severity(findings: List[dict]) -> dict:
+    """Group findings by severity in one pass; always has error, warning and info."""
+    groups: dict = {"error": [], "warning": [], "info": []}
+    for f in findings:
+        groups.setdefault(f.get("severity"), []).append(f)
+    return groups
 
-    session_type = getattr(args, "type", "self_requested") or "self_requested"
-    access_level = getattr(args, "access", "structural") or "structural"
-    output_json = getattr(args, "json", False)
 
-    valid_types = {"self_requested", "routine", "anomaly_triggered", "operator_initiated"}
-    if session_type not in valid_types:
-        print(
-            f"Error: Invalid session type '{session_type}'. "
-            f"Must be one of: {', '.join(sorted(valid_types))}"
-        )
-        return
+def _output_format(args) -> str:
+    """The output format asked for: ``--format``, else ``json`` if ``--json`` was given."""
+    fmt = getattr(args, "format", None)
+    if fmt:
+        return fmt
+    return "json" if getattr(args, "json", False) else "text"
 
-    valid_levels = {"structural", "content", "full"}
-    if access_level not in valid_levels:
-        print(
-            f"Error: Invalid access level '{access_level}'. "
-            f"Must be one of: {', '.join(sorted(valid_levels))}"
-        )
-        return
 
-    if not _check_operator_consent(k, session_type):
-        print("Error: Insufficient trust for operator-initiated diagnostic session.")
-        print("The agent's trust assessment for 'stack-owner' must meet the diagnostic threshold.")
+def _write_ndjson(record: dict) -> None:
+    """Write ``record`` to stdout as one compact JSON line."""
+    sys.stdout.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+
+
+def _print_error(fmt: str, message: str, *details: str, prefix: str = "Error: ") -> None:
+    """Tell the user why a command stopped.
+
+    In ndjson mode this is one ``{"type": "error", "message": ...}`` record,
+    so consumers of the stream see every line as JSON; otherwise ``message``
+    (after ``prefix``) and each of ``details`` are printed as text lines.
+    """
+    if fmt == "ndjson":
+        _write_ndjson({"type": "error", "message": " ".join((message, *details))})
         return
+    print(f"{prefix}{message}")
+    for line in details:
+        print(line)
+
+
+def _report_findings(results) -> List[dict]:
+    """Report findings for check results, fresh or carried over, in check order."""
+    findings: List[dict] = []
+    for result in results:
+        if result.carried:
+            findings.extend(result.findings)
+        else:
+            findings.extend(_generate_report_findings(result.findings))
+    return findings
+
+
+def _save_check_results(k, report, results) -> None:
+    """Keep ``results`` as ``report``'s per-check results for the next incremental run."""
+    record = {"report_id": report.id, "checks": [result.to_dict() for result in results]}
+    k._storage.set_stack_setting(CHECKS_SETTING, json.dumps(record))
+
+
+def _load_check_results(k, report) -> Optional[List[dict]]:
+    """``report``'s per-check results, or None if they weren't kept."""
+    try:
+        record = json.loads(k._storage.get_stack_setting(CHECKS_SETTING) or "null")
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or record.get("report_id") != report.id:
+        return None
+    return record.get("checks")
+
+
+def _previous_run(k):
+    """Return ``(session, report)`` for the latest completed session with a report."""
+    for session in k._storage.get_diagnostic_sessions(status="completed", limit=5):
+        reports = k._storage.get_diagnostic_reports(session_id=session.id, limit=1)
+        if reports and session.started_at:
+            return session, reports[0]
+    return None, None
+
+
+def _run_incremental_checks(k, jobs, on_result=None):
+    """Re-run only the checks writes since the last completed session may affect.
+
+    The other checks carry their findings over from that session's report,
+    so the result is as complete as a full run. The previous session's
+    start, not its completion, bounds the changes, so writes made while it
+    was running are looked at again.
+
+    Returns:
+        ``(results, previous_session)``; ``previous_session`` is None when
+        there was nothing to build on and every check ran.
+    """
+    session, report = _previous_run(k)
+    if session is None:
+        return run_checks(k, jobs=jobs, on_result=on_result), None
+    previous = report.findings or []
+    started = session.started_at
+    if started.tzinfo is None:
+        started = started.replace(tzinfo=timezone.utc)
+    rerun = affected_checks(k, started.isoformat(), {f.get("category") for f in previous})
+    checks = _load_check_results(k, report)
+    if rerun is None or checks is None:
+        return run_checks(k, jobs=jobs, on_result=on_result), None
+    rerun |= failed_checks(checks)
+
+    fresh = run_checks(k, jobs=jobs, checks=rerun, on_result=on_result)
+    fresh = {result.check: result for result in fresh}
+    results = []
+    for name in STRUCTURAL_CHECKS:
+        result = fresh.get(name)
+        if result is None:
+            carried = [f for f in previous if f.get("category") == name]
+            result = CheckResult(name, findings=carried, carried=True)
+            if on_result is not None:
+                on_result(result)
+        results.append(result)
+    return results, session
+
+
+@dataclass
+class SessionRun:
+    """A completed diagnostic session and what it found."""
+
+    session: Any
+    report: Any
+    results: List[CheckResult]
+    findings: List[dict]
+    summary: str
+    # The session an incremental run built on, if any
+    previous: Optional[Any] = None
+
+
+def _cancel_session(k, session) -> None:
+    """Mark ``session`` cancelled, keeping whatever exception is in flight."""
+    session.status = "cancelled"
+    session.completed_at = datetime.now(timezone.utc)
+    try:
+        k._storage.save_diagnostic_session(session)
+    except Exception:
+        logger.warning("Could not cancel diagnostic session %s", session.id, exc_info=True)
+
+
+def run_session(
+    k,
+    session_type: str = "self_requested",
+    access_level: str = "structural",
+    jobs: int = DEFAULT_JOBS,
+    incremental: bool = False,
+    on_result: Optional[Callable[[CheckResult], None]] = None,
+) -> SessionRun:
+    """Run a diagnostic session and save its report.
+
+    Arguments are not validated and no consent gate is applied; callers
+    check both first, as :func:`cmd_doctor_session_start` does.
+    ``on_result`` is called with each check's result as it finishes,
+    before the report is saved. If the session doesn't get as far as its
+    report, it is saved as ``cancelled`` and the exception propagates.
+    """
+    from kernle.storage.base import DiagnosticReport, DiagnosticSession
 
     now = datetime.now(timezone.utc)
     session = DiagnosticSession(
@@ -117,24 +258,99 @@ def cmd_doctor_session_start(args, k):
     )
     k._storage.save_diagnostic_session(session)
 
-    findings_raw = run_structural_checks(k)
-    findings = _generate_report_findings(findings_raw)
-    summary = _generate_summary(findings)
+    try:
+        if incremental:
+            results, previous = _run_incremental_checks(k, jobs, on_result)
+        else:
+            results, previous = run_checks(k, jobs=jobs, on_result=on_result), None
+        findings = _report_findings(results)
+        summary = _generate_summary(findings)
+
+        report = DiagnosticReport(
+            id=str(uuid.uuid4()),
+            stack_id=k.stack_id,
+            session_id=session.id,
+            findings=findings,
+            summary=summary,
+            created_at=now,
+        )
+        k._storage.save_diagnostic_report(report)
+        _save_check_results(k, report, results)
+    except BaseException:
+        # Timed out, interrupted or failed: don't leave the session active
+        _cancel_session(k, session)
+        raise
+    k._storage.complete_diagnostic_session(session.id)
+    return SessionRun(session, report, results, findings, summary, previous)
 
-    from kernle.storage.base import DiagnosticReport
 
-    report = DiagnosticReport(
-        id=str(uuid.uuid4()),
-        stack_id=k.stack_id,
-        session_id=session.id,
-        findings=findings,
-        summary=summary,
-        created_at=now,
+def cmd_doctor_session_start(args, k):
+    """Start a new diagnostic session."""
+    session_type = getattr(args, "type", "self_requested") or "self_requested"
+    access_level = getattr(args, "access", "structural") or "structural"
+    fmt = _output_format(args)
+    jobs = getattr(args, "jobs", None) or DEFAULT_JOBS
+    incremental = getattr(args, "incremental", False)
+
+    valid_types = {"self_requested", "routine", "anomaly_triggered", "operator_initiated"}
+    if session_type not in valid_types:
+        _print_error(
+            fmt,
+            f"Invalid session type '{session_type}'. "
+            f"Must be one of: {', '.join(sorted(valid_types))}",
+        )
+        return
+
+    valid_levels = {"structural", "content", "full"}
+    if access_level not in valid_levels:
+        _print_error(
+            fmt,
+            f"Invalid access level '{access_level}'. "
+            f"Must be one of: {', '.join(sorted(valid_levels))}",
+        )
+        return
+
+    if not _check_operator_consent(k, session_type):
+        _print_error(
+            fmt,
+            "Insufficient trust for operator-initiated diagnostic session.",
+            "The agent's trust assessment for 'stack-owner' must meet the diagnostic threshold.",
+        )
+        return
+
+    on_result = None
+    counts = severity_counts(())
+    if fmt == "ndjson":
+        # Write each check's findings as soon as it finishes, counting as we go
+
+        def on_result(result):
+            for finding in _report_findings([result]):
+                counts[finding["severity"]] = counts.get(finding["severity"], 0) + 1
+                _write_ndjson({"type": "finding", **finding})
+            sys.stdout.flush()
+
+    run = run_session(
+        k, session_type, access_level, jobs=jobs, incremental=incremental, on_result=on_result
     )
-    k._storage.save_diagnostic_report(report)
-    k._storage.complete_diagnostic_session(session.id)
+    session, report, results, previous = run.session, run.report, run.results, run.previous
+    findings, summary = run.findings, run.summary
 
-    if output_json:
+    if fmt == "ndjson":
+        record = {
+            "type": "summary",
+            "session_id": session.id,
+            "report_id": report.id,
+            "session_type": session_type,
+            "access_level": access_level,
+            "summary": summary,
+            "total": sum(counts.values()),
+            "counts": counts,
+            "checks": [result.to_dict() for result in results],
+        }
+        if incremental:
+            record["previous_session_id"] = previous.id if previous else None
+        _write_ndjson(record)
+    elif fmt == "json":
         output = {
             "session_id": session.id,
             "report_id": report.id,
@@ -142,7 +358,10 @@ def cmd_doctor_session_start(args, k):
             "access_level": access_level,
             "summary": summary,
             "findings": findings,
+            "checks": [result.to_dict() for result in results],
         }
+        if incremental:
+            output["previous_session_id"] = previous.id if previous else None
         print(json.dumps(output, indent=2))
     else:
         print()
@@ -153,6 +372,10 @@ def cmd_doctor_session_start(args, k):
         print(f"  Session: {session.id[:12]}...")
         print(f"  Type: {session_type}")
         print(f"  Access: {access_level}")
+        if previous is not None:
+            rerun = sum(1 for result in results if not result.carried)
+            print(f"  Incremental: re-ran {rerun} of {len(results)} checks")
+            print(f"  since session {previous.id[:12]}...")
         print()
         print(f"  {summary}")
         print()
@@ -160,9 +383,8 @@ def cmd_doctor_session_start(args, k):
         if not findings:
             print("  All structural checks passed. Memory graph is healthy.")
         else:
-            errors = [f for f in findings if f["severity"] == "error"]
-            warnings = [f for f in findings if f["severity"] == "warning"]
-            infos = [f for f in findings if f["severity"] == "info"]
+            groups = _by_severity(findings)
+            errors, warnings, infos = groups["error"], groups["warning"], groups["info"]
 
             if errors:
                 print("-" * 55)
@@ -190,6 +412,19 @@ def cmd_doctor_session_start(args, k):
                     print(f"  [{f['severity']}]    {f['description']}")
                 print()
 
+        print("-" * 55)
+        print("CHECKS")
+        print("-" * 55)
+        for result in results:
+            status = "failed" if result.error else f"{len(result.findings)} finding(s)"
+            if result.carried:
+                status += ", carried over"
+            print(
+                f"  {result.check:22s} {result.seconds * 1e3:8.1f} ms  "
+                f"{result.scanned:7d} scanned  {status}"
+            )
+        print()
+
         print(f"  Report saved: {report.id[:12]}...")
         print()
 
@@ -239,13 +474,13 @@ def cmd_doctor_session_list(args, k):
 
 def cmd_doctor_report(args, k):
     """Show a diagnostic report."""
-    output_json = getattr(args, "json", False)
+    fmt = _output_format(args)
     session_id = getattr(args, "session_id", None)
 
     if session_id == "latest":
         reports = k._storage.get_diagnostic_reports(limit=1)
         if not reports:
-            print("No diagnostic reports found.")
+            _print_error(fmt, "No diagnostic reports found.", prefix="")
             return
         report = reports[0]
     else:
@@ -255,10 +490,26 @@ def cmd_doctor_report(args, k):
             if reports:
                 report = reports[0]
             else:
-                print(f"No report found for ID: {session_id}")
+                _print_error(fmt, f"No report found for ID: {session_id}", prefix="")
                 return
 
-    if output_json:
+    if fmt == "ndjson":
+        counts = severity_counts(())
+        for finding in report.findings or []:
+            counts[finding.get("severity")] = counts.get(finding.get("severity"), 0) + 1
+            _write_ndjson({"type": "finding", **finding})
+        _write_ndjson(
+            {
+                "type": "summary",
+                "id": report.id,
+                "session_id": report.session_id,
+                "summary": report.summary,
+                "total": sum(counts.values()),
+                "counts": counts,
+                "created_at": report.created_at.isoformat() if report.created_at else None,
+            }
+        )
+    elif fmt == "json":
         output = {
             "id": report.id,
             "session_id": report.session_id,
@@ -287,9 +538,8 @@ def cmd_doctor_report(args, k):
         if not findings:
             print("  No findings -- memory graph is healthy.")
         else:
-            errors = [f for f in findings if f.get("severity") == "error"]
-            warnings = [f for f in findings if f.get("severity") == "warning"]
-            infos = [f for f in findings if f.get("severity") == "info"]
+            groups = _by_severity(findings)
+            errors, warnings, infos = groups["error"], groups["warning"], groups["info"]
 
             if errors:
                 print("-" * 55)
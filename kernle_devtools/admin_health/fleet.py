@@ -0,0 +1,291 @@
+"""Diagnostic sessions across many stacks at once.
+
+:func:`run_fleet` runs a routine session for each stack on a process pool,
+so checks for different stacks use different cores rather than queueing
+behind the GIL. Each worker opens its own storage on the shared database,
+saves the stack's report as ``session start`` would, and hands back only
+the severity counts, which :func:`fleet_summary` ranks.
+"""
+
+import json
+import logging
+import os
+import signal
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from kernle_devtools.admin_health.checks import MEMORY_TABLES, severity_counts
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STACK_TIMEOUT = 300.0
+
+
+class StackTimeout(BaseException):
+    """A stack's session ran past its timeout.
+
+    A ``BaseException`` so the ``except Exception`` around each check
+    doesn't record it as that check's error and carry on.
+    """
+
+
+@dataclass
+class StackOutcome:
+    """What a fleet run found for one stack."""
+
+    stack_id: str
+    # "ok", "failed" or "timeout"
+    status: str = "ok"
+    errors: int = 0
+    warnings: int = 0
+    info: int = 0
+    seconds: float = 0.0
+    session_id: Optional[str] = None
+    report_id: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["seconds"] = round(self.seconds, 3)
+        return data
+
+
+def default_db_path() -> Path:
+    """The database ``Kernle(stack_id=...)`` opens when given no storage."""
+    from kernle.utils import get_kernle_home
+
+    return get_kernle_home() / "memories.db"
+
+
+def read_stack_ids(lines):
+    """Stack IDs from ``lines``, one per line; blanks and ``#`` comments are skipped.
+
+    Duplicates are dropped, keeping the first occurrence's position.
+    """
+    seen = {}
+    for line in lines:
+        stack_id = line.split("#", 1)[0].strip()
+        if stack_id:
+            seen.setdefault(stack_id, None)
+    return list(seen)
+
+
+def list_stacks(db_path):
+    """Every stack ID with memories in the database at ``db_path``, sorted."""
+    query = " UNION ".join(f"SELECT DISTINCT stack_id FROM {table}" for table in MEMORY_TABLES)
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return sorted(row[0] for row in conn.execute(query))
+    finally:
+        conn.close()
+
+
+def _raise_timeout(signum, frame):
+    raise StackTimeout()
+
+
+def doctor_stack(stack_id, db_path, jobs=1, incremental=False, timeout=None):
+    """Run a routine session for ``stack_id`` and save its report.
+
+    Runs in a pool worker, so it never raises: failures come back as the
+    outcome's ``status``. Where the platform has ``SIGALRM``, ``timeout``
+    interrupts the session; checks still running on other threads are left
+    to finish in the background. A check blocked inside a single SQLite call
+    on this thread is interrupted once that call returns.
+    """
+    from kernle import Kernle
+    from kernle.storage import SQLiteStorage
+
+    from kernle_devtools.admin_health.diagnostics import run_session
+
+    outcome = StackOutcome(stack_id)
+    start = time.monotonic()
+    alarm = bool(timeout) and hasattr(signal, "setitimer")
+    storage = None
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    try:
+        try:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            storage = SQLiteStorage(stack_id=stack_id, db_path=Path(db_path))
+            k = Kernle(stack_id=stack_id, storage=storage)
+            run = run_session(k, "routine", jobs=jobs, incremental=incremental)
+        finally:
+            # Disarm before anything else, so the alarm can't fire in the
+            # handlers below and escape the worker
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        outcome.session_id = run.session.id
+        outcome.report_id = run.report.id
+        counts = severity_counts(run.findings)
+        outcome.errors = counts["error"]
+        outcome.warnings = counts["warning"]
+        outcome.info = counts["info"]
+    except StackTimeout:
+        outcome.status = "timeout"
+        outcome.error = f"Timed out after {timeout:g}s"
+    except Exception as e:
+        logger.exception("Diagnostic session for %s failed", stack_id)
+        outcome.status = "failed"
+        outcome.error = f"{type(e).__name__}: {e}"
+    finally:
+        if alarm:
+            signal.signal(signal.SIGALRM, previous)
+        if storage is not None:
+            storage.close()
+    outcome.seconds = time.monotonic() - start
+    return outcome
+
+
+def run_fleet(
+    stack_ids,
+    db_path,
+    workers=None,
+    timeout=DEFAULT_STACK_TIMEOUT,
+    jobs=1,
+    incremental=False,
+    on_outcome=None,
+):
+    """Run a diagnostic session for every stack in ``stack_ids``.
+
+    Args:
+        stack_ids: Stacks to check.
+        db_path: Database the stacks live in.
+        workers: Stacks checked at once, each in its own process
+            (default: one per CPU).
+        timeout: Seconds each stack's session may take (None: no limit).
+        jobs: Structural checks run concurrently within each session.
+        incremental: Only re-run checks affected since each stack's last
+            completed session.
+        on_outcome: Called with each :class:`StackOutcome` as it finishes.
+
+    Returns:
+        A :class:`StackOutcome` per stack, in ``stack_ids`` order.
+    """
+    stack_ids = list(stack_ids)
+    if not stack_ids:
+        return []
+    workers = max(1, min(workers or os.cpu_count() or 1, len(stack_ids)))
+    db_path = os.fspath(db_path)
+    outcomes = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(doctor_stack, stack_id, db_path, jobs, incremental, timeout): stack_id
+            for stack_id in stack_ids
+        }
+        for future in as_completed(futures):
+            stack_id = futures[future]
+            try:
+                outcome = future.result()
+            except StackTimeout:
+                # Raised in the worker outside doctor_stack's handlers
+                outcome = StackOutcome(
+                    stack_id, status="timeout", error=f"Timed out after {timeout:g}s"
+                )
+            except Exception as e:
+                # The worker process itself died
+                outcome = StackOutcome(stack_id, status="failed", error=f"{type(e).__name__}: {e}")
+            outcomes[stack_id] = outcome
+            if on_outcome is not None:
+                on_outcome(outcome)
+    return [outcomes[stack_id] for stack_id in stack_ids]
+
+
+def rank_outcomes(outcomes):
+    """Order outcomes worst first: failed and timed-out stacks, then by errors, then warnings."""
+    return sorted(outcomes, key=lambda o: (o.status == "ok", -o.errors, -o.warnings, o.stack_id))
+
+
+def fleet_summary(outcomes, seconds=0.0):
+    """Fleet-wide totals and the ranked per-stack outcomes, as a JSON-ready dict."""
+    totals = {"ok": 0, "failed": 0, "timeout": 0, "errors": 0, "warnings": 0, "info": 0}
+    for outcome in outcomes:
+        totals[outcome.status] += 1
+        totals["errors"] += outcome.errors
+        totals["warnings"] += outcome.warnings
+        totals["info"] += outcome.info
+    return {
+        "stacks": len(outcomes),
+        **totals,
+        "seconds": round(seconds, 3),
+        "ranked": [outcome.to_dict() for outcome in rank_outcomes(outcomes)],
+    }
+
+
+def _print_summary(summary):
+    print()
+    print("=" * 55)
+    print("  Kernle Doctor - Fleet")
+    print("=" * 55)
+    print(
+        f"  Stacks: {summary['stacks']} in {summary['seconds']:.1f}s "
+        f"({summary['ok']} ok, {summary['failed']} failed, {summary['timeout']} timed out)"
+    )
+    print(
+        f"  Findings: {summary['errors']} errors, {summary['warnings']} warnings, "
+        f"{summary['info']} info"
+    )
+    print()
+    print("-" * 55)
+    print("STACKS (worst first)")
+    print("-" * 55)
+    for row in summary["ranked"]:
+        status = row["status"] if row["status"] != "ok" else f"report {row['report_id'][:8]}"
+        print(
+            f"  {row['stack_id']:24s} {row['errors']:5d} err {row['warnings']:5d} warn "
+            f"{row['seconds']:7.1f}s  {status}"
+        )
+        if row["error"]:
+            print(f"  {'':24s} -> {row['error']}")
+    print()
+
+
+def cmd_fleet_doctor(args):
+    """Run diagnostic sessions across many stacks and summarize the fleet."""
+    db_path = Path(getattr(args, "db", None) or default_db_path())
+    stacks_from = getattr(args, "stacks_from", None)
+    output_json = getattr(args, "json", False)
+
+    try:
+        if stacks_from == "-":
+            stack_ids = read_stack_ids(sys.stdin)
+        elif stacks_from:
+            with open(stacks_from) as f:
+                stack_ids = read_stack_ids(f)
+        else:
+            stack_ids = list_stacks(db_path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        return
+    if not stack_ids:
+        print("Error: No stacks to check.")
+        return
+
+    timeout = getattr(args, "timeout", DEFAULT_STACK_TIMEOUT)
+
+    def progress(outcome):
+        if not output_json:
+            print(f"  {outcome.stack_id}: {outcome.status}", file=sys.stderr, flush=True)
+
+    start = time.monotonic()
+    outcomes = run_fleet(
+        stack_ids,
+        db_path,
+        workers=getattr(args, "workers", None),
+        timeout=timeout if timeout and timeout > 0 else None,
+        jobs=getattr(args, "jobs", None) or 1,
+        incremental=getattr(args, "incremental", False),
+        on_outcome=progress,
+    )
+    summary = fleet_summary(outcomes, time.monotonic() - start)
+
+    if output_json:
+        print(json.dumps(summary, indent=2))
+    else:
+        _print_summary(summary)
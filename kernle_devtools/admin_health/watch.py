@@ -0,0 +1,177 @@
+"""Routine diagnostic sessions on a schedule.
+
+:class:`SessionWatch` keeps one Kernle open and runs a ``routine`` session
+every interval, jittered so that watchers started together drift apart.
+Before each run it checks whether the stack has been written since the last
+one and skips the run if not: first with :func:`stack_version`, which costs
+two ``stat`` calls, and only if that moved, with :func:`table_activity`, so
+writes by the watcher's own sessions don't count as changes.
+
+Runs are incremental by default and the checks run in the watcher's own
+thread, so between runs the process holds one Kernle and a few counters.
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from datetime import timezone
+
+from kernle_devtools.admin_health.checks import severity_counts, table_activity
+from kernle_devtools.admin_health.diagnostics import run_session
+from kernle_devtools.dashboard.changes import stack_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = "15m"
+DEFAULT_JITTER = 0.1
+
+_INTERVAL = re.compile(r"(\d+(?:\.\d+)?)\s*([smhd]?)")
+_UNIT_SECONDS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_interval(value) -> float:
+    """Parse an interval such as ``90``, ``30s``, ``15m``, ``2h`` or ``1d`` into seconds.
+
+    Raises:
+        ValueError: If ``value`` isn't a positive interval.
+    """
+    match = _INTERVAL.fullmatch(str(value).strip().lower())
+    seconds = float(match.group(1)) * _UNIT_SECONDS[match.group(2)] if match else 0
+    if seconds <= 0:
+        raise ValueError(f"Invalid interval: {value!r}")
+    return seconds
+
+
+class SessionWatch:
+    """Run routine diagnostic sessions for one stack until stopped.
+
+    Args:
+        k: Kernle instance, reused for every run.
+        interval: Seconds between runs.
+        jitter: Fraction of ``interval`` each wait is randomly shortened or
+            lengthened by.
+        jobs: Structural checks run concurrently per session.
+        incremental: Only re-run checks affected since the previous session.
+    """
+
+    def __init__(self, k, interval, jitter=DEFAULT_JITTER, jobs=1, incremental=True):
+        self.k = k
+        self.interval = interval
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.jobs = jobs
+        self.incremental = incremental
+        self.runs = 0
+        self.skips = 0
+        self._stop = threading.Event()
+        # Start of the last session, and the stack version once it was saved.
+        # The version is None when writes may have landed during that session.
+        self._since = None
+        self._version = None
+
+    def changed(self) -> bool:
+        """Whether the stack may have been written since the last run."""
+        if self._since is None:
+            return True
+        if self._version is not None and stack_version(self.k) == self._version:
+            return False
+        activity = table_activity(self.k, self._since)
+        return activity is None or any(written for written, _ in activity.values())
+
+    def tick(self):
+        """Run a session if the stack changed; return its ``SessionRun``, or None if skipped."""
+        if not self.changed():
+            self.skips += 1
+            return None
+        run = run_session(self.k, "routine", jobs=self.jobs, incremental=self.incremental)
+        started = run.session.started_at
+        if started.tzinfo is None:
+            started = started.replace(tzinfo=timezone.utc)
+        self._since = started.isoformat()
+        version = stack_version(self.k)
+        # Only trust the version for skipping if nothing but the session
+        # itself wrote since it started; otherwise look again next time.
+        activity = table_activity(self.k, self._since)
+        quiet = activity is not None and not any(w for w, _ in activity.values())
+        self._version = version if quiet else None
+        self.runs += 1
+        return run
+
+    def next_wait(self) -> float:
+        """Seconds until the next run: ``interval`` give or take ``jitter``."""
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def run(self, on_tick=None, max_runs=None):
+        """Tick, then wait, until :meth:`stop` is called.
+
+        Args:
+            on_tick: Called with each tick's result (None for a skip) and
+                the seconds it took.
+            max_runs: Stop after this many ticks (default: run forever).
+        """
+        ticks = 0
+        while not self._stop.is_set():
+            start = time.monotonic()
+            try:
+                result = self.tick()
+            except Exception:
+                # One failed run shouldn't end the watch
+                logger.exception("Diagnostic session for %s failed", self.k.stack_id)
+            else:
+                if on_tick is not None:
+                    on_tick(result, time.monotonic() - start)
+            ticks += 1
+            if max_runs is not None and ticks >= max_runs:
+                break
+            self._stop.wait(self.next_wait())
+
+    def stop(self):
+        """Stop :meth:`run` at the end of the current tick or wait."""
+        self._stop.set()
+
+
+def _print_tick(run, seconds):
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    if run is None:
+        print(f"{stamp}  skipped: no changes since last session", flush=True)
+        return
+    counts = severity_counts(run.findings)
+    rerun = sum(1 for result in run.results if not result.carried)
+    print(
+        f"{stamp}  session {run.session.id[:8]}: {len(run.findings)} findings "
+        f"({counts['error']} errors, {counts['warning']} warnings), "
+        f"{rerun}/{len(run.results)} checks run in {seconds:.2f}s",
+        flush=True,
+    )
+
+
+def cmd_doctor_session_watch(args, k):
+    """Run routine diagnostic sessions on a schedule until interrupted."""
+    try:
+        interval = parse_interval(getattr(args, "interval", DEFAULT_INTERVAL))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    jitter = getattr(args, "jitter", DEFAULT_JITTER)
+    if not 0 <= jitter < 1:
+        print("Error: --jitter must be at least 0 and less than 1")
+        return
+
+    watch = SessionWatch(
+        k,
+        interval,
+        jitter=jitter,
+        jobs=getattr(args, "jobs", None) or 1,
+        incremental=not getattr(args, "full", False),
+    )
+    print(
+        f"Watching stack {k.stack_id}: routine session every {interval:g}s "
+        f"(±{jitter:.0%}), Ctrl+C to stop",
+        flush=True,
+    )
+    try:
+        watch.run(on_tick=_print_tick)
+    except KeyboardInterrupt:
+        pass
+    print(f"Stopped after {watch.runs} sessions, {watch.skips} skipped.")
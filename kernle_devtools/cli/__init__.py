@@ -10,16 +10,31 @@ def main():
         prog="kernle-dev",
         description="Kernle devtools — standalone admin tools",
     )
-    parser.add_argument("--stack", "-s", required=True, help="Stack ID")
+    parser.add_argument("--stack", "-s", help="Stack ID (required except for fleet)")
 
-    from kernle_devtools.parsers import add_dashboard_parser, add_session_parsers
+    from kernle_devtools.parsers import (
+        add_dashboard_parser,
+        add_export_parser,
+        add_fleet_parser,
+        add_session_parsers,
+    )
 
     sub = parser.add_subparsers(dest="command", required=True)
     add_dashboard_parser(sub)
+    add_export_parser(sub)
     add_session_parsers(sub)
+    add_fleet_parser(sub)
 
     args = parser.parse_args()
 
+    if args.command == "fleet":
+        from kernle_devtools.admin_health.fleet import cmd_fleet_doctor
+
+        cmd_fleet_doctor(args)
+        return
+    if not args.stack:
+        parser.error("the following arguments are required: --stack/-s")
+
     from kernle import Kernle
 
     k = Kernle(stack_id=args.stack)
@@ -28,6 +43,10 @@ def main():
         from kernle_devtools.cli.dashboard import cmd_dashboard
 
         cmd_dashboard(args, k)
+    elif args.command == "export":
+        from kernle_devtools.cli.export import cmd_export
+
+        cmd_export(args, k)
     elif args.command == "session":
         from kernle_devtools.admin_health.diagnostics import (
             cmd_doctor_session_start,
@@ -38,8 +57,12 @@ def main():
             cmd_doctor_session_start(args, k)
         elif args.session_action == "list":
             cmd_doctor_session_list(args, k)
+        elif args.session_action == "watch":
+            from kernle_devtools.admin_health.watch import cmd_doctor_session_watch
+
+            cmd_doctor_session_watch(args, k)
         else:
-            print("Usage: kernle-dev --stack ID session {start|list}")
+            print("Usage: kernle-dev --stack ID session {start|list|watch}")
             sys.exit(1)
     elif args.command == "report":
         from kernle_devtools.admin_health.diagnostics import cmd_doctor_report
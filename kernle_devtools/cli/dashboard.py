@@ -2,9 +2,10 @@
 
 import logging
 import webbrowser
-from http.server import HTTPServer
 
-from kernle_devtools.dashboard.server import DashboardHandler
+from kernle_devtools.dashboard.pool import ThreadLocalKernle
+from kernle_devtools.dashboard.server import DEFAULT_WORKERS, DashboardHandler, DashboardServer
+from kernle_devtools.dashboard.stacks import DEFAULT_MAX_STACKS
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +15,20 @@ def cmd_dashboard(args, k):
     port = getattr(args, "port", 8420)
     host = getattr(args, "host", "127.0.0.1")
     no_open = getattr(args, "no_open", False)
+    workers = getattr(args, "workers", DEFAULT_WORKERS)
+    max_stacks = getattr(args, "max_stacks", DEFAULT_MAX_STACKS)
 
     DashboardHandler.kernle_instance = k
 
-    server = HTTPServer((host, port), DashboardHandler)
+    server = DashboardServer(
+        (host, port),
+        DashboardHandler,
+        ThreadLocalKernle(k),
+        workers=workers,
+        max_stacks=max_stacks,
+    )
     url = f"http://{host}:{port}"
-    logger.info("Dashboard running at %s", url)
+    logger.info("Dashboard running at %s (%d workers)", url, server.workers)
     print(f"Dashboard running at {url}")
 
     if not no_open:
@@ -29,4 +38,5 @@ def cmd_dashboard(args, k):
         server.serve_forever()
     except KeyboardInterrupt:
         logger.info("Shutting down")
-        server.shutdown()
+    finally:
+        server.server_close()
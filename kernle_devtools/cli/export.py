@@ -0,0 +1,47 @@
+"""Export CLI command handler."""
+
+import contextlib
+import gzip
+import sys
+
+from kernle_devtools.dashboard.export import DEFAULT_EXPORT_BATCH, export_stack, parse_kinds
+
+
+@contextlib.contextmanager
+def _open_output(path, compress):
+    """Open ``path`` (``-`` for stdout) for binary writing, gzipped if asked."""
+    if path in (None, "-"):
+        raw = sys.stdout.buffer
+        close = False
+    else:
+        raw = open(path, "wb")
+        close = True
+    try:
+        if compress:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+                yield out
+        else:
+            yield raw
+    finally:
+        raw.flush()
+        if close:
+            raw.close()
+
+
+def cmd_export(args, k):
+    """Stream every memory in the stack as NDJSON or CSV."""
+    fmt = getattr(args, "format", "ndjson")
+    output = getattr(args, "output", None)
+    compress = getattr(args, "gzip", False) or bool(output and output.endswith(".gz"))
+    batch_size = max(1, getattr(args, "batch_size", DEFAULT_EXPORT_BATCH))
+
+    try:
+        kinds = parse_kinds(getattr(args, "types", None))
+        chunks = export_stack(k, fmt, kinds, batch_size)
+    except (ValueError, NotImplementedError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    with _open_output(output, compress) as out:
+        for chunk in chunks:
+            out.write(chunk)
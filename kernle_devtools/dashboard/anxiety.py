@@ -0,0 +1,227 @@
+"""Background computation of the anxiety report.
+
+``get_anxiety_report(detailed=True)`` is the slowest call the dashboard
+makes. :class:`AnxietyRefresher` keeps the last good report and hands it
+out immediately, with its age. When the stack version has moved or the
+report is older than ``max_age``, a single background thread recomputes
+it while readers keep getting the previous one; concurrent readers never
+start a second computation.
+"""
+
+import functools
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from kernle_devtools.dashboard.changes import stack_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE = 15
+
+# The Kernle helper behind each dimension, in the order the report calls
+# them. The checkpoint age feeds both context pressure and unsaved work.
+DIMENSION_SOURCES = {
+    "_get_checkpoint_age_minutes": ("context_pressure", "unsaved_work"),
+    "_get_unreflected_episodes": ("consolidation_debt",),
+    "get_identity_confidence": ("identity_coherence",),
+    "_get_low_confidence_beliefs": ("memory_uncertainty",),
+    "_get_aging_raw_entries": ("raw_aging",),
+    "_get_epoch_staleness_months": ("epoch_staleness",),
+    "get_recommended_actions": ("recommendations",),
+}
+
+
+def timed_anxiety_report(k):
+    """Compute the detailed anxiety report, timing each dimension.
+
+    The helpers in :data:`DIMENSION_SOURCES` are wrapped on ``k`` for the
+    duration of the call, so ``k`` must not be in use by another thread.
+    Calls nested inside another timed helper (the recommendations re-read
+    several dimensions) count towards the outer one.
+
+    Returns:
+        ``(report, timings)``; timings maps dimension name to seconds,
+        with scoring and anything unattributed under ``other``.
+    """
+    timings = {}
+    pending = {name: list(dimensions) for name, dimensions in DIMENSION_SOURCES.items()}
+    active = []
+
+    def timed(name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if active:
+                return method(*args, **kwargs)
+            active.append(name)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                active.pop()
+                queue = pending[name]
+                dimension = queue.pop(0) if len(queue) > 1 else queue[0]
+                timings[dimension] = timings.get(dimension, 0.0) + time.perf_counter() - start
+
+        return wrapper
+
+    own = vars(k)
+    saved = {name: own[name] for name in DIMENSION_SOURCES if name in own}
+    for name in DIMENSION_SOURCES:
+        method = getattr(k, name, None)
+        if callable(method):
+            setattr(k, name, timed(name, method))
+    start = time.perf_counter()
+    try:
+        report = k.get_anxiety_report(detailed=True)
+    finally:
+        for name in DIMENSION_SOURCES:
+            if name in saved:
+                setattr(k, name, saved[name])
+            else:
+                own.pop(name, None)
+    total = time.perf_counter() - start
+    timings["other"] = max(0.0, total - sum(timings.values()))
+    return report, timings
+
+
+class _Snapshot:
+    """One computed report and how it was produced."""
+
+    __slots__ = ("report", "version", "computed_at", "computed_mono", "duration", "timings")
+
+    def __init__(self, report, version, duration, timings):
+        self.report = report
+        self.version = version
+        self.computed_at = datetime.now(timezone.utc)
+        self.computed_mono = time.monotonic()
+        self.duration = duration
+        self.timings = timings
+
+
+class AnxietyRefresher:
+    """Serve the anxiety report stale-while-revalidate.
+
+    Only the very first read waits for a computation. After that a read
+    returns the last report at once and, if it is stale, asks the
+    background thread for a new one. The thread takes its Kernle from
+    ``kernle_handles`` and computes one report at a time. Reads during a
+    run don't queue another; a result that is already stale when it lands
+    is refreshed on the next read.
+    """
+
+    def __init__(self, kernle_handles, max_age=DEFAULT_MAX_AGE, metrics=None):
+        self._handles = kernle_handles
+        self.max_age = max_age
+        self._metrics = metrics
+        self._cond = threading.Condition()
+        self._snapshot = None
+        self._error = None
+        self._wanted = False
+        self._computing = False
+        self._stopped = False
+        self._thread = None
+        self.computations = 0
+
+    def get(self, k, timeout=None):
+        """Return ``(report, freshness)`` for the stack ``k`` belongs to.
+
+        ``freshness`` has ``computed_at``, ``age_seconds``, ``stale``,
+        ``refreshing``, ``duration_ms`` and per-dimension ``dimension_ms``
+        (empty for storage the refresher can't open its own Kernle on).
+
+        Raises:
+            TimeoutError: If no report exists yet and none arrived in time.
+            Exception: Whatever the first computation raised, if it failed.
+        """
+        version = stack_version(k)
+        with self._cond:
+            if self._is_stale(self._snapshot, version):
+                self._request()
+            if self._snapshot is None:
+                if not self._cond.wait_for(
+                    lambda: self._snapshot is not None or not self._busy, timeout
+                ):
+                    raise TimeoutError("Anxiety report is still being computed")
+                if self._snapshot is None:
+                    raise self._error or RuntimeError("Anxiety refresher is stopped")
+            snapshot = self._snapshot
+            age = time.monotonic() - snapshot.computed_mono
+            freshness = {
+                "computed_at": snapshot.computed_at.isoformat(),
+                "age_seconds": round(age, 3),
+                "stale": self._is_stale(snapshot, version),
+                "refreshing": self._busy,
+                "duration_ms": round(snapshot.duration * 1e3, 3),
+                "dimension_ms": {
+                    name: round(seconds * 1e3, 3) for name, seconds in snapshot.timings.items()
+                },
+            }
+        return snapshot.report, freshness
+
+    @property
+    def _busy(self):
+        return self._wanted or self._computing
+
+    def _is_stale(self, snapshot, version):
+        if snapshot is None:
+            return True
+        age = time.monotonic() - snapshot.computed_mono
+        return snapshot.version != version or age >= self.max_age
+
+    def _request(self):
+        """Ask for a recomputation; the caller holds ``_cond``."""
+        if self._stopped or self._busy:
+            return
+        self._wanted = True
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="dashboard-anxiety", daemon=True
+            )
+            self._thread.start()
+        self._cond.notify_all()
+
+    def _run(self):
+        k = self._handles.get()
+        # Timing dimensions wraps methods on k, so only do it on a Kernle
+        # this thread owns; backends that can't be cloned share one
+        per_dimension = k is not self._handles.template
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._wanted or self._stopped)
+                if self._stopped:
+                    return
+                self._wanted = False
+                self._computing = True
+            # Read the version first so a write during the computation
+            # leaves the result stale and triggers another run.
+            snapshot, error = None, None
+            try:
+                version = stack_version(k)
+                start = time.perf_counter()
+                if per_dimension:
+                    report, timings = timed_anxiety_report(k)
+                else:
+                    report, timings = k.get_anxiety_report(detailed=True), {}
+                snapshot = _Snapshot(report, version, time.perf_counter() - start, timings)
+            except Exception as e:
+                logger.exception("Anxiety report computation failed")
+                error = e
+            with self._cond:
+                self._computing = False
+                if snapshot is not None:
+                    self._snapshot = snapshot
+                    self.computations += 1
+                self._error = error
+                self._cond.notify_all()
+            if snapshot is not None and self._metrics is not None:
+                self._metrics.observe_anxiety(snapshot.duration, snapshot.timings)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
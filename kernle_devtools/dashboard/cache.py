@@ -0,0 +1,78 @@
+"""Response cache for dashboard API endpoints."""
+
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class ResponseCache:
+    """Thread-safe, size-bounded LRU cache of encoded API responses.
+
+    Entries are stamped with the stack version they were computed against
+    and expire after a per-endpoint TTL, whichever comes first.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._endpoint_counts = {}
+
+    def _count(self, endpoint, outcome):
+        counts = self._endpoint_counts.setdefault(endpoint, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def get(self, key, version):
+        """Return the cached value for ``key`` if fresh and current, else None."""
+        endpoint = key[0]
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires_at, value = entry
+                if entry_version == version and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self._count(endpoint, "hits")
+                    return value
+                del self._entries[key]
+                self.invalidations += 1
+            self.misses += 1
+            self._count(endpoint, "misses")
+            return None
+
+    def put(self, key, version, value, ttl):
+        """Store ``value`` for ``key``, evicting least-recently-used entries."""
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters overall and per endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "endpoints": {k: dict(v) for k, v in self._endpoint_counts.items()},
+            }
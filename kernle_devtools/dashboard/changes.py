@@ -0,0 +1,30 @@
+"""Cheap change detection for a kernle stack."""
+
+import os
+
+
+def stack_version(k):
+    """Return an opaque token that changes whenever the stack is written.
+
+    SQLite-backed stacks are fingerprinted from the database and WAL file
+    metadata, which costs two ``stat`` calls and no queries. Other backends
+    fall back to the id of the newest audit log entry.
+    """
+    db_path = getattr(getattr(k, "_storage", None), "db_path", None)
+    if isinstance(db_path, (str, os.PathLike)):
+        parts = []
+        for suffix in ("", "-wal"):
+            try:
+                st = os.stat(f"{os.fspath(db_path)}{suffix}")
+            except OSError:
+                continue
+            if suffix and not st.st_size:
+                # An empty WAL appears when a reader first opens the database
+                # and after checkpoints; neither is a change to the data.
+                continue
+            parts.append(f"{st.st_mtime_ns:x}.{st.st_size:x}")
+        if parts:
+            return "-".join(parts)
+
+    head = k.stack.get_audit_log(limit=1)
+    return str(head[0].get("id")) if head else "empty"
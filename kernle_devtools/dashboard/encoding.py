@@ -0,0 +1,97 @@
+"""Response body encoding — ETags and Accept-Encoding negotiation."""
+
+import gzip
+import hashlib
+import zlib
+
+# Bodies smaller than this are sent uncompressed; below roughly one TCP
+# segment the compression overhead outweighs the bytes saved.
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 6
+SUPPORTED_ENCODINGS = ("gzip", "deflate")
+
+
+def etag(body):
+    """Return a strong ETag for an encoded response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(header, tag):
+    """Check an If-None-Match header value against ``tag``."""
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == tag:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick a content-coding from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name == "*":
+            for enc in SUPPORTED_ENCODINGS:
+                weights.setdefault(enc, q)
+        elif name in SUPPORTED_ENCODINGS:
+            weights[name] = q
+    candidates = [enc for enc in SUPPORTED_ENCODINGS if weights.get(enc, 0) > 0]
+    if not candidates:
+        return None
+    # max() keeps the first of equal weights, i.e. the server's preference
+    return max(candidates, key=lambda enc: weights[enc])
+
+
+def compress(body, encoding, level=COMPRESS_LEVEL):
+    """Compress ``body`` with the given content-coding."""
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == "deflate":
+        return zlib.compress(body, level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class EncodedBody:
+    """A response body with its ETag and lazily compressed variants.
+
+    Variants are memoized, so a body held in the response cache (or the
+    static dashboard page) is compressed at most once per encoding.
+    """
+
+    __slots__ = ("body", "etag", "level", "_variants")
+
+    def __init__(self, body, level=COMPRESS_LEVEL):
+        self.body = body
+        self.etag = etag(body)
+        self.level = level
+        self._variants = {}
+
+    def __len__(self):
+        return len(self.body)
+
+    def encoded(self, encoding):
+        """Return ``(data, encoding, etag)`` for the negotiated encoding.
+
+        Falls back to identity when no encoding was negotiated or the body
+        is under the size threshold. Each variant gets its own ETag since
+        strong validators must differ between representations.
+        """
+        if encoding is None or len(self.body) < COMPRESS_MIN_BYTES:
+            return self.body, None, self.etag
+        data = self._variants.get(encoding)
+        if data is None:
+            data = compress(self.body, encoding, self.level)
+            self._variants[encoding] = data
+        return data, encoding, f'{self.etag[:-1]}-{encoding}"'
@@ -0,0 +1,240 @@
+"""Server-Sent Events change feed for the dashboard.
+
+A single :class:`ChangeWatcher` per server polls the stack version (two
+``stat`` calls, no queries) and only looks at the database when that
+version moves. Each subscribed browser gets an :class:`EventStream` thread
+that owns its socket, so open feeds never occupy request workers.
+"""
+
+import json
+import logging
+import queue
+import threading
+
+from kernle_devtools.dashboard.changes import stack_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0
+HEARTBEAT_SECONDS = 15
+RETRY_MS = 3000
+MAX_EVENT_CLIENTS = 32
+AUDIT_TAIL = 50
+# Per-client backlog; a client this far behind is dropped and reconnects.
+CLIENT_QUEUE_SIZE = 64
+
+_CLOSE = object()
+
+
+def format_event(data, event=None, event_id=None):
+    """Encode one SSE message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    lines.append(f"data: {payload}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def _topic(memory_type):
+    """Map an audit ``memory_type`` to the list it belongs to."""
+    if not memory_type or memory_type == "raw" or memory_type.endswith("s"):
+        return memory_type
+    return f"{memory_type}s"
+
+
+class ChangeWatcher:
+    """Poll one stack for changes and fan them out to subscribers.
+
+    The poller thread starts with the first subscriber and does nothing
+    while nobody is listening. When the version changes it reads the stats
+    and the head of the audit log once, and every client gets the same
+    event describing what moved.
+    """
+
+    def __init__(
+        self, kernle_handles, interval=DEFAULT_POLL_INTERVAL, max_clients=MAX_EVENT_CLIENTS
+    ):
+        self._handles = kernle_handles
+        self.interval = interval
+        self.max_clients = max_clients
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._seq = 0
+        self._version = None
+        self._stats = None
+        self._audit_head = None
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self):
+        """Register a client and return its event queue, or None when full."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients or self._stop.is_set():
+                return None
+            q = queue.Queue(CLIENT_QUEUE_SIZE)
+            self._subscribers.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="dashboard-watcher", daemon=True
+                )
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def stop(self):
+        """Stop polling and tell every open stream to finish."""
+        self._stop.set()
+        with self._lock:
+            subscribers, self._subscribers = list(self._subscribers), set()
+            thread = self._thread
+        for q in subscribers:
+            try:
+                q.put_nowait(_CLOSE)
+            except queue.Full:
+                pass
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        k = self._handles.get()
+        while not self._stop.is_set():
+            try:
+                self.poll(k)
+            except Exception:
+                logger.exception("Change watcher poll failed")
+            self._stop.wait(self.interval)
+
+    def poll(self, k):
+        """Check for a change once; broadcast and return the event if any."""
+        with self._lock:
+            listening = bool(self._subscribers)
+        if not listening:
+            # Nobody to tell; rebaseline on the next poll with subscribers
+            self._version = None
+            return None
+
+        version = stack_version(k)
+        if version == self._version:
+            return None
+        first = self._version is None
+        self._version = version
+        event = self._describe(k, version, baseline=first)
+        if first:
+            return None
+        self._broadcast(event)
+        return event
+
+    def _describe(self, k, version, baseline=False):
+        stats = k.stack.get_stats()
+        audit = k.stack.get_audit_log(limit=AUDIT_TAIL)
+        previous_stats, previous_head = self._stats, self._audit_head
+        self._stats = stats
+        self._audit_head = audit[0]["id"] if audit else None
+        if baseline:
+            return None
+
+        deltas = {}
+        for name, count in stats.items():
+            before = (previous_stats or {}).get(name, 0)
+            if count != before:
+                deltas[name] = count - before
+
+        new_audit = []
+        for entry in audit:
+            if entry["id"] == previous_head:
+                break
+            new_audit.append(
+                {
+                    name: entry.get(name)
+                    for name in ("id", "memory_type", "memory_id", "operation", "created_at")
+                }
+            )
+
+        topics = set()
+        for name in deltas:
+            topics.add("suggestions" if name == "pending_suggestions" else name)
+        for entry in new_audit:
+            topics.add(_topic(entry["memory_type"]))
+        if new_audit:
+            topics.add("audit")
+        if deltas:
+            topics.add("stats")
+        topics.discard(None)
+        if not topics:
+            # Something was written that neither counts nor the audit log show
+            topics.add("stack")
+
+        self._seq += 1
+        return {
+            "id": self._seq,
+            "version": version,
+            "topics": sorted(topics),
+            "stats": stats,
+            "deltas": deltas,
+            "audit": new_audit,
+        }
+
+    def _broadcast(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Too slow to keep up; drop it and let EventSource reconnect
+                self.unsubscribe(q)
+                try:
+                    q.get_nowait()
+                    q.put_nowait(_CLOSE)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+class EventStream(threading.Thread):
+    """Write a watcher's events to one client socket until either side stops."""
+
+    def __init__(self, watcher, events, wfile, on_close=None, heartbeat=HEARTBEAT_SECONDS):
+        super().__init__(name="dashboard-events", daemon=True)
+        self._watcher = watcher
+        self._events = events
+        self._wfile = wfile
+        self._on_close = on_close
+        self._heartbeat = heartbeat
+
+    def _send(self, data):
+        self._wfile.write(data)
+        self._wfile.flush()
+
+    def run(self):
+        try:
+            self._send(f"retry: {RETRY_MS}\n\n".encode("ascii"))
+            while True:
+                try:
+                    event = self._events.get(timeout=self._heartbeat)
+                except queue.Empty:
+                    self._send(b": keepalive\n\n")
+                    continue
+                if event is _CLOSE:
+                    break
+                self._send(format_event(event, event="change", event_id=event["id"]))
+        except OSError:
+            logger.debug("Event stream client disconnected")
+        finally:
+            self._watcher.unsubscribe(self._events)
+            try:
+                self._wfile.close()
+            except OSError:
+                pass
+            if self._on_close is not None:
+                self._on_close()
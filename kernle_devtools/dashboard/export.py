@@ -0,0 +1,169 @@
+"""Streaming export of a whole stack as NDJSON or CSV.
+
+Rows are read in keyset batches of ``batch_size``, each on its own short
+read, and encoded as they go, so memory stays flat and no long-running
+transaction holds back the WAL however large the stack is. Exports are
+read-only: lazy strength decay is not applied.
+"""
+
+import csv
+import dataclasses
+import io
+import json
+from dataclasses import replace
+
+from kernle.storage.base import Belief, Drive, Episode, Goal, Note, RawEntry, Relationship, Value
+
+from kernle_devtools.dashboard.queries import LIST_SPECS, PageStream, supports_keyset
+from kernle_devtools.dashboard.serialization import serialize
+
+EXPORT_FORMATS = ("ndjson", "csv")
+DEFAULT_EXPORT_BATCH = 1000
+
+# Memory lists in export order. Unlike the list views, beliefs include
+# inactive (superseded) ones.
+EXPORT_KINDS = ("raw", "episodes", "beliefs", "values", "goals", "notes", "relationships", "drives")
+EXPORT_SPECS = {kind: replace(LIST_SPECS[kind], where="", filters=()) for kind in EXPORT_KINDS}
+RECORD_CLASSES = {
+    "raw": RawEntry,
+    "episodes": Episode,
+    "beliefs": Belief,
+    "values": Value,
+    "goals": Goal,
+    "notes": Note,
+    "relationships": Relationship,
+    "drives": Drive,
+}
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def record_type(kind):
+    """The ``type`` an exported row of list ``kind`` is labelled with."""
+    return EXPORT_SPECS[kind].memory_type or kind
+
+
+def parse_kinds(value):
+    """Parse a comma-separated ``types`` value into export kinds, in export order.
+
+    Accepts list names (``beliefs``) or record types (``belief``); empty
+    means all.
+
+    Raises:
+        ValueError: On an unknown type.
+    """
+    if not value:
+        return EXPORT_KINDS
+    aliases = {record_type(kind): kind for kind in EXPORT_KINDS}
+    wanted = set()
+    for name in (part.strip() for part in value.split(",")):
+        if not name:
+            continue
+        kind = aliases.get(name, name)
+        if kind not in EXPORT_SPECS:
+            raise ValueError(f"Unknown type: {name!r}")
+        wanted.add(kind)
+    return tuple(kind for kind in EXPORT_KINDS if kind in wanted) or EXPORT_KINDS
+
+
+def iter_records(k, kinds=EXPORT_KINDS, batch_size=DEFAULT_EXPORT_BATCH):
+    """Yield ``(kind, record)`` for every live row of ``kinds``, newest first per kind.
+
+    Raises:
+        NotImplementedError: If ``k``'s storage can't be queried directly.
+    """
+    if not supports_keyset(k):
+        raise NotImplementedError("Export requires SQLite storage")
+    for kind in kinds:
+        cursor = None
+        while True:
+            page = PageStream(
+                k,
+                kind,
+                batch_size,
+                cursor=cursor,
+                batch_size=batch_size,
+                spec=EXPORT_SPECS[kind],
+                decay=False,
+            )
+            for record in page:
+                yield kind, record
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+
+
+def export_ndjson(records):
+    """Encode ``(kind, record)`` pairs as one JSON object per line."""
+    for kind, record in records:
+        row = {"type": record_type(kind), **serialize(record)}
+        yield json.dumps(row, default=str, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def csv_columns(kinds):
+    """Return the CSV header for ``kinds``: ``type`` then every record field once.
+
+    The columns come from the record classes, so the header is known before
+    the first row is read.
+    """
+    columns = ["type"]
+    seen = set(columns)
+    for kind in kinds:
+        for field in dataclasses.fields(RECORD_CLASSES[kind]):
+            if field.name not in seen:
+                seen.add(field.name)
+                columns.append(field.name)
+    return columns
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+def export_csv(records, kinds):
+    """Encode ``(kind, record)`` pairs as CSV rows under :func:`csv_columns`.
+
+    Nested values (lists, dicts) are JSON-encoded within their cell; fields
+    a type doesn't have are left empty.
+    """
+    columns = csv_columns(kinds)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columns, extrasaction="ignore", lineterminator="\n")
+
+    def flush():
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writeheader()
+    yield flush()
+    for kind, record in records:
+        row = {name: _csv_cell(value) for name, value in serialize(record).items()}
+        row["type"] = record_type(kind)
+        writer.writerow(row)
+        yield flush()
+
+
+def export_stack(k, fmt="ndjson", kinds=EXPORT_KINDS, batch_size=DEFAULT_EXPORT_BATCH):
+    """Return an iterator of encoded chunks exporting ``kinds`` of ``k``'s stack.
+
+    Raises:
+        ValueError: On an unknown ``fmt``.
+        NotImplementedError: If ``k``'s storage can't be queried directly.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format: {fmt!r}")
+    if not supports_keyset(k):
+        raise NotImplementedError("Export requires SQLite storage")
+    records = iter_records(k, kinds, batch_size)
+    if fmt == "csv":
+        return export_csv(records, kinds)
+    return export_ndjson(records)
@@ -0,0 +1,218 @@
+"""Request instrumentation for the dashboard server.
+
+Latency is split into phases: ``serialize`` (converting results to JSON),
+``write`` (compressing and writing to the socket) and ``kernle``, which is
+the remainder of the handler and is dominated by kernle/storage calls.
+Metrics render in the Prometheus text exposition format, so no client
+library is needed.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+PHASES = ("kernle", "serialize", "write")
+
+
+class Histogram:
+    """Cumulative-bucket histogram with Prometheus semantics."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Yield ``(upper_bound, cumulative_count)``, ending with ``+Inf``."""
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile by interpolating within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, total in self.cumulative():
+            if total >= rank:
+                if bound == float("inf"):
+                    return lower
+                in_bucket = total - seen
+                return lower + (bound - lower) * ((rank - seen) / in_bucket if in_bucket else 0)
+            lower, seen = bound, total
+        return lower
+
+
+class PhaseTimer:
+    """Accumulate time spent in named phases of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def finish(self):
+        """Return ``(total, phases)``; time not in any phase counts as kernle."""
+        total = time.perf_counter() - self.started
+        phases = dict(self.phases)
+        phases["kernle"] += max(0.0, total - sum(phases.values()))
+        return total, phases
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else str(bound)
+
+
+class RequestMetrics:
+    """Thread-safe per-route request metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._phases = {}
+        self._sizes = {}
+        self._requests = {}
+        self._errors = {}
+        self._anxiety = {}
+
+    def observe(self, route, method, status, total, phases, size):
+        """Record one finished request."""
+        with self._lock:
+            latency = self._latency.get(route)
+            if latency is None:
+                latency = self._latency[route] = Histogram(LATENCY_BUCKETS)
+                self._sizes[route] = Histogram(SIZE_BUCKETS)
+                self._phases[route] = {name: Histogram(LATENCY_BUCKETS) for name in PHASES}
+            latency.observe(total)
+            for name, seconds in phases.items():
+                self._phases[route][name].observe(seconds)
+            self._sizes[route].observe(size)
+            key = (route, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 500:
+                self._errors[route] = self._errors.get(route, 0) + 1
+
+    def observe_anxiety(self, total, dimensions):
+        """Record one background anxiety computation and its per-dimension split."""
+        with self._lock:
+            for dimension, seconds in {"total": total, **dimensions}.items():
+                histogram = self._anxiety.get(dimension)
+                if histogram is None:
+                    histogram = self._anxiety[dimension] = Histogram(LATENCY_BUCKETS)
+                histogram.observe(seconds)
+
+    def _histogram_lines(self, name, histogram, **labels):
+        lines = []
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{{{_labels(**labels, le=_format_bound(bound))}}} {count}")
+        lines.append(f"{name}_sum{{{_labels(**labels)}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{_labels(**labels)}}} {histogram.count}")
+        return lines
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP kernle_dashboard_requests_total Requests served, by route and status.",
+                "# TYPE kernle_dashboard_requests_total counter",
+            ]
+            for (route, method, status), count in sorted(self._requests.items()):
+                labels = _labels(route=route, method=method, status=status)
+                lines.append(f"kernle_dashboard_requests_total{{{labels}}} {count}")
+
+            lines += [
+                "# HELP kernle_dashboard_errors_total Requests that failed with a 5xx status.",
+                "# TYPE kernle_dashboard_errors_total counter",
+            ]
+            for route, count in sorted(self._errors.items()):
+                lines.append(f"kernle_dashboard_errors_total{{{_labels(route=route)}}} {count}")
+
+            lines += [
+                "# HELP kernle_dashboard_request_duration_seconds Request latency by route.",
+                "# TYPE kernle_dashboard_request_duration_seconds histogram",
+            ]
+            for route, histogram in sorted(self._latency.items()):
+                lines += self._histogram_lines(
+                    "kernle_dashboard_request_duration_seconds", histogram, route=route
+                )
+
+            lines += [
+                "# HELP kernle_dashboard_phase_duration_seconds Request time by route and phase.",
+                "# TYPE kernle_dashboard_phase_duration_seconds histogram",
+            ]
+            for route, phases in sorted(self._phases.items()):
+                for phase, histogram in phases.items():
+                    lines += self._histogram_lines(
+                        "kernle_dashboard_phase_duration_seconds",
+                        histogram,
+                        route=route,
+                        phase=phase,
+                    )
+
+            lines += [
+                "# HELP kernle_dashboard_response_size_bytes Response body size by route.",
+                "# TYPE kernle_dashboard_response_size_bytes histogram",
+            ]
+            for route, histogram in sorted(self._sizes.items()):
+                lines += self._histogram_lines(
+                    "kernle_dashboard_response_size_bytes", histogram, route=route
+                )
+
+            lines += [
+                "# HELP kernle_dashboard_anxiety_seconds Anxiety report compute time by dimension.",
+                "# TYPE kernle_dashboard_anxiety_seconds histogram",
+            ]
+            for dimension, histogram in sorted(self._anxiety.items()):
+                lines += self._histogram_lines(
+                    "kernle_dashboard_anxiety_seconds", histogram, dimension=dimension
+                )
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Return per-route totals, percentiles and phase averages for the UI."""
+        with self._lock:
+            errors = dict(self._errors)
+            rows = []
+            for route, latency in sorted(self._latency.items()):
+                count = latency.count
+                rows.append(
+                    {
+                        "route": route,
+                        "requests": count,
+                        "errors": errors.get(route, 0),
+                        "p50_ms": latency.quantile(0.5) * 1e3,
+                        "p95_ms": latency.quantile(0.95) * 1e3,
+                        "avg_ms": {
+                            phase: histogram.sum / count * 1e3
+                            for phase, histogram in self._phases[route].items()
+                        },
+                        "avg_bytes": self._sizes[route].sum / count,
+                    }
+                )
+        return rows
@@ -0,0 +1,89 @@
+"""Kernle handle management for the multi-threaded dashboard server."""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _clone_factory(k, stack_id=None):
+    """Return a callable that opens a fresh Kernle like ``k``.
+
+    The new instance is bound to ``stack_id`` (``k``'s own stack by default)
+    in the same database. Only SQLite-backed stacks can be cloned (a new
+    storage object pointing at the same database file). Any other backend
+    falls back to sharing ``k``, which is safe because storage opens a
+    connection per operation, but can't reach other stacks.
+    """
+    from kernle.storage import SQLiteStorage
+
+    storage = getattr(k, "_storage", None)
+    if not isinstance(storage, SQLiteStorage):
+        if stack_id not in (None, k.stack_id):
+            raise NotImplementedError("Opening other stacks requires SQLite storage")
+        return lambda: k
+
+    from kernle import Kernle
+
+    stack_id = stack_id or k.stack_id
+    db_path = storage.db_path
+    cloud_storage = storage.cloud_storage
+    checkpoint_dir = k.checkpoint_dir
+    strict = getattr(k, "_strict", True)
+
+    def factory():
+        return Kernle(
+            stack_id=stack_id,
+            storage=SQLiteStorage(stack_id=stack_id, db_path=db_path, cloud_storage=cloud_storage),
+            checkpoint_dir=checkpoint_dir,
+            strict=strict,
+        )
+
+    return factory
+
+
+class ThreadLocalKernle:
+    """Hands each worker thread its own Kernle bound to the same stack.
+
+    Instances are created lazily on first use in a thread and reused for
+    every later request that thread serves. Pass ``stack_id`` to serve a
+    different stack from ``k``'s database.
+    """
+
+    def __init__(self, k, factory=None, stack_id=None):
+        self.stack_id = stack_id or k.stack_id
+        self._template = k
+        self._factory = factory or _clone_factory(k, self.stack_id)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+
+    @property
+    def template(self):
+        """The Kernle these handles were created from."""
+        return self._template
+
+    def get(self):
+        """Return the calling thread's Kernle, opening it on first use."""
+        instance = getattr(self._local, "kernle", None)
+        if instance is None:
+            instance = self._factory()
+            self._local.kernle = instance
+            with self._lock:
+                self._opened.append(instance)
+            logger.debug(
+                "Opened Kernle for %s in %s", self.stack_id, threading.current_thread().name
+            )
+        return instance
+
+    def close(self):
+        """Close storage handles opened by worker threads."""
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for instance in opened:
+            if instance is self._template:
+                continue
+            try:
+                instance._storage.close()
+            except Exception:
+                logger.debug("Failed to close storage for %s", self.stack_id, exc_info=True)
@@ -0,0 +1,240 @@
+"""Batched provenance traversal for the dashboard.
+
+Memories record their sources as ``"type:id"`` strings in a JSON
+``derived_from`` column. Kernle's ``get_memories_derived_from`` answers one
+node at a time with a LIKE scan per table; these helpers answer a whole set
+of nodes with a single ``json_each`` query, so a breadth-first walk costs
+one query per level rather than one per node.
+"""
+
+import json
+from typing import Dict, Iterable, List, Tuple
+
+# Tables whose rows carry a derived_from column
+DERIVED_TABLES = {
+    "episode": "episodes",
+    "belief": "beliefs",
+    "value": "agent_values",
+    "goal": "goals",
+    "note": "notes",
+    "drive": "drives",
+    "relationship": "relationships",
+}
+NODE_TABLES = {"raw": "raw_entries", **DERIVED_TABLES}
+
+# Column shown as a node's label in the graph
+LABEL_COLUMNS = {
+    "raw": "COALESCE(blob, content, '')",
+    "episode": "objective",
+    "belief": "statement",
+    "value": "COALESCE(name, statement)",
+    "goal": "title",
+    "note": "content",
+    "drive": "drive_type",
+    "relationship": "entity_name",
+}
+LABEL_CHARS = 80
+
+DEFAULT_GRAPH_DEPTH = 3
+MAX_GRAPH_DEPTH = 10
+MAX_GRAPH_NODES = 500
+# Ids accepted by one bulk derivation lookup
+MAX_BULK_IDS = 1000
+# Keep IN lists well under SQLite's bound-parameter limit
+_CHUNK = 500
+
+Ref = Tuple[str, str]
+
+
+def parse_ref(ref):
+    """Split ``"type:id"`` into ``(type, id)``, or None for annotation refs."""
+    if not isinstance(ref, str) or ":" not in ref:
+        return None
+    memory_type, memory_id = ref.split(":", 1)
+    if memory_type not in NODE_TABLES or not memory_id:
+        return None
+    return memory_type, memory_id
+
+
+def _chunks(items, size=_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def derived_children(conn, stack_id, refs: Iterable[Ref]) -> List[Tuple[Ref, Ref]]:
+    """Return ``(source, child)`` pairs for memories citing any of ``refs``.
+
+    One query covers every derived table and every ref in the chunk.
+    """
+    targets = [f"{memory_type}:{memory_id}" for memory_type, memory_id in refs]
+    pairs = []
+    for chunk in _chunks(targets):
+        marks = ",".join("?" * len(chunk))
+        selects, params = [], []
+        for memory_type, table in DERIVED_TABLES.items():
+            selects.append(
+                f"SELECT '{memory_type}', t.id, j.value "
+                f"FROM {table} t, json_each(t.derived_from) j "
+                "WHERE t.stack_id = ? AND t.deleted = 0 AND json_valid(t.derived_from) "
+                f"AND j.value IN ({marks})"
+            )
+            params.extend([stack_id, *chunk])
+        for child_type, child_id, source in conn.execute(" UNION ALL ".join(selects), params):
+            pairs.append((parse_ref(source), (child_type, child_id)))
+    return pairs
+
+
+def derived_sources(conn, stack_id, refs: Iterable[Ref]) -> List[Tuple[Ref, Ref]]:
+    """Return ``(source, child)`` pairs for the ``derived_from`` of ``refs``."""
+    by_type: Dict[str, List[str]] = {}
+    for memory_type, memory_id in refs:
+        if memory_type in DERIVED_TABLES:
+            by_type.setdefault(memory_type, []).append(memory_id)
+    selects, params = [], []
+    for memory_type, ids in by_type.items():
+        for chunk in _chunks(ids):
+            selects.append(
+                f"SELECT '{memory_type}', id, derived_from FROM {DERIVED_TABLES[memory_type]} "
+                f"WHERE stack_id = ? AND deleted = 0 AND id IN ({','.join('?' * len(chunk))})"
+            )
+            params.extend([stack_id, *chunk])
+    pairs = []
+    if not selects:
+        return pairs
+    for child_type, child_id, derived_from in conn.execute(" UNION ALL ".join(selects), params):
+        try:
+            sources = json.loads(derived_from) if derived_from else []
+        except (TypeError, ValueError):
+            continue
+        for ref in sources if isinstance(sources, list) else ():
+            source = parse_ref(ref)
+            if source is not None:
+                pairs.append((source, (child_type, child_id)))
+    return pairs
+
+
+def node_labels(conn, stack_id, refs: Iterable[Ref]) -> Dict[Ref, str]:
+    """Look up a short label for each node that still exists."""
+    by_type: Dict[str, List[str]] = {}
+    for memory_type, memory_id in refs:
+        by_type.setdefault(memory_type, []).append(memory_id)
+    selects, params = [], []
+    for memory_type, ids in by_type.items():
+        for chunk in _chunks(ids):
+            selects.append(
+                f"SELECT '{memory_type}', id, {LABEL_COLUMNS[memory_type]} "
+                f"FROM {NODE_TABLES[memory_type]} "
+                f"WHERE stack_id = ? AND deleted = 0 AND id IN ({','.join('?' * len(chunk))})"
+            )
+            params.extend([stack_id, *chunk])
+    labels = {}
+    if selects:
+        for memory_type, memory_id, label in conn.execute(" UNION ALL ".join(selects), params):
+            labels[(memory_type, memory_id)] = (label or "")[:LABEL_CHARS]
+    return labels
+
+
+def derivation_counts(k, memory_type, memory_ids):
+    """Return what was derived from each of ``memory_ids``, in one query.
+
+    Returns:
+        ``{id: {"count": n, "targets": [{"type", "id"}, ...]}}`` with an
+        entry for every requested id, zero-count ones included.
+    """
+    storage = k._storage
+    memory_ids = list(dict.fromkeys(memory_ids))[:MAX_BULK_IDS]
+    result = {memory_id: {"count": 0, "targets": []} for memory_id in memory_ids}
+    if not memory_ids:
+        return result
+    with storage._connect() as conn:
+        pairs = derived_children(
+            conn, storage.stack_id, [(memory_type, memory_id) for memory_id in memory_ids]
+        )
+    for source, (child_type, child_id) in sorted(set(pairs), key=lambda pair: pair[1]):
+        entry = result.get(source[1]) if source else None
+        if entry is not None:
+            entry["count"] += 1
+            entry["targets"].append({"type": child_type, "id": child_id})
+    return result
+
+
+def provenance_graph(
+    k,
+    memory_type,
+    memory_id,
+    depth=DEFAULT_GRAPH_DEPTH,
+    direction="down",
+    max_nodes=MAX_GRAPH_NODES,
+):
+    """Walk provenance from one memory, breadth first, one query per level.
+
+    Args:
+        k: Kernle instance with SQLite storage.
+        memory_type: Root node type (``raw``, ``episode``, ...).
+        memory_id: Root node id.
+        depth: Levels to walk, clamped to ``1..MAX_GRAPH_DEPTH``.
+        direction: ``down`` (what was derived from the root), ``up`` (what
+            the root was derived from) or ``both``.
+        max_nodes: Stop expanding once this many nodes are known.
+
+    Returns:
+        ``{"root", "nodes", "edges", "truncated"}``. Nodes carry ``depth``,
+        negative for ancestors; edges always point from source to derived.
+    """
+    depth = max(1, min(depth, MAX_GRAPH_DEPTH))
+    storage = k._storage
+    root = (memory_type, memory_id)
+    depths = {root: 0}
+    edges = set()
+    truncated = False
+
+    walks = []
+    if direction in ("down", "both"):
+        walks.append((derived_children, 1))
+    if direction in ("up", "both"):
+        walks.append((derived_sources, -1))
+
+    with storage._connect() as conn:
+        for step, sign in walks:
+            frontier = [root]
+            for level in range(1, depth + 1):
+                if not frontier or truncated:
+                    break
+                next_frontier = []
+                for source, child in step(conn, storage.stack_id, frontier):
+                    if source is None:
+                        continue
+                    edges.add((source, child))
+                    node = child if sign > 0 else source
+                    if node in depths:
+                        continue
+                    if len(depths) >= max_nodes:
+                        truncated = True
+                        continue
+                    depths[node] = sign * level
+                    next_frontier.append(node)
+                frontier = next_frontier
+        labels = node_labels(conn, storage.stack_id, depths)
+
+    # Drop edges to nodes cut by the node cap
+    edges = [edge for edge in edges if edge[0] in depths and edge[1] in depths]
+    nodes = [
+        {
+            "key": f"{node_type}:{node_id}",
+            "type": node_type,
+            "id": node_id,
+            "depth": node_depth,
+            "label": labels.get((node_type, node_id)),
+            "missing": (node_type, node_id) not in labels,
+        }
+        for (node_type, node_id), node_depth in sorted(depths.items(), key=lambda kv: kv[1])
+    ]
+    return {
+        "root": f"{memory_type}:{memory_id}",
+        "nodes": nodes,
+        "edges": [
+            {"from": f"{s[0]}:{s[1]}", "to": f"{c[0]}:{c[1]}"} for s, c in sorted(edges)
+        ],
+        "truncated": truncated,
+    }
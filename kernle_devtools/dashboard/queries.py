@@ -0,0 +1,350 @@
+"""Keyset-paginated list queries for the dashboard.
+
+Kernle's list APIs only take a ``limit``, so paging past the newest rows
+means asking for ever larger limits. These queries read the SQLite tables
+directly and page with a ``(sort_column, id)`` keyset, so every page costs
+one indexed range scan regardless of how deep it is.
+
+:func:`list_changes` serves the same lists as deltas: every kernle write
+bumps a row's ``local_updated_at`` (deletes are soft), so the rows written
+since a client's last high-water mark are exactly what it needs to patch
+its copy of the list.
+"""
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional
+
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 200
+# Deltas larger than this tell the client to reload instead
+MAX_DELTA_ROWS = 1000
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class InvalidSince(ValueError):
+    """Raised when a ``since`` high-water mark is not a timestamp."""
+
+
+@dataclass(frozen=True)
+class ListSpec:
+    """How to page through one memory list."""
+
+    table: str
+    sort_column: str
+    row_method: Optional[str]
+    memory_type: Optional[str] = None
+    stack_scoped: bool = True
+    where: str = ""
+    filters: tuple = ()
+    # Bumped on every write; append-only tables use their creation time
+    changed_column: str = "local_updated_at"
+
+
+@dataclass
+class Page:
+    """One page of a keyset-paginated list."""
+
+    items: List[Any]
+    next_cursor: Optional[str] = None
+
+
+@dataclass
+class Delta:
+    """Rows of one list written after a high-water mark.
+
+    ``items`` are rows that are (still) in the list, ``removed`` the ids of
+    rows that were deleted or no longer match its filters. ``reset`` means
+    too much changed to patch and the client should reload the list.
+    """
+
+    items: List[Any] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    high_water: str = ""
+    reset: bool = False
+
+
+LIST_SPECS = {
+    "raw": ListSpec("raw_entries", "captured_at", "_row_to_raw_entry", filters=("processed",)),
+    "episodes": ListSpec("episodes", "created_at", "_row_to_episode", "episode"),
+    "beliefs": ListSpec(
+        "beliefs",
+        "created_at",
+        "_row_to_belief",
+        "belief",
+        where="(is_active = 1 OR is_active IS NULL)",
+    ),
+    "values": ListSpec("agent_values", "created_at", "_row_to_value", "value"),
+    "goals": ListSpec("goals", "created_at", "_row_to_goal", "goal", filters=("status",)),
+    "notes": ListSpec("notes", "created_at", "_row_to_note", "note"),
+    "relationships": ListSpec(
+        "relationships", "created_at", "_row_to_relationship", "relationship"
+    ),
+    "drives": ListSpec("drives", "created_at", "_row_to_drive", "drive"),
+    "suggestions": ListSpec(
+        "memory_suggestions",
+        "created_at",
+        "_row_to_suggestion",
+        filters=("status", "memory_type"),
+    ),
+    "audit": ListSpec(
+        "memory_audit",
+        "created_at",
+        None,
+        stack_scoped=False,
+        filters=("memory_type", "operation"),
+        changed_column="created_at",
+    ),
+}
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode the last row's keyset position as an opaque URL-safe token."""
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a token from :func:`encode_cursor` into ``(sort_value, id)``."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {token!r}") from e
+    if not isinstance(row_id, str):
+        raise InvalidCursor(f"Invalid cursor: {token!r}")
+    return sort_value, row_id
+
+
+def _audit_row(row):
+    """Convert a memory_audit row to the dict shape of ``get_audit_log``."""
+    return {
+        "id": row["id"],
+        "memory_type": row["memory_type"],
+        "memory_id": row["memory_id"],
+        "operation": row["operation"],
+        "details": json.loads(row["details"]) if row["details"] else None,
+        "actor": row["actor"],
+        "created_at": row["created_at"],
+        "correlation_id": row["correlation_id"],
+    }
+
+
+def _legacy_list(k, kind, limit, filters):
+    """List via the Stack API for backends without direct SQL access."""
+    stack = k.stack
+    if kind == "raw":
+        return stack.list_raw(processed=filters.get("processed"), limit=limit)
+    if kind == "suggestions":
+        return stack.get_suggestions(limit=limit, **filters)
+    if kind == "audit":
+        return stack.get_audit_log(limit=limit, **filters)
+    if kind == "relationships":
+        return stack.get_relationships()[:limit]
+    if kind == "drives":
+        return stack.get_drives()[:limit]
+    getter = getattr(stack, f"get_{kind}")
+    return getter(limit=limit, include_forgotten=True, include_weak=True, **filters)
+
+
+def supports_keyset(k):
+    """Whether ``k``'s storage can be queried directly with SQL."""
+    from kernle.storage import SQLiteStorage
+
+    return isinstance(getattr(k, "_storage", None), SQLiteStorage)
+
+
+def _converter(k, spec, decay=True):
+    """Return a function turning a batch of ``spec`` rows into list items.
+
+    With ``decay``, memories get kernle's lazy strength decay applied, which
+    persists any strength that moved.
+    """
+    storage = k._storage
+    convert = getattr(storage, spec.row_method) if spec.row_method else _audit_row
+    decay = getattr(k.stack, "_apply_lazy_decay", None) if decay and spec.memory_type else None
+
+    def convert_batch(rows):
+        items = [convert(row) for row in rows]
+        if decay is not None:
+            items = decay(items, spec.memory_type)
+        return items
+
+    return convert_batch
+
+
+def _visible_conditions(spec, storage, filters):
+    """Return ``(conditions, params)`` selecting the rows ``spec``'s list shows."""
+    conditions = ["deleted = 0"] if spec.stack_scoped else ["1=1"]
+    params: List[Any] = []
+    if spec.stack_scoped:
+        conditions.append("stack_id = ?")
+        params.append(storage.stack_id)
+    if spec.where:
+        conditions.append(spec.where)
+    for name, value in filters.items():
+        conditions.append(f"{name} = ?")
+        params.append(int(value) if isinstance(value, bool) else value)
+    return conditions, params
+
+
+class PageStream:
+    """Lazily iterate one page of a list, fetching rows in batches.
+
+    Each batch of ``batch_size`` rows is its own short query, continued
+    from the previous batch's last row, and rows are converted as they are
+    consumed. Memory stays flat however large ``limit`` is, and no read
+    transaction is held open while a slow consumer works through the page.
+    ``next_cursor`` is set once iteration finishes. ``spec`` overrides the
+    list's :class:`ListSpec` and ``decay=False`` skips lazy decay, for
+    readers that must not write.
+    """
+
+    def __init__(
+        self,
+        k,
+        kind,
+        limit,
+        cursor=None,
+        filters=None,
+        batch_size=STREAM_BATCH_SIZE,
+        spec=None,
+        decay=True,
+    ):
+        self.spec = spec or LIST_SPECS[kind]
+        self.kind = kind
+        self.limit = max(1, limit)
+        self.filters = {
+            name: value for name, value in (filters or {}).items() if name in self.spec.filters
+        }
+        self.cursor = decode_cursor(cursor) if cursor else None
+        self.batch_size = max(1, batch_size)
+        self.decay = decay
+        self.next_cursor = None
+        self._k = k
+
+    def _query(self, cursor, limit):
+        spec = self.spec
+        conditions, params = _visible_conditions(spec, self._k._storage, self.filters)
+        if cursor:
+            sort_value, row_id = cursor
+            col = spec.sort_column
+            conditions.append(f"({col} < ? OR ({col} = ? AND id < ?))")
+            params.extend([sort_value, sort_value, row_id])
+        query = (
+            f"SELECT * FROM {spec.table} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {spec.sort_column} DESC, id DESC LIMIT ?"
+        )
+        # One extra row tells us whether more rows follow
+        params.append(limit + 1)
+        return query, params
+
+    def __iter__(self):
+        if not supports_keyset(self._k):
+            # No keyset access: serve the first page only
+            if not self.cursor:
+                yield from _legacy_list(self._k, self.kind, self.limit, self.filters)
+            return
+
+        storage = self._k._storage
+        convert = _converter(self._k, self.spec, self.decay)
+        cursor = self.cursor
+        count = 0
+        has_more = False
+        while count < self.limit:
+            want = min(self.batch_size, self.limit - count)
+            query, params = self._query(cursor, want)
+            with storage._connect() as conn:
+                batch = conn.execute(query, params).fetchall()
+            has_more = len(batch) > want
+            batch = batch[:want]
+            if not batch:
+                break
+            count += len(batch)
+            last = batch[-1]
+            cursor = (last[self.spec.sort_column], last["id"])
+            yield from convert(batch)
+            if not has_more:
+                break
+        if has_more:
+            self.next_cursor = encode_cursor(*cursor)
+
+
+def list_page(k, kind, limit, cursor=None, filters=None):
+    """Return one page of ``kind`` rows, newest first.
+
+    Args:
+        k: Kernle instance.
+        kind: Key of :data:`LIST_SPECS`.
+        limit: Page size, clamped to ``1..MAX_PAGE_SIZE``.
+        cursor: Token from a previous page's ``next_cursor``.
+        filters: Column equality filters allowed by the spec.
+
+    Raises:
+        InvalidCursor: If ``cursor`` is malformed.
+    """
+    limit = min(limit, MAX_PAGE_SIZE)
+    # The page is buffered anyway, so read it in one query
+    stream = PageStream(k, kind, limit, cursor=cursor, filters=filters, batch_size=limit)
+    items = list(stream)
+    return Page(items, stream.next_cursor)
+
+
+def list_changes(k, kind, since, filters=None, limit=MAX_DELTA_ROWS):
+    """Return the :class:`Delta` of ``kind`` rows written at or after ``since``.
+
+    Rows sharing the mark's timestamp are sent again, since a write can
+    land in the same instant after the mark was read; applying a row twice
+    is harmless. An empty ``since`` returns only the current mark, which a
+    client should read *before* loading the list it will patch.
+
+    Args:
+        k: Kernle instance with SQLite storage (see :func:`supports_keyset`).
+        kind: Key of :data:`LIST_SPECS`.
+        since: ``high_water`` of the previous delta, or ``""``.
+        filters: Column equality filters allowed by the spec.
+        limit: Most changed rows to return before asking for a reset.
+
+    Raises:
+        InvalidSince: If ``since`` is not an ISO timestamp.
+    """
+    if since:
+        try:
+            datetime.fromisoformat(since)
+        except ValueError as e:
+            raise InvalidSince(f"Invalid since: {since!r}") from e
+    spec = LIST_SPECS[kind]
+    filters = {name: value for name, value in (filters or {}).items() if name in spec.filters}
+    storage = k._storage
+    changed = f"COALESCE({spec.changed_column}, '')"
+    scope, scope_params = ("stack_id = ?", [storage.stack_id]) if spec.stack_scoped else ("1=1", [])
+
+    with storage._connect() as conn:
+
+        def current_mark():
+            (latest,) = conn.execute(
+                f"SELECT MAX({changed}) FROM {spec.table} WHERE {scope}", scope_params
+            ).fetchone()
+            return max(latest or "", since)
+
+        if not since:
+            return Delta(high_water=current_mark())
+        visible, visible_params = _visible_conditions(spec, storage, filters)
+        rows = conn.execute(
+            f"SELECT *, ({' AND '.join(visible)}) AS _visible, {changed} AS _changed "
+            f"FROM {spec.table} WHERE {scope} AND {changed} >= ? "
+            f"ORDER BY _changed LIMIT ?",
+            [*visible_params, *scope_params, since, limit + 1],
+        ).fetchall()
+        if len(rows) > limit:
+            return Delta(high_water=current_mark(), reset=True)
+
+    delta = Delta(high_water=max([since, *(row["_changed"] for row in rows)]))
+    delta.removed = [row["id"] for row in rows if not row["_visible"]]
+    delta.items = _converter(k, spec)([row for row in rows if row["_visible"]])
+    return delta
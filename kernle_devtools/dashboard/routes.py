@@ -0,0 +1,100 @@
+"""Route registry for the dashboard HTTP handler."""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+# Placeholder converters: ``<name>`` matches one path segment, ``<name:word>``
+# an identifier-like segment.
+_CONVERTERS = {"str": r"[^/]+", "word": r"\w+"}
+_PLACEHOLDER = re.compile(r"<(\w+)(?::(\w+))?>")
+
+
+@dataclass(frozen=True)
+class Route:
+    """One registered endpoint and the metadata dispatch needs for it."""
+
+    path: str
+    handler: Callable
+    cache_ttl: int = 0
+    streaming: bool = False
+    max_limit: Optional[int] = None
+    default_limit: Optional[int] = None
+    defaults: Dict[str, Any] = field(default_factory=dict)
+    regex: Optional[re.Pattern] = None
+
+    @property
+    def cacheable(self):
+        return self.cache_ttl > 0
+
+
+def _bucket(path):
+    """Return the first two path segments, the index key for pattern routes."""
+    return "/".join(path.split("/", 3)[:3])
+
+
+def _compile(path):
+    """Compile a ``/api/raw/<id>`` style path into an anchored regex."""
+    pattern, pos = [], 0
+    for m in _PLACEHOLDER.finditer(path):
+        pattern.append(re.escape(path[pos : m.start()]))
+        converter = m.group(2) or "str"
+        if converter not in _CONVERTERS:
+            raise ValueError(f"Unknown converter {converter!r} in {path!r}")
+        pattern.append(f"(?P<{m.group(1)}>{_CONVERTERS[converter]})")
+        pos = m.end()
+    pattern.append(re.escape(path[pos:]))
+    return re.compile("".join(pattern) + r"\Z")
+
+
+class RouteTable:
+    """Map request paths to routes.
+
+    Static paths resolve with a single dict lookup. Paths with placeholders
+    are compiled once at registration and grouped by their leading
+    ``/segment/segment``, so a request only tries the few patterns that
+    could possibly match it.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, Route] = {}
+        self._patterns: Dict[str, list] = {}
+
+    def add(self, path, handler, **metadata):
+        """Register ``handler`` for ``path``; extra keywords become route metadata."""
+        fields = {name: metadata.pop(name) for name in list(metadata) if name in _ROUTE_FIELDS}
+        if "<" not in path:
+            route = Route(path, handler, defaults=metadata, **fields)
+            self._exact[path] = route
+        else:
+            route = Route(path, handler, defaults=metadata, regex=_compile(path), **fields)
+            self._patterns.setdefault(_bucket(path), []).append(route)
+        return route
+
+    def route(self, path, **metadata):
+        """Decorator form of :meth:`add`."""
+
+        def decorator(handler):
+            self.add(path, handler, **metadata)
+            return handler
+
+        return decorator
+
+    def match(self, path):
+        """Return ``(route, kwargs)`` for ``path``, or ``(None, None)``."""
+        route = self._exact.get(path)
+        if route is not None:
+            return route, route.defaults
+        for route in self._patterns.get(_bucket(path), ()):
+            m = route.regex.match(path)
+            if m is not None:
+                return route, {**route.defaults, **m.groupdict()}
+        return None, None
+
+    def __iter__(self):
+        yield from self._exact.values()
+        for routes in self._patterns.values():
+            yield from routes
+
+
+_ROUTE_FIELDS = {"cache_ttl", "streaming", "max_limit", "default_limit"}
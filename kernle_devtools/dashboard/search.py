@@ -0,0 +1,417 @@
+"""Full-text search over a stack's memories.
+
+The dashboard keeps its own SQLite FTS5 index per stack, in a file next to
+the stack's database (see :func:`index_path`), so it survives restarts and
+stacks being closed. It is built and kept up to date by a background thread:
+each source table is read in short rowid-ordered batches from its
+``local_updated_at`` watermark, which every kernle write bumps, so a sync
+only touches rows written since the last one and never holds a read
+transaction open on the stack. Searches are answered between batches; until
+the first build finishes they raise :class:`IndexBuilding`.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from kernle_devtools.dashboard.changes import stack_version
+from kernle_devtools.dashboard.queries import InvalidCursor, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+SYNC_BATCH_SIZE = 5000
+# How long a search waits for a sync before answering from the index as it is
+SYNC_WAIT = 1.0
+# Watermarks are set this far before a sync starts, so a write stamped just
+# before the sync but committed after its scan passed is still picked up
+SYNC_SLACK = 2.0
+MAX_SEARCH_RESULTS = 200
+SNIPPET_TOKENS = 16
+SCHEMA_VERSION = "1"
+
+
+class IndexBuilding(Exception):
+    """Raised by a search while the index's first build is still running."""
+
+    def __init__(self, documents):
+        super().__init__(f"Search index is being built ({documents} documents so far)")
+        self.documents = documents
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    """Which text columns of one memory table are indexed."""
+
+    table: str
+    title: str
+    body: str
+
+
+SEARCH_SOURCES = {
+    "raw": SearchSource("raw_entries", "COALESCE(blob, content, '')", "''"),
+    "episode": SearchSource("episodes", "COALESCE(objective, '')", "COALESCE(outcome, '')"),
+    "belief": SearchSource("beliefs", "COALESCE(statement, '')", "''"),
+    "note": SearchSource("notes", "COALESCE(content, '')", "''"),
+    "goal": SearchSource("goals", "COALESCE(title, '')", "COALESCE(description, '')"),
+}
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    title, body, memory_type UNINDEXED, memory_id UNINDEXED,
+    tokenize = 'porter unicode61', prefix = '2 3'
+);
+CREATE TABLE IF NOT EXISTS doc_ids (
+    memory_type TEXT NOT NULL,
+    memory_id TEXT NOT NULL,
+    doc_rowid INTEGER NOT NULL,
+    PRIMARY KEY (memory_type, memory_id)
+);
+CREATE TABLE IF NOT EXISTS watermarks (memory_type TEXT PRIMARY KEY, updated_at TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+_TABLES = ("docs", "doc_ids", "watermarks", "meta")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# bm25 with title matches weighted double the body (lower is better)
+_SCORE = "bm25(docs, 2.0, 1.0)"
+
+
+def fts_query(text):
+    """Turn free text into a safe FTS5 query.
+
+    Every word must match (implicit AND) and the last word also matches as a
+    prefix, so results narrow as the user types. FTS5 operators in the input
+    are treated as plain words.
+    """
+    tokens = _TOKEN.findall(text or "")
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def snippet(text, terms, width=SNIPPET_TOKENS):
+    """Return about ``width`` words of ``text`` around the first matching term.
+
+    Words starting with a query term are wrapped in ``[`` ``]``; the prefix
+    test also catches most stemmed variants ("fox" highlights "foxes").
+    """
+    words = text.split()
+
+    def matches(word):
+        word = word.lower().strip(".,;:!?\"'()[]{}")
+        return any(word.startswith(term) for term in terms)
+
+    first = next((i for i, word in enumerate(words) if matches(word)), 0)
+    start = max(0, min(first - width // 4, len(words) - width))
+    window = words[start : start + width]
+    out = " ".join(f"[{word}]" if matches(word) else word for word in window)
+    if start > 0:
+        out = "…" + out
+    if start + width < len(words):
+        out += "…"
+    return out
+
+
+def _sqlite_storage(k):
+    from kernle.storage import SQLiteStorage
+
+    storage = getattr(k, "_storage", None)
+    if not isinstance(storage, SQLiteStorage):
+        raise NotImplementedError("Search requires SQLite storage")
+    return storage
+
+
+def index_path(k, stack_id=None):
+    """Where the search index of a stack in ``k``'s database is kept.
+
+    ``<db dir>/<db name>.search/<stack_id>.db`` (``k``'s own stack by
+    default): keyed by database and stack, and owned by devtools rather
+    than kept in kernle's database. None without SQLite storage.
+    """
+    try:
+        storage = _sqlite_storage(k)
+    except NotImplementedError:
+        return None
+    db_path = Path(storage.db_path)
+    return db_path.parent / f"{db_path.stem}.search" / f"{stack_id or storage.stack_id}.db"
+
+
+class SearchIndex:
+    """FTS5 index of one stack, synced from its tables in the background.
+
+    With a ``path`` the index is kept in that file and reopened where it
+    left off; without one it lives in memory.
+    """
+
+    def __init__(self, path=None, batch_size=SYNC_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._conn = self._open(path)
+        # _lock guards the connection; _sync_lock lets one sync run at a time
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._version = None
+        built = self._conn.execute("SELECT 1 FROM meta WHERE key = 'built'").fetchone()
+        self.built = built is not None
+        self.documents = self._conn.execute("SELECT COUNT(*) FROM doc_ids").fetchone()[0]
+
+    @staticmethod
+    def _open(path):
+        if path is None:
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if row is not None and row[0] != SCHEMA_VERSION:
+            # Written by another version of devtools: start over
+            for table in _TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.executescript(_SCHEMA)
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema', ?)", (SCHEMA_VERSION,)
+        )
+        conn.commit()
+        return conn
+
+    @property
+    def syncing(self):
+        """Whether a background sync is running."""
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def start_sync(self, k):
+        """Sync on a background thread unless one is already running; return the thread."""
+        with self._lock:
+            if self._closed:
+                return None
+            if not self.syncing:
+                self._thread = threading.Thread(
+                    target=self._sync_logged, args=(k,), name="search-index", daemon=True
+                )
+                self._thread.start()
+            return self._thread
+
+    def _sync_logged(self, k):
+        try:
+            self.sync(k)
+        except Exception:
+            logger.exception("Search index sync failed")
+
+    def sync(self, k):
+        """Index rows written since the last sync, in the calling thread. Returns rows processed."""
+        storage = _sqlite_storage(k)
+        with self._sync_lock:
+            version = stack_version(k)
+            if version == self._version or self._closed:
+                return 0
+            processed = 0
+            for memory_type, spec in SEARCH_SOURCES.items():
+                processed += self._sync_source(storage, memory_type, spec)
+                if self._closed:
+                    return processed
+            with self._lock:
+                if not self.built:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO meta (key, value) VALUES ('built', '1')"
+                    )
+                    self._conn.commit()
+                    self.built = True
+            self._version = version
+        if processed:
+            logger.debug("Search index synced %d rows", processed)
+        return processed
+
+    def _sync_source(self, storage, memory_type, spec):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at FROM watermarks WHERE memory_type = ?", (memory_type,)
+            ).fetchone()
+            initial = row is None
+            if initial:
+                # Drop anything an interrupted first build left behind
+                self._clear(memory_type)
+        watermark = "" if initial else row[0]
+        mark = (datetime.now(timezone.utc) - timedelta(seconds=SYNC_SLACK)).isoformat()
+        # >= so rows sharing the watermark's timestamp aren't skipped;
+        # re-indexing them is idempotent.
+        query = (
+            f"SELECT rowid, id, {spec.title}, {spec.body}, deleted FROM {spec.table} "
+            "WHERE stack_id = ? AND rowid > ? AND COALESCE(local_updated_at, '') >= ? "
+            "ORDER BY rowid LIMIT ?"
+        )
+        processed = 0
+        after = 0
+        while not self._closed:
+            # A short read per batch, so the stack's WAL can be checkpointed
+            # however long the build takes
+            with storage._connect() as source:
+                batch = source.execute(
+                    query, (storage.stack_id, after, watermark, self.batch_size)
+                ).fetchall()
+            if not batch:
+                break
+            with self._lock:
+                if self._closed:
+                    break
+                for _, memory_id, title, body, deleted in batch:
+                    if not initial:
+                        self._remove(memory_type, memory_id)
+                    if not deleted:
+                        self._add(memory_type, memory_id, title, body)
+                self._conn.commit()
+            after = batch[-1][0]
+            processed += len(batch)
+            if len(batch) < self.batch_size:
+                break
+        else:
+            return processed
+        with self._lock:
+            if not self._closed:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO watermarks (memory_type, updated_at) VALUES (?, ?)",
+                    (memory_type, max(watermark, mark)),
+                )
+                self._conn.commit()
+        return processed
+
+    def _clear(self, memory_type):
+        self._conn.execute("DELETE FROM docs WHERE memory_type = ?", (memory_type,))
+        removed = self._conn.execute(
+            "DELETE FROM doc_ids WHERE memory_type = ?", (memory_type,)
+        ).rowcount
+        self.documents -= max(removed, 0)
+
+    def _remove(self, memory_type, memory_id):
+        row = self._conn.execute(
+            "SELECT doc_rowid FROM doc_ids WHERE memory_type = ? AND memory_id = ?",
+            (memory_type, memory_id),
+        ).fetchone()
+        if row is None:
+            return
+        self._conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+        self._conn.execute(
+            "DELETE FROM doc_ids WHERE memory_type = ? AND memory_id = ?",
+            (memory_type, memory_id),
+        )
+        self.documents -= 1
+
+    def _add(self, memory_type, memory_id, title, body):
+        cur = self._conn.execute(
+            "INSERT INTO docs (title, body, memory_type, memory_id) VALUES (?, ?, ?, ?)",
+            (title, body, memory_type, memory_id),
+        )
+        self._conn.execute(
+            "INSERT INTO doc_ids (memory_type, memory_id, doc_rowid) VALUES (?, ?, ?)",
+            (memory_type, memory_id, cur.lastrowid),
+        )
+        self.documents += 1
+
+    def catch_up(self, k, wait):
+        """Start syncing if the stack changed and wait up to ``wait`` seconds for it."""
+        deadline = time.monotonic() + wait
+        # A sync already running may have started before the latest write,
+        # so give a second one the rest of the wait
+        for _ in range(2):
+            if stack_version(k) == self._version:
+                return
+            thread = self.start_sync(k)
+            remaining = deadline - time.monotonic()
+            if thread is None or remaining <= 0:
+                return
+            thread.join(remaining)
+
+    def search(self, k, text, types=None, limit=50, cursor=None, wait=None):
+        """Return ``(hits, next_cursor)`` for ``text``, best matches first.
+
+        Hits are dicts with ``type``, ``id``, ``snippet`` (matches wrapped in
+        ``[`` ``]``) and ``rank`` (bm25; lower is better). Pages are keyed on
+        ``(rank, rowid)`` so paging never re-scores skipped rows. Writes the
+        background sync hasn't reached within ``wait`` seconds (default
+        :data:`SYNC_WAIT`) are missing from the results; :attr:`syncing`
+        tells when that may be so.
+
+        Raises:
+            InvalidCursor: If ``cursor`` is malformed.
+            IndexBuilding: If the first build hasn't finished within ``wait``.
+            NotImplementedError: If ``k``'s storage isn't SQLite.
+        """
+        query = fts_query(text)
+        if query is None:
+            return [], None
+        after = decode_cursor(cursor) if cursor else None
+        _sqlite_storage(k)
+        self.catch_up(k, SYNC_WAIT if wait is None else wait)
+        if not self.built:
+            raise IndexBuilding(self.documents)
+
+        limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+        sql = f"SELECT rowid, {_SCORE} AS score FROM docs WHERE docs MATCH ?"
+        params = [query]
+        if types:
+            sql += f" AND memory_type IN ({','.join('?' * len(types))})"
+            params.extend(types)
+        if after is not None:
+            rank, rowid = after
+            try:
+                rowid = int(rowid)
+            except ValueError as e:
+                raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+            sql += f" AND ({_SCORE} > ? OR ({_SCORE} = ? AND rowid > ?))"
+            params.extend([rank, rank, rowid])
+        sql += " ORDER BY score, rowid LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            ranked = self._conn.execute(sql, params).fetchall()
+            next_cursor = None
+            if len(ranked) > limit:
+                ranked = ranked[:limit]
+                next_cursor = encode_cursor(ranked[-1][1], str(ranked[-1][0]))
+            # Fetch text for the page only. FTS5's snippet() re-runs the
+            # match per row, which costs more than the ranking query itself.
+            details = {}
+            if ranked:
+                rowids = [rowid for rowid, _ in ranked]
+                for rowid, memory_type, memory_id, title, body in self._conn.execute(
+                    "SELECT rowid, memory_type, memory_id, title, body FROM docs "
+                    f"WHERE rowid IN ({','.join('?' * len(rowids))})",
+                    rowids,
+                ):
+                    details[rowid] = (memory_type, memory_id, title, body)
+        terms = [token.lower() for token in _TOKEN.findall(text)]
+        hits = []
+        for rowid, score in ranked:
+            memory_type, memory_id, title, body = details[rowid]
+            hits.append(
+                {
+                    "type": memory_type,
+                    "id": memory_id,
+                    "snippet": snippet(f"{title} {body}".strip(), terms),
+                    "rank": score,
+                }
+            )
+        return hits, next_cursor
+
+    def close(self):
+        """Stop any running sync at its next batch and close the index."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,158 @@
+"""JSON serialization and field projection for dashboard responses."""
+
+import dataclasses
+import functools
+from datetime import datetime
+
+# Columns each list table renders. List endpoints project to these by
+# default so embeddings, sync metadata and unused columns never leave the
+# server; detail views ask for ``fields=*``.
+TABLE_FIELDS = {
+    "raw": ("id", "processed", "captured_at", "source", "blob", "content", "processed_into"),
+    "episodes": (
+        "id",
+        "objective",
+        "outcome",
+        "confidence",
+        "strength",
+        "emotional_valence",
+        "emotional_arousal",
+        "created_at",
+    ),
+    "beliefs": (
+        "id",
+        "statement",
+        "belief_type",
+        "confidence",
+        "strength",
+        "belief_scope",
+        "created_at",
+    ),
+    "values": ("id", "name", "statement", "priority", "confidence", "strength", "created_at"),
+    "goals": ("id", "title", "goal_type", "priority", "status", "strength", "created_at"),
+    "notes": (
+        "id",
+        "content",
+        "note_type",
+        "confidence",
+        "strength",
+        "processed",
+        "created_at",
+    ),
+    "relationships": (
+        "id",
+        "entity_name",
+        "entity_type",
+        "relationship_type",
+        "sentiment",
+        "strength",
+        "interaction_count",
+    ),
+    "drives": ("id", "drive_type", "intensity", "strength", "focus_areas", "created_at"),
+}
+
+TRUNCATION_MARKER = "…"
+
+
+# type -> compiled serializer, filled lazily by _serializer_for()
+_SERIALIZERS = {}
+_PRIMITIVES = frozenset({str, int, float, bool, type(None)})
+_MISSING = object()
+
+
+def _compile_serializer(cls, fields=None):
+    """Generate a function converting ``cls`` instances to dicts.
+
+    The generated code reads each field directly and passes primitives
+    through untouched, so unlike ``dataclasses.asdict`` it never deep-copies
+    the record and walks it only once. Non-primitive values (datetimes,
+    lists, nested dataclasses) go through :func:`serialize`.
+    """
+    names = fields if fields is not None else [f.name for f in dataclasses.fields(cls)]
+    names = [name for name in names if name.isidentifier()]
+    lines = ["def _serialize_record(obj):", "    out = {}"]
+    for name in names:
+        lines.append(f"    v = getattr(obj, {name!r}, _MISSING)")
+        lines.append("    if v is not _MISSING:")
+        lines.append(f"        out[{name!r}] = v if v.__class__ in _PRIMITIVES else _serialize(v)")
+    lines.append("    return out")
+    namespace = {"_MISSING": _MISSING, "_PRIMITIVES": _PRIMITIVES, "_serialize": serialize}
+    exec("\n".join(lines), namespace)  # noqa: S102 — names are validated identifiers
+    fn = namespace["_serialize_record"]
+    fn.__qualname__ = f"serialize_{cls.__name__}"
+    return fn
+
+
+def _serializer_for(cls):
+    """Return the cached full-record serializer for dataclass ``cls``."""
+    fn = _SERIALIZERS.get(cls)
+    if fn is None:
+        fn = _SERIALIZERS[cls] = _compile_serializer(cls)
+    return fn
+
+
+@functools.lru_cache(maxsize=256)
+def _projector_for(cls, fields):
+    """Return a cached serializer for a ``fields`` subset of dataclass ``cls``."""
+    return _compile_serializer(cls, fields)
+
+
+def serialize(obj):
+    """Convert kernle dataclasses/objects to JSON-serializable dicts."""
+    fn = _SERIALIZERS.get(obj.__class__)
+    if fn is not None:
+        return fn(obj)
+    if obj is None:
+        return None
+    if isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, (list, tuple)):
+        return [serialize(item) for item in obj]
+    if isinstance(obj, dict):
+        return {k: serialize(v) for k, v in obj.items()}
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return _serializer_for(obj.__class__)(obj)
+    return str(obj)
+
+
+def parse_fields(value, default=None):
+    """Parse a ``fields`` query value into a tuple of names, or None for all.
+
+    ``None`` (param absent) yields ``default``; ``*`` selects every field.
+    """
+    if value is None:
+        return default
+    value = value.strip()
+    if value in ("", "*"):
+        return None
+    return tuple(name.strip() for name in value.split(",") if name.strip())
+
+
+def _truncate(value, limit):
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit] + TRUNCATION_MARKER
+    return value
+
+
+def project(obj, fields=None, truncate=None):
+    """Serialize only ``fields`` of a record, optionally truncating long strings.
+
+    Only the selected attributes are read and converted, so unused columns
+    (and any embedding vectors) cost nothing. Unknown field names are
+    ignored. Non-record values are serialized unchanged.
+    """
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        if fields is None:
+            out = _serializer_for(obj.__class__)(obj)
+        else:
+            out = _projector_for(obj.__class__, tuple(fields))(obj)
+    elif isinstance(obj, dict):
+        names = fields if fields is not None else obj.keys()
+        out = {name: serialize(obj[name]) for name in names if name in obj}
+    else:
+        return serialize(obj)
+    if truncate:
+        out = {name: _truncate(value, truncate) for name, value in out.items()}
+    return out
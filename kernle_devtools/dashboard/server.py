@@ -1,58 +1,413 @@
 """Dashboard HTTP server — serves API endpoints and HTML dashboard."""
 
-import dataclasses
+import contextlib
+import functools
 import json
 import logging
 import re
-from datetime import datetime
-from http.server import BaseHTTPRequestHandler
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import parse_qs, urlparse
 
-logger = logging.getLogger(__name__)
+from kernle_devtools.dashboard.cache import ResponseCache
+from kernle_devtools.dashboard.changes import stack_version
+from kernle_devtools.dashboard.encoding import (
+    SUPPORTED_ENCODINGS,
+    EncodedBody,
+    etag_matches,
+    negotiate_encoding,
+)
+from kernle_devtools.dashboard.events import EventStream
+from kernle_devtools.dashboard.export import (
+    CONTENT_TYPES,
+    DEFAULT_EXPORT_BATCH,
+    EXPORT_FORMATS,
+    export_stack,
+    parse_kinds,
+)
+from kernle_devtools.dashboard.metrics import PhaseTimer, RequestMetrics
+from kernle_devtools.dashboard.provenance import (
+    DEFAULT_GRAPH_DEPTH,
+    MAX_BULK_IDS,
+    derivation_counts,
+    provenance_graph,
+)
+from kernle_devtools.dashboard.queries import (
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    InvalidSince,
+    PageStream,
+    list_changes,
+    list_page,
+    supports_keyset,
+)
+from kernle_devtools.dashboard.routes import RouteTable
+from kernle_devtools.dashboard.search import SEARCH_SOURCES, IndexBuilding
+from kernle_devtools.dashboard.serialization import (
+    TABLE_FIELDS,
+    parse_fields,
+    project,
+    serialize,
+)
+from kernle_devtools.dashboard.stacks import (
+    StackContext,
+    StackPool,
+    fleet_stats,
+    split_stack_path,
+)
+from kernle_devtools.dashboard.streaming import StreamWriter, json_array, json_envelope
 
+logger = logging.getLogger(__name__)
 
-def serialize(obj):
-    """Convert kernle dataclasses/objects to JSON-serializable dicts."""
-    if obj is None:
-        return None
-    if isinstance(obj, (str, int, float, bool)):
-        return obj
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    if isinstance(obj, (list, tuple)):
-        return [serialize(item) for item in obj]
-    if isinstance(obj, dict):
-        return {k: serialize(v) for k, v in obj.items()}
-    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
-        return {k: serialize(v) for k, v in dataclasses.asdict(obj).items()}
-    return str(obj)
+DEFAULT_WORKERS = 8
+
+MEMORY_TYPES = {"raw", "episode", "belief", "value", "goal", "note", "drive", "relationship"}
+
+# List endpoints served by keyset pagination: path -> list kind
+LIST_ENDPOINTS = {
+    "/api/raw": "raw",
+    "/api/episodes": "episodes",
+    "/api/beliefs": "beliefs",
+    "/api/values": "values",
+    "/api/goals": "goals",
+    "/api/notes": "notes",
+    "/api/relationships": "relationships",
+    "/api/drives": "drives",
+    "/api/suggestions": "suggestions",
+    "/api/audit": "audit",
+}
+# Whole-stack queries /api/batch can combine, called with the handler and
+# Kernle. Each also has its own /api/<name> endpoint and shares that
+# endpoint's cache entry.
+BATCH_QUERIES = {
+    "stats": lambda handler, k: k.stack.get_stats(),
+    "anxiety": lambda handler, k: handler._anxiety_report(k),
+    "processing": lambda handler, k: k.stack.get_processing_config(),
+    "settings": lambda handler, k: k.stack.get_all_stack_settings(),
+}
+
+LIST_DEFAULT_LIMITS = {"raw": 200}
+LIST_DEFAULT_LIMIT = 100
+# Lists above this many rows are streamed (also forced with ?stream=1|0).
+# Streamed lists aren't bound by the buffered MAX_PAGE_SIZE.
+STREAM_MIN_ROWS = 500
+STREAM_MAX_ROWS = 1_000_000
+
+
+# Response cache TTLs in seconds, set per route below. Entries are also
+# dropped as soon as the stack changes; the TTL bounds staleness of
+# time-dependent results. The anxiety report ages out in its refresher.
+LIST_CACHE_TTL = 5
+DETAIL_CACHE_TTL = 30
+
+ROUTES = RouteTable()
+route = ROUTES.route
+
+
+@functools.lru_cache(maxsize=None)
+def _dashboard_page():
+    """Return the dashboard HTML as an EncodedBody, built once per process."""
+    from kernle_devtools.dashboard.templates import DASHBOARD_HTML
+
+    return EncodedBody(DASHBOARD_HTML.encode("utf-8"), level=9)
+
+
+class DashboardServer(HTTPServer):
+    """HTTPServer that serves requests from a bounded pool of worker threads.
+
+    Each worker resolves its own Kernle through ``kernle_handles`` so a slow
+    endpoint only ties up one worker instead of the whole server.
+
+    ``kernle_handles`` is the default stack, served at the top level. With
+    ``max_stacks`` > 0 and SQLite storage, every other stack in the same
+    database is also served under ``/s/<stack_id>/`` from a pool of at most
+    that many open stacks.
+    """
+
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        kernle_handles,
+        workers=DEFAULT_WORKERS,
+        response_cache=None,
+        watcher=None,
+        max_stacks=0,
+    ):
+        super().__init__(server_address, handler_class)
+        self.kernle_handles = kernle_handles
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.metrics = RequestMetrics()
+        self.default_stack = StackContext(
+            kernle_handles.stack_id, kernle_handles, metrics=self.metrics, watcher=watcher
+        )
+        self.stacks = None
+        template = getattr(kernle_handles, "template", None)
+        if max_stacks > 0 and StackPool.supported(template):
+            self.stacks = StackPool(template, metrics=self.metrics, max_stacks=max_stacks)
+        self.workers = max(1, workers)
+        self._detached = set()
+        self._detached_lock = threading.Lock()
+        page = _dashboard_page()
+        for encoding in SUPPORTED_ENCODINGS:
+            page.encoded(encoding)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="dashboard-worker"
+        )
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def service_actions(self):
+        if self.stacks is not None:
+            self.stacks.close_idle()
+
+    def detach(self, request, watcher, events, on_close=None):
+        """Hand ``request``'s socket to a dedicated event stream thread.
+
+        The worker that accepted the request returns immediately; the
+        socket is shut down once the stream ends instead.
+        """
+        with self._detached_lock:
+            self._detached.add(request)
+        wfile = request.makefile("wb")
+
+        def release():
+            with self._detached_lock:
+                self._detached.discard(request)
+            super(DashboardServer, self).shutdown_request(request)
+            if on_close is not None:
+                on_close()
+
+        EventStream(watcher, events, wfile, on_close=release).start()
+
+    def shutdown_request(self, request):
+        with self._detached_lock:
+            if request in self._detached:
+                return
+        super().shutdown_request(request)
+
+    def server_close(self):
+        self.default_stack.stop()
+        if self.stacks is not None:
+            self.stacks.close()
+        super().server_close()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.default_stack.close()
 
 
 class DashboardHandler(BaseHTTPRequestHandler):
     """HTTP request handler for the dashboard."""
 
-    kernle_instance = None  # Set by server setup
+    kernle_instance = None  # Fallback when not served by DashboardServer
+    stack = None  # StackContext this request is for
+    stack_prefix = ""  # "/s/<stack_id>" when addressed by stack
+    _timer = None
+    _status = None
+    _bytes = 0
 
     def log_message(self, format, *args):
         logger.info(format, *args)
 
+    def _kernle(self):
+        """Return this thread's Kernle for the stack this request is for."""
+        if self.stack is not None:
+            return self.stack.handles.get()
+        return self.__class__.kernle_instance
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def _phase(self, name):
+        """Time a block as ``name`` in this request's metrics, if instrumented."""
+        timer = self._timer
+        return timer.phase(name) if timer is not None else contextlib.nullcontext()
+
+    def _send_result(self, result):
+        """Serialize a kernle result and send it as JSON."""
+        with self._phase("serialize"):
+            data = serialize(result)
+        return self._send_json(data)
+
     def _send_json(self, data, status=200):
-        body = json.dumps(data, default=str).encode("utf-8")
+        with self._phase("serialize"):
+            body = EncodedBody(json.dumps(data, default=str).encode("utf-8"))
+        self._send_encoded(body, status)
+
+    def _send_encoded(self, body, status=200):
+        """Send a JSON EncodedBody, filling this request's cache slot."""
+        slot = getattr(self, "_cache_slot", None)
+        if slot is not None and status == 200:
+            key, version, ttl = slot
+            self.server.response_cache.put(key, version, body, ttl)
+        self._send_body(body, "application/json", status, cache_status="MISS" if slot else None)
+
+    def _send_html(self, html):
+        self._send_body(EncodedBody(html.encode("utf-8")), "text/html; charset=utf-8")
+
+    def _send_body(self, body, content_type, status=200, cache_status=None):
+        """Write an EncodedBody, negotiating compression and conditional GETs."""
+        with self._phase("write"):
+            self._write_body(body, content_type, status, cache_status)
+
+    def _write_body(self, body, content_type, status, cache_status):
+        data, encoding, tag = body.encoded(negotiate_encoding(self.headers.get("Accept-Encoding")))
+        if status != 200:
+            tag = None
+        if tag and etag_matches(self.headers.get("If-None-Match"), tag):
+            self.send_response(304)
+            self.send_header("ETag", tag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            if cache_status:
+                self.send_header("X-Cache", cache_status)
+            self.end_headers()
+            return
         self.send_response(status)
-        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Type", content_type)
         self.send_header("X-Content-Type-Options", "nosniff")
-        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if tag:
+            self.send_header("ETag", tag)
+            self.send_header("Cache-Control", "no-cache")
+        if cache_status:
+            self.send_header("X-Cache", cache_status)
+        self.send_header("Content-Length", str(len(data)))
         self.end_headers()
-        self.wfile.write(body)
-
-    def _send_html(self, html):
-        body = html.encode("utf-8")
+        self.wfile.write(data)
+        self._bytes = len(data)
+
+    def _query_body(self, k, name, version):
+        """Return the EncodedBody of ``/api/<name>``, from the cache if fresh."""
+        cache = getattr(self.server, "response_cache", None)
+        path = f"/api/{name}"
+        key = (self.stack_prefix + path, ())
+        if cache is not None and version is not None:
+            body = cache.get(key, version)
+            if body is not None:
+                return body
+        result = BATCH_QUERIES[name](self, k)
+        with self._phase("serialize"):
+            body = EncodedBody(json.dumps(serialize(result), default=str).encode("utf-8"))
+        if cache is not None and version is not None:
+            cache.put(key, version, body, ROUTES.match(path)[0].cache_ttl)
+        return body
+
+    @route("/api/batch", cache_ttl=LIST_CACHE_TTL)
+    def _get_batch(self, k, params):
+        """Answer several whole-stack queries in one response.
+
+        ``?q=stats,anxiety`` returns ``{"stats": ..., "anxiety": ...}``. Each
+        part is read from or written to its own endpoint's cache entry, and
+        the already-encoded JSON is spliced in without re-serializing.
+        """
+        names = []
+        for value in params.get("q", []):
+            names.extend(name.strip() for name in value.split(",") if name.strip())
+        if not names:
+            return self._send_error(400, "Missing q parameter")
+        unknown = [name for name in names if name not in BATCH_QUERIES]
+        if unknown:
+            return self._send_error(400, f"Unknown query: {unknown[0]}")
+
+        slot = getattr(self, "_cache_slot", None)
+        version = slot[1] if slot else None
+        if any(not ROUTES.match(f"/api/{name}")[0].cacheable for name in names):
+            # Parts still share their endpoints' cache entries
+            self._cache_slot = None
+        parts = []
+        for name in dict.fromkeys(names):
+            part = self._query_body(k, name, version)
+            parts.append(json.dumps(name).encode("utf-8") + b":" + part.body)
+        return self._send_encoded(EncodedBody(b"{" + b",".join(parts) + b"}"))
+
+    def _send_stream(self, chunks, content_type="application/json", filename=None, compress=False):
+        """Stream an iterable of encoded fragments without buffering the body.
+
+        HTTP/1.1 clients get ``Transfer-Encoding: chunked``; HTTP/1.0 clients
+        get a close-delimited body. Either way the connection is closed
+        afterwards so a long download never pins a worker for keep-alive.
+        Streamed bodies skip the response cache and carry no ETag.
+
+        ``filename`` makes the body a download; with ``compress`` it is a
+        gzip file rather than gzip-encoded for transfer.
+        """
+        if compress:
+            encoding = "gzip"
+        else:
+            encoding = negotiate_encoding(self.headers.get("Accept-Encoding"))
+        chunked = self.request_version == "HTTP/1.1"
+        if chunked:
+            self.protocol_version = "HTTP/1.1"
         self.send_response(200)
-        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Type", content_type)
         self.send_header("X-Content-Type-Options", "nosniff")
-        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if filename:
+            self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        if encoding and not compress:
+            self.send_header("Content-Encoding", encoding)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        writer = StreamWriter(self.wfile, chunked=chunked, encoding=encoding)
+        try:
+            for chunk in chunks:
+                with self._phase("write"):
+                    writer.write(chunk)
+            with self._phase("write"):
+                writer.close()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Client went away while streaming %s", self.path)
+        except Exception:
+            # Headers are already out; dropping the connection without the
+            # final chunk tells the client the body is incomplete.
+            logger.exception("Error while streaming %s", self.path)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            self.close_connection = True
+            self._bytes = writer.bytes_written
+
+    @route("/api/events")
+    def _get_events(self, k, params):
+        """Open a Server-Sent Events feed of stack changes."""
+        stack = self.stack
+        detach = getattr(self.server, "detach", None)
+        if stack is None or detach is None:
+            return self._send_error(404, "Not found")
+        watcher = stack.watcher
+        events = watcher.subscribe()
+        if events is None:
+            return self._send_error(503, "Too many event streams")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
         self.end_headers()
-        self.wfile.write(body)
+        self.wfile.flush()
+        self.close_connection = True
+        on_close = None
+        if stack.pool is not None:
+            # Keep the stack open for as long as the stream is
+            stack.pool.retain(stack)
+            on_close = functools.partial(stack.pool.release, stack)
+        detach(self.connection, watcher, events, on_close=on_close)
 
     def _send_error(self, status, message):
         self._send_json({"error": message}, status)
@@ -71,105 +426,362 @@ class DashboardHandler(BaseHTTPRequestHandler):
             return None
         return vals[0].lower() in ("true", "1", "yes")
 
-    def do_GET(self):  # noqa: N802
-        from kernle_devtools.dashboard.templates import DASHBOARD_HTML
+    def _list_filters(self, params):
+        """Collect list filters from query params; unknown ones are ignored per list."""
+        filters = {}
+        processed = self._get_bool_param(params, "processed")
+        if processed is not None:
+            filters["processed"] = processed
+        for name in ("status", "memory_type", "operation"):
+            vals = params.get(name, [])
+            if vals and vals[0]:
+                filters[name] = vals[0]
+        return filters
+
+    def _projection(self, params, default_fields=None):
+        """Return ``(fields, truncate)`` from the ``fields``/``truncate`` params."""
+        vals = params.get("fields")
+        fields = parse_fields(vals[0] if vals else None, default_fields)
+        truncate = self._get_int_param(params, "truncate", 0)
+        return fields, truncate if truncate > 0 else None
+
+    def _get_list(self, k, params, kind):
+        """Serve one page of a list endpoint.
+
+        Without a ``cursor`` param the response is a bare JSON array, as it
+        always has been. Passing ``cursor`` (empty for the first page) opts
+        into the ``{"items": [...], "next_cursor": ...}`` envelope, and
+        ``since`` asks for a delta instead (see :meth:`_get_list_changes`).
+        """
+        limit = self._get_int_param(params, "limit", self.route.default_limit or LIST_DEFAULT_LIMIT)
+        cursor_vals = params.get("cursor")
+        cursor = cursor_vals[0] if cursor_vals else None
+        filters = self._list_filters(params)
+        fields, truncate = self._projection(params, TABLE_FIELDS.get(kind))
+        since_vals = params.get("since")
+        if since_vals is not None:
+            return self._get_list_changes(k, kind, since_vals[0], filters, fields, truncate)
+        streaming = self._get_bool_param(params, "stream")
+        if streaming is None:
+            streaming = limit > STREAM_MIN_ROWS
+        streaming = streaming and self.route.streaming
+
+        if streaming:
+            try:
+                stream = PageStream(
+                    k,
+                    kind,
+                    min(limit, self.route.max_limit),
+                    cursor=cursor or None,
+                    filters=filters,
+                )
+            except InvalidCursor:
+                return self._send_error(400, "Invalid cursor")
+
+            def convert(item):
+                with self._phase("serialize"):
+                    return project(item, fields, truncate)
+
+            if cursor_vals is None:
+                return self._send_stream(json_array(stream, convert))
+            return self._send_stream(json_envelope(stream, convert))
+
+        try:
+            page = list_page(k, kind, limit, cursor=cursor or None, filters=filters)
+        except InvalidCursor:
+            return self._send_error(400, "Invalid cursor")
+        with self._phase("serialize"):
+            items = [project(item, fields, truncate) for item in page.items]
+        if cursor_vals is None:
+            return self._send_json(items)
+        return self._send_json({"items": items, "next_cursor": page.next_cursor})
+
+    def _get_list_changes(self, k, kind, since, filters, fields, truncate):
+        """Serve the rows of a list written since the ``since`` high-water mark.
+
+        Responds ``{"items", "removed", "high_water", "reset"}``; pass the
+        ``high_water`` back as the next ``since``. An empty ``since`` only
+        returns the current mark.
+        """
+        if not supports_keyset(k):
+            return self._send_error(501, "Delta sync requires SQLite storage")
+        try:
+            delta = list_changes(k, kind, since, filters=filters)
+        except InvalidSince:
+            return self._send_error(400, "Invalid since")
+        with self._phase("serialize"):
+            items = [project(item, fields, truncate) for item in delta.items]
+        return self._send_json(
+            {
+                "items": items,
+                "removed": delta.removed,
+                "high_water": delta.high_water,
+                "reset": delta.reset,
+            }
+        )
+
+    @route("", cache_ttl=0)
+    def _get_page(self, k, params):
+        return self._send_body(_dashboard_page(), "text/html; charset=utf-8")
+
+    @route("/api/cache")
+    def _get_cache(self, k, params):
+        cache = getattr(self.server, "response_cache", None)
+        if cache is None:
+            return self._send_json({"enabled": False})
+        return self._send_json({"enabled": True, **cache.stats()})
+
+    @route("/metrics")
+    def _get_metrics(self, k, params):
+        """Prometheus scrape endpoint."""
+        metrics = getattr(self.server, "metrics", None)
+        text = metrics.render() if metrics is not None else ""
+        return self._send_body(
+            EncodedBody(text.encode("utf-8")), "text/plain; version=0.0.4; charset=utf-8"
+        )
+
+    @route("/api/metrics")
+    def _get_metrics_summary(self, k, params):
+        metrics = getattr(self.server, "metrics", None)
+        return self._send_json(metrics.summary() if metrics is not None else [])
+
+    def _stack_ids(self):
+        """Every stack this server can show, the default one included."""
+        ids = {self.server.default_stack.stack_id}
+        if self.server.stacks is not None:
+            ids.update(self.server.stacks.available())
+        return sorted(ids)
+
+    @route("/api/stacks")
+    def _get_stacks(self, k, params):
+        """Stacks for the stack picker, and which one this page is showing."""
+        if self.stack is None:
+            return self._send_json({"current": k.stack_id, "multi_stack": False, "stacks": []})
+        pool = self.server.stacks
+        return self._send_json(
+            {
+                "current": self.stack.stack_id,
+                "default": self.server.default_stack.stack_id,
+                "multi_stack": pool is not None,
+                "stacks": self._stack_ids() if pool is not None else [self.stack.stack_id],
+                "open": pool.open_stack_ids() if pool is not None else [],
+            }
+        )
+
+    @route("/api/fleet", cache_ttl=LIST_CACHE_TTL)
+    def _get_fleet(self, k, params):
+        """``get_stats()`` for every stack, side by side."""
+        pool = getattr(self.server, "stacks", None)
+        if pool is None:
+            return self._send_error(404, "Multi-stack serving is disabled")
+        stats = fleet_stats(k._storage, self._stack_ids())
+        return self._send_json(
+            [{"stack_id": stack_id, "stats": counts} for stack_id, counts in stats.items()]
+        )
+
+    @route("/api/stats", cache_ttl=5)
+    def _get_stats(self, k, params):
+        return self._send_result(BATCH_QUERIES["stats"](self, k))
+
+    # Not response-cached: the refresher already serves a stored report, and
+    # a cached copy would pin its "refreshing" state past the recompute.
+    @route("/api/anxiety")
+    def _get_anxiety(self, k, params):
+        return self._send_result(BATCH_QUERIES["anxiety"](self, k))
+
+    def _anxiety_report(self, k):
+        """Return the anxiety report, stale-while-revalidate with its ``freshness``."""
+        if self.stack is None:
+            return k.get_anxiety_report(detailed=True)
+        report, freshness = self.stack.anxiety.get(k)
+        return {**report, "freshness": freshness}
+
+    @route("/api/processing", cache_ttl=30)
+    def _get_processing(self, k, params):
+        return self._send_result(BATCH_QUERIES["processing"](self, k))
+
+    @route("/api/settings", cache_ttl=30)
+    def _get_settings(self, k, params):
+        return self._send_result(BATCH_QUERIES["settings"](self, k))
+
+    @route("/api/search", cache_ttl=LIST_CACHE_TTL)
+    def _get_search(self, k, params):
+        """Ranked full-text search: ``?q=...&types=belief,note&limit=&cursor=``."""
+        text = (params.get("q") or [""])[0]
+        types = []
+        for value in params.get("types", []):
+            types.extend(name.strip() for name in value.split(",") if name.strip())
+        unknown = [name for name in types if name not in SEARCH_SOURCES]
+        if unknown:
+            return self._send_error(400, f"Unknown type: {unknown[0]}")
+        cursor = (params.get("cursor") or [""])[0]
+        limit = self._get_int_param(params, "limit", LIST_DEFAULT_LIMIT)
+        if self.stack is None:
+            return self._send_error(404, "Not found")
+        index = self.stack.search_index
+        try:
+            hits, next_cursor = index.search(k, text, types, limit, cursor or None)
+        except InvalidCursor:
+            return self._send_error(400, "Invalid cursor")
+        except IndexBuilding as e:
+            building = {"error": "Search index is being built", "indexing": True}
+            return self._send_json({**building, "documents": e.documents}, 503)
+        except NotImplementedError as e:
+            return self._send_error(501, str(e))
+        page = {"items": hits, "next_cursor": next_cursor}
+        if index.syncing:
+            # Recent writes may be missing; don't cache until the sync is done
+            self._cache_slot = None
+            page["indexing"] = True
+        return self._send_json(page)
+
+    @route("/api/export")
+    def _get_export(self, k, params):
+        """Stream the whole stack: ``?format=ndjson|csv&types=raw,belief&gzip=1``."""
+        fmt = (params.get("format") or ["ndjson"])[0]
+        if fmt not in EXPORT_FORMATS:
+            return self._send_error(400, f"Unknown format: {fmt}")
+        try:
+            kinds = parse_kinds(",".join(params.get("types", [])))
+        except ValueError as e:
+            return self._send_error(400, str(e))
+        if not supports_keyset(k):
+            return self._send_error(501, "Export requires SQLite storage")
+        batch = self._get_int_param(params, "batch", DEFAULT_EXPORT_BATCH)
+        batch = max(1, min(batch, MAX_PAGE_SIZE))
+        compress = bool(self._get_bool_param(params, "gzip"))
+        filename = re.sub(r"[^\w.-]", "_", f"{k.stack_id}.{fmt}") + (".gz" if compress else "")
+        return self._send_stream(
+            export_stack(k, fmt, kinds, batch),
+            "application/gzip" if compress else CONTENT_TYPES[fmt],
+            filename=filename,
+            compress=compress,
+        )
+
+    @route("/api/raw/<raw_id>", cache_ttl=DETAIL_CACHE_TTL)
+    def _get_raw(self, k, params, raw_id):
+        # Stack.get_raw lists entries; the storage reads one by ID
+        entry = k._storage.get_raw(raw_id)
+        if entry is None:
+            return self._send_error(404, "Not found")
+        with self._phase("serialize"):
+            data = project(entry, *self._projection(params))
+        return self._send_json(data)
+
+    @route("/api/memory/<mem_type:word>/<mem_id>", cache_ttl=DETAIL_CACHE_TTL)
+    def _get_memory(self, k, params, mem_type, mem_id):
+        if mem_type not in MEMORY_TYPES or mem_type == "raw":
+            return self._send_error(400, "Invalid memory type")
+        memory = k.stack.get_memory(mem_type, mem_id)
+        if memory is None:
+            return self._send_error(404, "Not found")
+        with self._phase("serialize"):
+            data = project(memory, *self._projection(params))
+        return self._send_json(data)
+
+    @route("/api/provenance/<mem_type:word>/<mem_id>", cache_ttl=10)
+    def _get_provenance(self, k, params, mem_type, mem_id):
+        if mem_type not in MEMORY_TYPES:
+            return self._send_error(400, "Invalid memory type")
+        derived = k.stack.get_memories_derived_from(mem_type, mem_id)
+        return self._send_json([{"type": t, "id": i} for t, i in derived])
+
+    @route("/api/provenance-graph/<mem_type:word>/<mem_id>", cache_ttl=10)
+    def _get_provenance_graph(self, k, params, mem_type, mem_id):
+        """Transitive provenance: ``?depth=N&direction=down|up|both``."""
+        if mem_type not in MEMORY_TYPES:
+            return self._send_error(400, "Invalid memory type")
+        direction = (params.get("direction") or ["down"])[0]
+        if direction not in ("down", "up", "both"):
+            return self._send_error(400, "Invalid direction")
+        if not supports_keyset(k):
+            return self._send_error(501, "Provenance graph requires SQLite storage")
+        depth = self._get_int_param(params, "depth", DEFAULT_GRAPH_DEPTH)
+        return self._send_json(provenance_graph(k, mem_type, mem_id, depth, direction))
+
+    @route("/api/provenance-counts/<mem_type:word>", cache_ttl=10)
+    def _get_provenance_counts(self, k, params, mem_type):
+        """Derivations for a page of ids: ``?ids=a,b,c`` (or repeated ``ids``)."""
+        if mem_type not in MEMORY_TYPES:
+            return self._send_error(400, "Invalid memory type")
+        ids = [i for value in params.get("ids", []) for i in value.split(",") if i]
+        if len(ids) > MAX_BULK_IDS:
+            return self._send_error(400, f"At most {MAX_BULK_IDS} ids per request")
+        if not supports_keyset(k):
+            return self._send_error(501, "Provenance counts require SQLite storage")
+        return self._send_json(derivation_counts(k, mem_type, ids))
 
+    def do_GET(self):  # noqa: N802
+        self._timer = PhaseTimer()
+        self._status = None
+        self._bytes = 0
         parsed = urlparse(self.path)
         path = parsed.path.rstrip("/")
-        params = parse_qs(parsed.query, keep_blank_values=True)
-        k = self.__class__.kernle_instance
-
+        stack_id, local_path = split_stack_path(path)
+        route = None
         try:
-            if path == "" or path == "/":
-                return self._send_html(DASHBOARD_HTML)
-
-            elif path == "/api/stats":
-                stats = k.stack.get_stats()
-                return self._send_json(serialize(stats))
-
-            elif path == "/api/anxiety":
-                report = k.get_anxiety_report(detailed=True)
-                return self._send_json(serialize(report))
-
-            elif path == "/api/raw":
-                limit = self._get_int_param(params, "limit", 200)
-                processed = self._get_bool_param(params, "processed")
-                entries = k.stack.list_raw(processed=processed, limit=limit)
-                return self._send_json(serialize(entries))
-
-            elif m := re.match(r"^/api/raw/([^/]+)$", path):
-                raw_id = m.group(1)
-                entry = k.stack.get_raw(raw_id)
-                if entry is None:
-                    return self._send_error(404, "Not found")
-                return self._send_json(serialize(entry))
-
-            elif path == "/api/episodes":
-                limit = self._get_int_param(params, "limit", 100)
-                items = k.stack.get_episodes(limit=limit, include_forgotten=True, include_weak=True)
-                return self._send_json(serialize(items))
-
-            elif path == "/api/beliefs":
-                limit = self._get_int_param(params, "limit", 100)
-                items = k.stack.get_beliefs(limit=limit, include_forgotten=True, include_weak=True)
-                return self._send_json(serialize(items))
-
-            elif path == "/api/values":
-                limit = self._get_int_param(params, "limit", 100)
-                items = k.stack.get_values(limit=limit, include_forgotten=True, include_weak=True)
-                return self._send_json(serialize(items))
-
-            elif path == "/api/goals":
-                limit = self._get_int_param(params, "limit", 100)
-                items = k.stack.get_goals(limit=limit, include_forgotten=True, include_weak=True)
-                return self._send_json(serialize(items))
-
-            elif path == "/api/notes":
-                limit = self._get_int_param(params, "limit", 100)
-                items = k.stack.get_notes(limit=limit, include_forgotten=True, include_weak=True)
-                return self._send_json(serialize(items))
-
-            elif path == "/api/relationships":
-                items = k.stack.get_relationships()
-                return self._send_json(serialize(items))
-
-            elif path == "/api/drives":
-                items = k.stack.get_drives()
-                return self._send_json(serialize(items))
-
-            elif path == "/api/suggestions":
-                limit = self._get_int_param(params, "limit", 100)
-                items = k.stack.get_suggestions(limit=limit)
-                return self._send_json(serialize(items))
-
-            elif path == "/api/processing":
-                config = k.stack.get_processing_config()
-                return self._send_json(serialize(config))
-
-            elif m := re.match(r"^/api/provenance/(\w+)/([^/]+)$", path):
-                mem_type, mem_id = m.group(1), m.group(2)
-                valid_types = {
-                    "raw", "episode", "belief", "value", "goal",
-                    "note", "drive", "relationship",
-                }
-                if mem_type not in valid_types:
-                    return self._send_error(400, "Invalid memory type")
-                derived = k.stack.get_memories_derived_from(mem_type, mem_id)
-                result = [{"type": t, "id": i} for t, i in derived]
-                return self._send_json(result)
-
-            elif path == "/api/audit":
-                limit = self._get_int_param(params, "limit", 100)
-                items = k.stack.get_audit_log(limit=limit)
-                return self._send_json(serialize(items))
-
-            elif path == "/api/settings":
-                settings = k.stack.get_all_stack_settings()
-                return self._send_json(serialize(settings))
-
-            else:
+            if not self._use_stack(stack_id):
+                return self._send_error(404, "Unknown stack")
+            self.stack_prefix = path[: len(path) - len(local_path)]
+            route, kwargs = ROUTES.match(local_path)
+            if route is None:
                 return self._send_error(404, "Not found")
+            self.route = route
+            return self._dispatch(route, kwargs, path, parsed.query)
+        finally:
+            if self.stack is not None and self.stack.pool is not None:
+                self.stack.pool.release(self.stack)
+            self._record((route.path or "/") if route is not None else "unmatched")
+
+    def _use_stack(self, stack_id):
+        """Point this request at ``stack_id`` (None: the default stack).
+
+        Pooled stacks are leased here and released when the request ends.
+        Returns False if the stack can't be served.
+        """
+        self.stack = default = getattr(self.server, "default_stack", None)
+        if stack_id is None or (default is not None and stack_id == default.stack_id):
+            return True
+        pool = getattr(self.server, "stacks", None)
+        self.stack = pool.acquire(stack_id) if pool is not None else None
+        return self.stack is not None
+
+    def _record(self, label):
+        metrics = getattr(self.server, "metrics", None)
+        if metrics is None or self._status is None:
+            return
+        total, phases = self._timer.finish()
+        metrics.observe(label, self.command, self._status, total, phases, self._bytes)
+
+    def _dispatch(self, route, kwargs, path, query):
+        params = parse_qs(query, keep_blank_values=True)
+        k = self._kernle()
+        cache = getattr(self.server, "response_cache", None)
+        self._cache_slot = None
+
+        try:
+            if cache is not None and route.cacheable:
+                key = (path, tuple(sorted((name, tuple(vals)) for name, vals in params.items())))
+                version = stack_version(k)
+                body = cache.get(key, version)
+                if body is not None:
+                    return self._send_body(body, "application/json", cache_status="HIT")
+                self._cache_slot = (key, version, route.cache_ttl)
+
+            return route.handler(self, k, params, **kwargs)
 
         except Exception:
             logger.exception("Error handling %s", path)
             return self._send_error(500, "Internal server error")
+
+
+for _path, _kind in LIST_ENDPOINTS.items():
+    ROUTES.add(
+        _path,
+        DashboardHandler._get_list,
+        cache_ttl=LIST_CACHE_TTL,
+        streaming=True,
+        max_limit=STREAM_MAX_ROWS,
+        default_limit=LIST_DEFAULT_LIMITS.get(_kind, LIST_DEFAULT_LIMIT),
+        kind=_kind,
+    )
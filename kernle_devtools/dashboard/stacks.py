@@ -0,0 +1,220 @@
+"""Serving several stacks from one dashboard process.
+
+Everything the dashboard keeps open for a stack (Kernle handles, change
+watcher, anxiety refresher, search index) lives in a :class:`StackContext`.
+The stack the dashboard was launched with has a permanent context; others
+are opened on first request under ``/s/<stack_id>/`` and kept in a
+:class:`StackPool`, which closes the least recently used ones beyond its
+size and any that sit idle too long.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote
+
+from kernle_devtools.dashboard.anxiety import AnxietyRefresher
+from kernle_devtools.dashboard.events import ChangeWatcher
+from kernle_devtools.dashboard.pool import ThreadLocalKernle
+from kernle_devtools.dashboard.search import SearchIndex, index_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_STACKS = 16
+DEFAULT_IDLE_SECONDS = 600
+# How long the list of stacks in the database is reused
+STACK_LIST_TTL = 10
+
+STACK_PREFIX = "/s/"
+
+# Tables and keys counted by kernle's get_stats(), in the same order
+STATS_TABLES = (
+    ("episodes", "episodes"),
+    ("beliefs", "beliefs"),
+    ("agent_values", "values"),
+    ("goals", "goals"),
+    ("notes", "notes"),
+    ("drives", "drives"),
+    ("relationships", "relationships"),
+    ("raw_entries", "raw"),
+    ("memory_suggestions", "suggestions"),
+)
+
+
+def split_stack_path(path):
+    """Split ``/s/<stack_id>/rest`` into ``(stack_id, "/rest")``.
+
+    Paths outside ``/s/`` come back as ``(None, path)``.
+    """
+    if not path.startswith(STACK_PREFIX):
+        return None, path
+    segment, _, rest = path[len(STACK_PREFIX) :].partition("/")
+    if not segment:
+        return None, path
+    return unquote(segment), f"/{rest}" if rest else ""
+
+
+def fleet_stats(storage, stack_ids):
+    """Return ``{stack_id: get_stats()}`` for many stacks in one pass per table.
+
+    Counts match kernle's ``get_stats()``; stacks with no rows get zeros.
+    """
+    stats = {
+        stack_id: {key: 0 for _, key in STATS_TABLES} | {"pending_suggestions": 0}
+        for stack_id in stack_ids
+    }
+    with storage._connect() as conn:
+        for table, key in STATS_TABLES:
+            for stack_id, count in conn.execute(
+                f"SELECT stack_id, COUNT(*) FROM {table} WHERE deleted = 0 GROUP BY stack_id"
+            ):
+                if stack_id in stats:
+                    stats[stack_id][key] = count
+        for stack_id, count in conn.execute(
+            "SELECT stack_id, COUNT(*) FROM memory_suggestions "
+            "WHERE status = 'pending' AND deleted = 0 GROUP BY stack_id"
+        ):
+            if stack_id in stats:
+                stats[stack_id]["pending_suggestions"] = count
+    return stats
+
+
+class StackContext:
+    """The per-stack state one dashboard keeps open."""
+
+    def __init__(self, stack_id, handles, metrics=None, watcher=None, pool=None):
+        self.stack_id = stack_id
+        self.handles = handles
+        self.watcher = watcher if watcher is not None else ChangeWatcher(handles)
+        self.anxiety = AnxietyRefresher(handles, metrics=metrics)
+        self.search_index = SearchIndex(index_path(getattr(handles, "template", None), stack_id))
+        # Set for pooled stacks, which must be released after each use
+        self.pool = pool
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+    def stop(self):
+        """Stop background threads and end open event streams."""
+        self.watcher.stop()
+        self.anxiety.stop()
+
+    def close(self):
+        self.stop()
+        self.handles.close()
+        self.search_index.close()
+
+
+class StackPool:
+    """Lazily opened stacks from the same database as ``k``.
+
+    Stacks are leased for the length of a request (or an event stream) and
+    are never closed while leased, so the pool can briefly exceed
+    ``max_stacks`` when every open stack is busy.
+    """
+
+    def __init__(
+        self, k, metrics=None, max_stacks=DEFAULT_MAX_STACKS, idle_seconds=DEFAULT_IDLE_SECONDS
+    ):
+        self._template = k
+        self._metrics = metrics
+        self.max_stacks = max_stacks
+        self.idle_seconds = idle_seconds
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+        self._known = None
+        self._known_at = 0.0
+        self.opened = 0
+        self.evictions = 0
+
+    @staticmethod
+    def supported(k):
+        """Only SQLite stacks can be listed and reopened by id."""
+        from kernle.storage import SQLiteStorage
+
+        return isinstance(getattr(k, "_storage", None), SQLiteStorage)
+
+    def available(self):
+        """Return the stack ids present in the database, cached briefly."""
+        now = time.monotonic()
+        with self._lock:
+            if self._known is not None and now - self._known_at < STACK_LIST_TTL:
+                return self._known
+        known = list(self._template._storage.list_stack_ids())
+        with self._lock:
+            self._known, self._known_at = known, now
+        return known
+
+    def open_stack_ids(self):
+        with self._lock:
+            return list(self._open)
+
+    def acquire(self, stack_id):
+        """Lease the context for ``stack_id``, opening it if needed.
+
+        Returns None for ids that aren't in the database, so a typo in a
+        URL never creates a stack.
+        """
+        with self._lock:
+            context = self._open.get(stack_id)
+            if context is not None:
+                self._retain_locked(context)
+                return context
+        if stack_id not in self.available():
+            return None
+
+        handles = ThreadLocalKernle(self._template, stack_id=stack_id)
+        with self._lock:
+            context = self._open.get(stack_id)
+            if context is None:
+                context = StackContext(stack_id, handles, metrics=self._metrics, pool=self)
+                self._open[stack_id] = context
+                self.opened += 1
+                logger.debug("Opened stack %s (%d open)", stack_id, len(self._open))
+            self._retain_locked(context)
+        self.close_idle()
+        return context
+
+    def retain(self, context):
+        """Take another lease on an already leased context."""
+        with self._lock:
+            self._retain_locked(context)
+
+    def _retain_locked(self, context):
+        context.leases += 1
+        context.last_used = time.monotonic()
+        if self._open.get(context.stack_id) is context:
+            self._open.move_to_end(context.stack_id)
+
+    def release(self, context):
+        with self._lock:
+            context.leases -= 1
+            context.last_used = time.monotonic()
+        self.close_idle()
+
+    def close_idle(self):
+        """Close unleased stacks beyond ``max_stacks`` or idle too long."""
+        now = time.monotonic()
+        victims = []
+        with self._lock:
+            excess = len(self._open) - self.max_stacks
+            for stack_id, context in list(self._open.items()):  # least recent first
+                if context.leases:
+                    continue
+                if excess > 0 or now - context.last_used >= self.idle_seconds:
+                    del self._open[stack_id]
+                    victims.append(context)
+                    excess -= 1
+            self.evictions += len(victims)
+        for context in victims:
+            logger.debug("Closing stack %s", context.stack_id)
+            try:
+                context.close()
+            except Exception:
+                logger.debug("Failed to close stack %s", context.stack_id, exc_info=True)
+
+    def close(self):
+        with self._lock:
+            contexts, self._open = list(self._open.values()), OrderedDict()
+        for context in contexts:
+            context.close()
@@ -0,0 +1,82 @@
+"""Incremental response bodies — chunked transfer with optional compression."""
+
+import json
+import zlib
+
+from kernle_devtools.dashboard.encoding import COMPRESS_LEVEL
+
+# Writes are coalesced up to this size so per-item output doesn't turn into
+# one syscall and one chunk header per row.
+STREAM_BUFFER_BYTES = 64 * 1024
+
+
+class StreamWriter:
+    """Write a body of unknown length to a socket file.
+
+    With ``chunked`` the output is framed as HTTP/1.1 chunks; otherwise the
+    body is delimited by closing the connection (HTTP/1.0). Compression,
+    when requested, is applied incrementally so only one buffer's worth of
+    output is ever held in memory.
+    """
+
+    def __init__(self, wfile, chunked=True, encoding=None, buffer_bytes=STREAM_BUFFER_BYTES):
+        self._wfile = wfile
+        self._chunked = chunked
+        self._buffer = bytearray()
+        self._buffer_bytes = buffer_bytes
+        self._compressor = None
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)
+        elif encoding == "deflate":
+            self._compressor = zlib.compressobj(COMPRESS_LEVEL)
+        self.bytes_written = 0
+
+    def write(self, data):
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        self._buffer += data
+        if len(self._buffer) >= self._buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        """Send buffered output as one chunk."""
+        if not self._buffer:
+            return
+        if self._chunked:
+            self._wfile.write(f"{len(self._buffer):x}\r\n".encode("ascii"))
+            self._wfile.write(self._buffer)
+            self._wfile.write(b"\r\n")
+        else:
+            self._wfile.write(self._buffer)
+        self.bytes_written += len(self._buffer)
+        self._buffer = bytearray()
+        self._wfile.flush()
+
+    def close(self):
+        """Flush the compressor and buffer and terminate the chunk stream."""
+        if self._compressor is not None:
+            self._buffer += self._compressor.flush()
+            self._compressor = None
+        self.flush()
+        if self._chunked:
+            self._wfile.write(b"0\r\n\r\n")
+            self._wfile.flush()
+
+
+def json_array(items, convert):
+    """Yield a JSON array of ``convert(item)`` as encoded fragments."""
+    yield b"["
+    first = True
+    for item in items:
+        if not first:
+            yield b","
+        first = False
+        yield json.dumps(convert(item), default=str).encode("utf-8")
+    yield b"]"
+
+
+def json_envelope(stream, convert):
+    """Yield ``{"items": [...], "next_cursor": ...}`` for a PageStream."""
+    yield b'{"items":'
+    yield from json_array(stream, convert)
+    yield b',"next_cursor":' + json.dumps(stream.next_cursor).encode("utf-8") + b"}"
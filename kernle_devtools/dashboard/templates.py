@@ -47,6 +47,15 @@ a:hover { text-decoration: underline; }
 }
 .header h1 { font-size: 16px; font-weight: 600; color: var(--text); white-space: nowrap; }
 .header .stack-id { font-family: var(--mono); color: var(--accent); font-size: 13px; }
+.header .stack-picker {
+  background: var(--bg3);
+  border: 1px solid var(--border);
+  color: var(--accent);
+  font-family: var(--mono);
+  font-size: 12px;
+  padding: 3px 6px;
+  border-radius: 6px;
+}
 .header .stats-bar { display: flex; gap: 12px; font-size: 12px; color: var(--text-dim); flex-wrap: wrap; }
 .header .stats-bar .stat { display: flex; align-items: center; gap: 4px; }
 .header .stats-bar .stat-val { color: var(--text); font-weight: 600; font-family: var(--mono); }
@@ -141,6 +150,17 @@ tbody td {
 }
 tbody tr { cursor: pointer; transition: background 0.1s; }
 tbody tr:hover { background: var(--bg3); }
+.vscroll { height: calc(100vh - 260px); min-height: 300px; overflow-y: auto; }
+.vscroll tbody tr[data-idx] td {
+  white-space: nowrap;
+  overflow: hidden;
+  text-overflow: ellipsis;
+  max-width: 420px;
+  vertical-align: middle;
+}
+.vscroll tr.vpad, .vscroll tr.vpad:hover { background: none; cursor: default; }
+tbody tr.selected { background: var(--bg3); box-shadow: inset 2px 0 0 var(--accent); }
+.derived-cell { font-family: var(--mono); font-size: 11px; color: var(--text-dim); }
 .id-cell { font-family: var(--mono); font-size: 11px; color: var(--text-dim); max-width: 100px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }
 .blob-preview { max-width: 400px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; color: var(--text-dim); font-family: var(--mono); font-size: 12px; }
 .status-icon { font-size: 16px; }
@@ -158,6 +178,7 @@ tbody tr:hover { background: var(--bg3); }
   font-size: 13px;
 }
 .filters label { font-size: 12px; color: var(--text-dim); }
+mark { background: none; color: var(--accent); font-weight: 600; }
 
 /* Sub-tabs */
 .sub-tabs { display: flex; gap: 0; margin-bottom: 16px; border-bottom: 1px solid var(--border); }
@@ -198,6 +219,7 @@ tbody tr:hover { background: var(--bg3); }
 .detail-kv .dv.blob-full { white-space: pre-wrap; max-height: 300px; overflow-y: auto; background: var(--bg); padding: 8px; border-radius: 4px; }
 
 /* Anxiety dimensions */
+.heading-note { font-size: 11px; font-weight: normal; color: var(--text-dim); margin-left: 8px; }
 .anxiety-dims { display: grid; grid-template-columns: repeat(auto-fill, minmax(280px, 1fr)); gap: 12px; margin-bottom: 24px; }
 .anxiety-dim {
   background: var(--bg2);
@@ -229,6 +251,19 @@ tbody tr:hover { background: var(--bg3); }
 .settings-grid .sg-key { font-weight: 600; color: var(--text-dim); }
 .settings-grid .sg-val { font-family: var(--mono); }
 
+/* Pager */
+.pager { display: flex; gap: 12px; align-items: center; justify-content: flex-end; margin: -12px 0 24px; font-size: 12px; color: var(--text-dim); }
+.pager button {
+  background: var(--bg3);
+  border: 1px solid var(--border);
+  color: var(--text);
+  padding: 4px 10px;
+  border-radius: 6px;
+  font-size: 12px;
+  cursor: pointer;
+}
+.pager button:disabled { color: var(--text-dim); cursor: default; opacity: 0.5; }
+
 /* Section headings */
 .section-heading { font-size: 15px; font-weight: 600; margin-bottom: 12px; color: var(--text); }
 
@@ -236,6 +271,16 @@ tbody tr:hover { background: var(--bg3); }
 .prov-chain { margin-top: 12px; padding: 8px; background: var(--bg); border-radius: 4px; }
 .prov-item { font-family: var(--mono); font-size: 12px; padding: 2px 0; }
 .prov-item a { color: var(--accent); }
+.prov-graph { display: flex; gap: 16px; overflow-x: auto; align-items: flex-start; }
+.prov-level { display: flex; flex-direction: column; gap: 4px; min-width: 140px; }
+.prov-level-label { font-size: 11px; color: var(--text-dim); }
+.prov-node {
+  font-size: 12px; padding: 4px 6px; border: 1px solid var(--border); border-radius: 4px;
+  background: var(--bg2); cursor: pointer; max-width: 220px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;
+}
+.prov-node.root { border-color: var(--accent); cursor: default; }
+.prov-node.missing { opacity: 0.5; cursor: default; }
+.prov-node .pn-type { font-family: var(--mono); color: var(--accent); margin-right: 4px; }
 
 /* Loading */
 .loading { text-align: center; padding: 40px; color: var(--text-dim); }
@@ -255,6 +300,7 @@ tbody tr:hover { background: var(--bg3); }
 <div class="header">
   <h1>Kernle Dashboard</h1>
   <span class="stack-id" id="stack-id">loading...</span>
+  <select class="stack-picker hidden" id="stack-picker" title="Switch stack"></select>
   <div class="stats-bar" id="stats-bar"></div>
   <div id="anxiety-badge-wrap"></div>
   <div class="header-right">
@@ -266,10 +312,12 @@ tbody tr:hover { background: var(--bg3); }
 
 <div class="tabs" id="tabs">
   <div class="tab active" data-tab="overview">Overview</div>
+  <div class="tab hidden" data-tab="fleet" id="fleet-tab">Fleet</div>
   <div class="tab" data-tab="raw">Raw Entries</div>
   <div class="tab" data-tab="memories">Memories</div>
   <div class="tab" data-tab="suggestions">Suggestions</div>
   <div class="tab" data-tab="audit">Audit Log</div>
+  <div class="tab" data-tab="search">Search</div>
   <div class="tab" data-tab="settings">Settings</div>
 </div>
 
@@ -278,7 +326,7 @@ tbody tr:hover { background: var(--bg3); }
   <div id="tab-overview">
     <div class="section-heading">Memory Counts</div>
     <div class="cards" id="stats-cards"></div>
-    <div class="section-heading">Anxiety Dimensions</div>
+    <div class="section-heading">Anxiety Dimensions <span class="heading-note" id="anxiety-freshness"></span></div>
     <div class="anxiety-dims" id="anxiety-dims"></div>
     <div class="section-heading">Processing Pipeline</div>
     <div class="proc-grid" id="proc-grid"></div>
@@ -293,7 +341,7 @@ tbody tr:hover { background: var(--bg3); }
         <option value="false">Unprocessed</option>
         <option value="true">Processed</option>
       </select>
-      <label>Limit:</label>
+      <label>Page size:</label>
       <select id="raw-limit">
         <option value="50">50</option>
         <option value="100">100</option>
@@ -307,14 +355,8 @@ tbody tr:hover { background: var(--bg3); }
       <div class="detail-kv" id="raw-detail-kv"></div>
       <div class="prov-chain" id="raw-prov"></div>
     </div>
-    <div class="table-wrap">
-      <table>
-        <thead><tr>
-          <th>Status</th><th>ID</th><th>Captured</th><th>Source</th><th>Blob</th><th>Processed Into</th><th>Strength</th>
-        </tr></thead>
-        <tbody id="raw-tbody"></tbody>
-      </table>
-    </div>
+    <div class="table-wrap vscroll" id="raw-table"></div>
+    <div class="pager" id="raw-status"></div>
   </div>
 
   <!-- Memories Tab -->
@@ -334,7 +376,8 @@ tbody tr:hover { background: var(--bg3); }
       <div class="detail-kv" id="mem-detail-kv"></div>
       <div class="prov-chain" id="mem-prov"></div>
     </div>
-    <div class="table-wrap" id="mem-table-wrap"></div>
+    <div class="table-wrap vscroll" id="mem-table-wrap"></div>
+    <div class="pager" id="memories-status"></div>
   </div>
 
   <!-- Suggestions Tab -->
@@ -352,6 +395,7 @@ tbody tr:hover { background: var(--bg3); }
         <tbody id="sug-tbody"></tbody>
       </table>
     </div>
+    <div class="pager" id="suggestions-pager"></div>
   </div>
 
   <!-- Audit Tab -->
@@ -373,14 +417,49 @@ tbody tr:hover { background: var(--bg3); }
         <tbody id="audit-tbody"></tbody>
       </table>
     </div>
+    <div class="pager" id="audit-pager"></div>
   </div>
 
   <!-- Settings Tab -->
+  <!-- Search Tab -->
+  <div id="tab-search" class="hidden">
+    <div class="filters">
+      <input type="search" id="search-input" placeholder="Search raw entries, episodes, beliefs, notes, goals" style="flex:1">
+      <label>Type:</label>
+      <select id="search-type">
+        <option value="">All</option>
+        <option value="raw">Raw</option>
+        <option value="episode">Episodes</option>
+        <option value="belief">Beliefs</option>
+        <option value="note">Notes</option>
+        <option value="goal">Goals</option>
+      </select>
+    </div>
+    <div class="loading hidden" id="search-status"></div>
+    <div class="table-wrap">
+      <table>
+        <thead><tr><th>Type</th><th>ID</th><th>Match</th></tr></thead>
+        <tbody id="search-tbody"></tbody>
+      </table>
+    </div>
+    <div class="pager" id="search-pager"></div>
+  </div>
+
+  <div id="tab-fleet" class="hidden">
+    <div class="section-heading">All Stacks</div>
+    <div class="table-wrap" id="fleet-table-wrap"></div>
+  </div>
+
   <div id="tab-settings" class="hidden">
     <div class="section-heading">Stack Settings</div>
     <div class="settings-grid" id="settings-grid"></div>
     <div class="section-heading" style="margin-top:24px">Processing Config</div>
     <div class="proc-grid" id="settings-proc-grid"></div>
+    <div class="section-heading" style="margin-top:24px">Server Latency <span style="font-weight:normal;color:var(--text-dim)">(Prometheus: <code>/metrics</code>)</span></div>
+    <table>
+      <thead><tr><th>Route</th><th>Requests</th><th>Errors</th><th>p50 ms</th><th>p95 ms</th><th>Kernle ms</th><th>Serialize ms</th><th>Write ms</th><th>Avg bytes</th></tr></thead>
+      <tbody id="metrics-body"></tbody>
+    </table>
   </div>
 </div>
 
@@ -389,13 +468,61 @@ tbody tr:hover { background: var(--bg3); }
 let currentTab = 'overview';
 let currentMemType = 'episodes';
 let refreshTimer = null;
+let events = null;
 const cache = {};
+const rendered = {};
+// ETag and parsed body per URL, least recently used first. Capped so search
+// keystrokes and cursor pages don't pile up in a long-lived tab.
+const CONDITIONAL_MAX = 64;
+const conditional = new Map();
 
 // ---- API ----
-async function api(endpoint) {
-  const res = await fetch(endpoint);
+// Pages under /s/<stack_id>/ show that stack; the root shows the default.
+const STACK_BASE = (location.pathname.match(/^\/s\/[^/]+/) || [''])[0];
+
+// Conditional GET: a 304 hands back the previously parsed body object, so
+// callers can detect "nothing changed" with an identity check.
+async function request(endpoint) {
+  const headers = {};
+  const prev = conditional.get(endpoint);
+  if (prev) {
+    // Re-inserted below as the most recently used
+    conditional.delete(endpoint);
+    headers['If-None-Match'] = prev.etag;
+  }
+  const res = await fetch(STACK_BASE + endpoint, { headers, cache: 'no-store' });
+  if (res.status === 304 && prev) {
+    conditional.set(endpoint, prev);
+    return prev.body;
+  }
   if (!res.ok) throw new Error(`${res.status}: ${await res.text()}`);
-  return res.json();
+  const data = await res.json();
+  const etag = res.headers.get('ETag');
+  if (etag) {
+    conditional.set(endpoint, { etag, body: data });
+    if (conditional.size > CONDITIONAL_MAX) conditional.delete(conditional.keys().next().value);
+  }
+  return data;
+}
+
+// Concurrent callers of the same endpoint share one request.
+const inflight = {};
+function api(endpoint) {
+  if (!inflight[endpoint]) {
+    inflight[endpoint] = request(endpoint).finally(() => { delete inflight[endpoint]; });
+  }
+  return inflight[endpoint];
+}
+
+// Header and overview read the same whole-stack queries in one round trip.
+const OVERVIEW_BATCH = '/api/batch?q=stats,anxiety,processing';
+
+// True if `slot` was last rendered from exactly these response objects.
+function unchanged(slot, ...data) {
+  const prev = rendered[slot];
+  if (prev && prev.length === data.length && prev.every((d, i) => d === data[i])) return true;
+  rendered[slot] = data;
+  return false;
 }
 
 // ---- Helpers ----
@@ -453,6 +580,274 @@ function closeDetail(id) {
   document.getElementById(id).classList.remove('open');
 }
 
+// ---- Pagination ----
+// Each paged table keeps the cursors of the pages it has visited so
+// "Newer" can step back without the server keeping any state.
+const pagers = {};
+
+function pager(slot) {
+  return pagers[slot] || (pagers[slot] = { cursors: [''], index: 0, next: null });
+}
+
+function resetPager(slot) {
+  delete pagers[slot];
+}
+
+function pageParam(slot) {
+  const p = pager(slot);
+  return `cursor=${encodeURIComponent(p.cursors[p.index])}`;
+}
+
+function renderPager(slot, nextCursor) {
+  const p = pager(slot);
+  p.next = nextCursor;
+  document.getElementById(slot + '-pager').innerHTML =
+    `<button data-dir="-1"${p.index === 0 ? ' disabled' : ''}>&larr; Newer</button>` +
+    `<span>Page ${p.index + 1}</span>` +
+    `<button data-dir="1"${nextCursor ? '' : ' disabled'}>Older &rarr;</button>`;
+}
+
+function bindPager(slot, reload) {
+  document.getElementById(slot + '-pager').addEventListener('click', e => {
+    const btn = e.target.closest('button[data-dir]');
+    if (!btn || btn.disabled) return;
+    const p = pager(slot);
+    if (btn.dataset.dir === '1' && p.next) {
+      p.cursors = p.cursors.slice(0, p.index + 1);
+      p.cursors.push(p.next);
+      p.index++;
+    } else if (btn.dataset.dir === '-1' && p.index > 0) {
+      p.index--;
+    }
+    reload();
+  });
+}
+
+// ---- Virtualized tables ----
+// Long lists render only the rows in view, plus a margin, between two
+// spacer rows, so the DOM stays a few dozen rows deep however many rows
+// have loaded. One delegated listener handles row clicks. Rows arrive in
+// keyset pages fetched by cursor as the user scrolls towards the end.
+// Tables with a delta source refresh by asking for the rows written since
+// their high-water mark and patching those in place, so a refresh costs
+// what changed rather than what is loaded.
+const OVERSCAN = 15;
+
+// opts: head() -> header cells, row(item) -> cells, fetch(cursor) -> page,
+//       onClick(item), loaded(items) after each page, status element id,
+//       optionally delta(since) -> changes and the sortKey field rows are
+//       ordered by (newest first, ties by id).
+function virtualTable(el, opts) {
+  const vt = { items: [], next: '', first: null, loading: false, stale: false, generation: 0, mark: null };
+  let rowHeight = 0, start = -1, end = -1, frame = 0;
+  let index = null, lastDelta = null, deltas = !!opts.delta;
+  el.innerHTML = '<table><thead><tr></tr></thead><tbody></tbody></table>';
+  const headRow = el.querySelector('thead tr');
+  const tbody = el.querySelector('tbody');
+  const status = document.getElementById(opts.status);
+
+  function renderStatus() {
+    let text = `${vt.items.length} rows`;
+    if (vt.next !== null) text += vt.loading ? ', loading more…' : ', scroll for more';
+    status.innerHTML = `<span>${text}</span>` +
+      (vt.stale ? '<button data-reload="1">New rows &mdash; reload</button>' : '');
+  }
+
+  vt.render = force => {
+    const view = el.clientHeight || 600;
+    const h = rowHeight || 34;
+    const s = Math.max(0, Math.floor(el.scrollTop / h) - OVERSCAN);
+    const e = Math.min(vt.items.length, Math.ceil((el.scrollTop + view) / h) + OVERSCAN);
+    if (force || s !== start || e !== end) {
+      start = s;
+      end = e;
+      const rows = [];
+      for (let i = s; i < e; i++) rows.push(`<tr data-idx="${i}">${opts.row(vt.items[i])}</tr>`);
+      tbody.innerHTML = `<tr class="vpad" style="height:${s * h}px"></tr>` + rows.join('') +
+        `<tr class="vpad" style="height:${(vt.items.length - e) * h}px"></tr>`;
+      if (!rowHeight && e > s) {
+        rowHeight = tbody.querySelector('tr[data-idx]').getBoundingClientRect().height || 34;
+        if (rowHeight !== h) return vt.render(true);
+      }
+    }
+    if (vt.next !== null && e >= vt.items.length - OVERSCAN) vt.more();
+  };
+
+  vt.more = async () => {
+    if (vt.loading || vt.next === null) return;
+    const generation = vt.generation;
+    vt.loading = true;
+    renderStatus();
+    let page;
+    try {
+      page = await opts.fetch(vt.next);
+    } catch (e) {
+      console.error('Failed to load rows:', e);
+      vt.next = null;
+    }
+    if (generation !== vt.generation) return;
+    vt.loading = false;
+    if (page) {
+      if (!vt.items.length) vt.first = page;
+      vt.items = vt.items.concat(page.items);
+      vt.next = page.next_cursor || null;
+      index = null;
+      if (opts.loaded) opts.loaded(page.items);
+    }
+    renderStatus();
+    vt.render(true);
+  };
+
+  // Start over from the first page, e.g. after a filter change. The mark
+  // is read first, so a write landing mid-load shows up in the next delta.
+  vt.reset = async () => {
+    const generation = ++vt.generation;
+    Object.assign(vt, { items: [], next: '', first: null, loading: true, stale: false, mark: null });
+    index = lastDelta = null;
+    start = end = -1;
+    el.scrollTop = 0;
+    headRow.innerHTML = opts.head();
+    renderStatus();
+    const mark = await readMark();
+    if (generation !== vt.generation) return;
+    vt.mark = mark;
+    vt.loading = false;
+    return vt.more();
+  };
+
+  async function readMark() {
+    if (!deltas) return null;
+    try {
+      return (await opts.delta('')).high_water;
+    } catch (e) {
+      // Storage without delta support: fall back to page reloads
+      deltas = false;
+      return null;
+    }
+  }
+
+  // Auto-refresh: with a mark, patch in the delta; otherwise swap in a
+  // changed first page while the user is still looking at it, and further
+  // down offer a reload instead of jumping.
+  vt.refresh = async () => {
+    if (!vt.first) return vt.reset();
+    if (vt.mark !== null) return sync();
+    const page = await opts.fetch('');
+    if (page === vt.first) return;
+    replaceFirstPage(page);
+  };
+
+  function replaceFirstPage(page) {
+    if (el.scrollTop / (rowHeight || 34) < vt.first.items.length / 2) {
+      vt.generation++;
+      Object.assign(vt, { items: page.items, next: page.next_cursor || null, first: page, loading: false, stale: false });
+      index = null;
+      if (opts.loaded) opts.loaded(page.items);
+      renderStatus();
+      vt.render(true);
+    } else {
+      vt.stale = true;
+      renderStatus();
+    }
+  }
+
+  const key = item => item.id;
+  // Whether `a` is listed below `b`
+  const below = (a, b) => a[opts.sortKey] < b[opts.sortKey] ||
+    (a[opts.sortKey] === b[opts.sortKey] && key(a) < key(b));
+
+  function indexOf(id) {
+    if (!index) index = new Map(vt.items.map((item, i) => [key(item), i]));
+    return index.get(id);
+  }
+
+  async function sync() {
+    const generation = vt.generation;
+    let delta;
+    try {
+      delta = await opts.delta(vt.mark);
+    } catch (e) {
+      console.error('Delta sync failed:', e);
+      return;
+    }
+    // A 304 hands back the same object: nothing new since the last one
+    if (generation !== vt.generation || delta === lastDelta) return;
+    lastDelta = delta;
+    vt.mark = delta.high_water;
+    if (delta.reset) {
+      const page = await opts.fetch('');
+      if (generation === vt.generation && page !== vt.first) replaceFirstPage(page);
+      return;
+    }
+    applyDelta(delta);
+  }
+
+  function applyDelta(delta) {
+    const h = rowHeight || 34;
+    const top = Math.floor(el.scrollTop / h);
+    let shift = 0;
+    const patched = [];
+    const removed = delta.removed.map(indexOf).filter(i => i !== undefined).sort((a, b) => b - a);
+    for (const i of removed) {
+      vt.items.splice(i, 1);
+      if (i < top) shift--;
+    }
+    if (removed.length) index = null;
+    const added = [];
+    for (const item of delta.items) {
+      const i = indexOf(key(item));
+      if (i === undefined) {
+        added.push(item);
+      } else {
+        vt.items[i] = item;
+        patched.push(i);
+      }
+    }
+    for (const item of added) {
+      let lo = 0, hi = vt.items.length;
+      if (item[opts.sortKey] == null) {
+        hi = 0;
+      } else {
+        while (lo < hi) {
+          const mid = (lo + hi) >> 1;
+          if (below(vt.items[mid], item)) hi = mid;
+          else lo = mid + 1;
+        }
+      }
+      // Past the loaded rows it belongs to a page not fetched yet
+      if (lo === vt.items.length && vt.next !== null) continue;
+      vt.items.splice(lo, 0, item);
+      if (lo < top) shift++;
+      index = null;
+    }
+    if (opts.loaded && delta.items.length) opts.loaded(delta.items);
+    if (removed.length || added.length) {
+      // Keep the rows in view where they are when rows come and go above
+      if (shift) el.scrollTop += shift * h;
+      renderStatus();
+      vt.render(true);
+      return;
+    }
+    for (const i of patched) {
+      const tr = tbody.querySelector(`tr[data-idx="${i}"]`);
+      if (tr) tr.innerHTML = opts.row(vt.items[i]);
+    }
+  }
+
+  el.addEventListener('scroll', () => {
+    if (!frame) frame = requestAnimationFrame(() => { frame = 0; vt.render(false); });
+  }, { passive: true });
+  window.addEventListener('resize', () => vt.render(false));
+  tbody.addEventListener('click', e => {
+    const tr = e.target.closest('tr[data-idx]');
+    if (tr) opts.onClick(vt.items[Number(tr.dataset.idx)]);
+  });
+  status.addEventListener('click', e => {
+    if (e.target.closest('button[data-reload]')) vt.reset();
+  });
+  return vt;
+}
+
 // ---- Tab Navigation ----
 document.getElementById('tabs').addEventListener('click', e => {
   const tab = e.target.closest('.tab');
@@ -472,30 +867,107 @@ document.getElementById('mem-sub-tabs').addEventListener('click', e => {
   currentMemType = st.dataset.mem;
   document.querySelectorAll('#mem-sub-tabs .sub-tab').forEach(t => t.classList.toggle('active', t === st));
   closeDetail('mem-detail');
-  loadMemories(currentMemType);
+  memTable.reset();
 });
 
 // Raw filter/limit
-document.getElementById('raw-filter').addEventListener('change', () => loadRaw());
-document.getElementById('raw-limit').addEventListener('change', () => loadRaw());
-document.getElementById('audit-limit').addEventListener('change', () => loadAudit());
+document.getElementById('raw-filter').addEventListener('change', () => rawTable.reset());
+document.getElementById('raw-limit').addEventListener('change', () => rawTable.reset());
+document.getElementById('audit-limit').addEventListener('change', () => { resetPager('audit'); loadAudit(); });
+
+bindPager('suggestions', () => loadSuggestions());
+bindPager('audit', () => loadAudit());
+bindPager('search', () => loadSearch());
+
+let searchTimer = null;
+document.getElementById('search-input').addEventListener('input', () => {
+  clearTimeout(searchTimer);
+  searchTimer = setTimeout(() => { resetPager('search'); loadSearch(); }, 200);
+});
+document.getElementById('search-type').addEventListener('change', () => { resetPager('search'); loadSearch(); });
+
+// Auto-refresh: the server pushes a change event whenever the stack is
+// written, so an idle dashboard makes no requests at all.
+const tabTopics = {
+  overview: ['stats', 'stack'],
+  fleet: ['stats'],
+  raw: ['raw', 'stack'],
+  memories: () => [currentMemType, 'stack'],
+  suggestions: ['suggestions', 'stack'],
+  audit: ['audit', 'stack'],
+  search: ['raw', 'episodes', 'beliefs', 'notes', 'goals', 'stack'],
+};
 
-// Auto-refresh
-document.getElementById('auto-refresh').addEventListener('change', e => {
-  if (e.target.checked) {
-    refreshTimer = setInterval(() => loadTab(currentTab, true), 5000);
-  } else {
-    clearInterval(refreshTimer);
-    refreshTimer = null;
+function onStackChange(event) {
+  const change = JSON.parse(event.data);
+  loadHeader().catch(e => console.error('Header load failed:', e));
+  const wanted = typeof tabTopics[currentTab] === 'function'
+    ? tabTopics[currentTab]() : (tabTopics[currentTab] || []);
+  if (change.topics.some(t => wanted.includes(t))) loadTab(currentTab, true);
+}
+
+function startPolling() {
+  if (!refreshTimer) refreshTimer = setInterval(() => loadTab(currentTab, true), 5000);
+}
+
+function startAutoRefresh() {
+  if (!window.EventSource) {
+    startPolling();
+    return;
   }
+  const source = new EventSource(STACK_BASE + '/api/events');
+  events = source;
+  source.addEventListener('change', onStackChange);
+  // Catch up on anything missed while reconnecting
+  source.addEventListener('open', () => loadTab(currentTab, true));
+  // A non-200 answer (too many streams, no event endpoint) closes the
+  // source for good instead of retrying; keep refreshing by polling.
+  source.addEventListener('error', () => {
+    if (events !== source || source.readyState !== EventSource.CLOSED) return;
+    events = null;
+    startPolling();
+  });
+}
+
+function stopAutoRefresh() {
+  if (events) events.close();
+  events = null;
+  clearInterval(refreshTimer);
+  refreshTimer = null;
+}
+
+document.getElementById('auto-refresh').addEventListener('change', e => {
+  if (e.target.checked) startAutoRefresh();
+  else stopAutoRefresh();
 });
 
 // ---- Loaders ----
+// The anxiety report is computed in the background and served stale while
+// that runs; look again shortly so the fresh one replaces it.
+let anxietyRecheck = null;
+function recheckAnxiety(anxiety) {
+  if (!anxiety.freshness || !anxiety.freshness.refreshing || anxietyRecheck) return;
+  anxietyRecheck = setTimeout(() => {
+    anxietyRecheck = null;
+    loadHeader();
+    if (currentTab === 'overview') loadOverview();
+  }, 1000);
+}
+
+function freshnessText(f) {
+  if (!f) return '';
+  let text = `computed ${Math.round(f.age_seconds)}s ago in ${Math.round(f.duration_ms)} ms`;
+  if (f.refreshing) text += ', refreshing';
+  return text;
+}
+
 async function loadHeader() {
   try {
-    const [stats, anxiety] = await Promise.all([api('/api/stats'), api('/api/anxiety')]);
+    const { stats, anxiety } = await api(OVERVIEW_BATCH);
     cache.stats = stats;
     cache.anxiety = anxiety;
+    recheckAnxiety(anxiety);
+    if (unchanged('header', stats, anxiety)) return;
 
     document.getElementById('stack-id').textContent = anxiety.stack_id || 'unknown';
 
@@ -507,7 +979,7 @@ async function loadHeader() {
 
     const badge = document.getElementById('anxiety-badge-wrap');
     const cls = anxietyClass(anxiety.overall_level);
-    badge.innerHTML = `<span class="anxiety-badge ${cls}">${anxiety.overall_emoji || ''} ${anxiety.overall_score || 0} ${anxiety.overall_level || 'Unknown'}</span>`;
+    badge.innerHTML = `<span class="anxiety-badge ${cls}" title="${esc(freshnessText(anxiety.freshness))}">${anxiety.overall_emoji || ''} ${anxiety.overall_score || 0} ${anxiety.overall_level || 'Unknown'}</span>`;
   } catch (e) {
     console.error('Failed to load header:', e);
   }
@@ -517,21 +989,20 @@ async function loadTab(tab, silent) {
   if (!silent) loadHeader().catch(e => console.error('Header load failed:', e));
   switch (tab) {
     case 'overview': return loadOverview();
+    case 'fleet': return loadFleet();
     case 'raw': return loadRaw();
-    case 'memories': return loadMemories(currentMemType);
+    case 'memories': return loadMemories();
     case 'suggestions': return loadSuggestions();
     case 'audit': return loadAudit();
+    case 'search': return loadSearch();
     case 'settings': return loadSettings();
   }
 }
 
 async function loadOverview() {
   try {
-    const [stats, anxiety, processing] = await Promise.all([
-      api('/api/stats'),
-      api('/api/anxiety'),
-      api('/api/processing'),
-    ]);
+    const { stats, anxiety, processing } = await api(OVERVIEW_BATCH);
+    if (unchanged('overview', stats, anxiety, processing)) return;
 
     // Stats cards
     const cards = document.getElementById('stats-cards');
@@ -547,10 +1018,13 @@ async function loadOverview() {
 
     // Anxiety dimensions
     const dims = document.getElementById('anxiety-dims');
+    const timing = (anxiety.freshness && anxiety.freshness.dimension_ms) || {};
+    document.getElementById('anxiety-freshness').textContent = freshnessText(anxiety.freshness);
     if (anxiety.dimensions) {
       dims.innerHTML = Object.entries(anxiety.dimensions).map(([name, dim]) => {
         const score = dim.score || 0;
-        const detail = dim.detail || '';
+        const ms = timing[name];
+        const detail = (dim.detail || '') + (ms != null ? ` · ${ms.toFixed(1)} ms` : '');
         const displayName = name.replace(/_/g, ' ');
         return `<div class="anxiety-dim">
           <div class="dim-name">${esc(displayName)} <span style="float:right;font-family:var(--mono);font-size:12px;color:${dimColor(score)}">${score}</span></div>
@@ -575,36 +1049,50 @@ async function loadOverview() {
   }
 }
 
-async function loadRaw() {
-  try {
-    const filter = document.getElementById('raw-filter').value;
-    const limit = document.getElementById('raw-limit').value;
-    let url = `/api/raw?limit=${limit}`;
-    if (filter !== '') url += `&processed=${filter}`;
-    const entries = await api(url);
-
-    const tbody = document.getElementById('raw-tbody');
-    tbody.innerHTML = entries.map(e => `<tr data-raw-id="${esc(e.id)}">
-      <td>${statusIcon(e.processed)}</td>
-      <td class="id-cell" title="${esc(e.id)}">${esc(truncId(e.id))}</td>
-      <td>${esc(fmtDate(e.captured_at))}</td>
-      <td>${esc(e.source || '')}</td>
-      <td class="blob-preview" title="${esc((e.blob || e.content || '').slice(0, 300))}">${esc((e.blob || e.content || '').slice(0, 120))}</td>
-      <td style="font-family:var(--mono);font-size:11px">${esc((e.processed_into || []).join(', '))}</td>
-      <td>${strengthBar(e.strength != null ? e.strength : 1.0)}</td>
-    </tr>`).join('');
+function derivedCell(type, id) {
+  const c = derivedCounts[`${type}:${id}`];
+  if (!c) return '<td class="derived-cell"></td>';
+  const title = c.targets.map(t => `${t.type}:${t.id}`).join('\n');
+  return `<td class="derived-cell" title="${esc(title)}">${c.count || ''}</td>`;
+}
 
-    tbody.querySelectorAll('tr').forEach(tr => {
-      tr.addEventListener('click', () => showRawDetail(tr.dataset.rawId, entries));
-    });
-  } catch (e) {
-    console.error('Failed to load raw:', e);
-  }
+function rawQuery() {
+  const filter = document.getElementById('raw-filter').value;
+  const limit = document.getElementById('raw-limit').value;
+  return `/api/raw?limit=${limit}&truncate=300` + (filter !== '' ? `&processed=${filter}` : '');
+}
+
+const rawTable = virtualTable(document.getElementById('raw-table'), {
+  status: 'raw-status',
+  head: () => ['Status', 'ID', 'Captured', 'Source', 'Blob', 'Processed Into', 'Derived', 'Strength']
+    .map(c => `<th>${c}</th>`).join(''),
+  row: e => `<td>${statusIcon(e.processed)}</td>
+    <td class="id-cell" title="${esc(e.id)}">${esc(truncId(e.id))}</td>
+    <td>${esc(fmtDate(e.captured_at))}</td>
+    <td>${esc(e.source || '')}</td>
+    <td class="blob-preview" title="${esc((e.blob || e.content || '').slice(0, 300))}">${esc((e.blob || e.content || '').slice(0, 120))}</td>
+    <td style="font-family:var(--mono);font-size:11px">${esc((e.processed_into || []).join(', '))}</td>
+    ${derivedCell('raw', e.id)}
+    <td>${strengthBar(e.strength != null ? e.strength : 1.0)}</td>`,
+  fetch: cursor => api(`${rawQuery()}&cursor=${encodeURIComponent(cursor)}`),
+  delta: since => api(`${rawQuery()}&since=${encodeURIComponent(since)}`),
+  sortKey: 'captured_at',
+  loaded: items => loadDerivedCounts('raw', items.map(e => e.id), () => rawTable.render(true)),
+  onClick: e => showRawDetail(e.id),
+});
+
+function loadRaw() {
+  return rawTable.refresh();
 }
 
-async function showRawDetail(rawId, entries) {
-  const entry = entries.find(e => e.id === rawId);
-  if (!entry) return;
+async function showRawDetail(rawId) {
+  let entry;
+  try {
+    entry = await api(`/api/raw/${encodeURIComponent(rawId)}?fields=*`);
+  } catch (e) {
+    console.error('Failed to load raw entry:', e);
+    return;
+  }
 
   const panel = document.getElementById('raw-detail');
   const kv = document.getElementById('raw-detail-kv');
@@ -622,19 +1110,7 @@ async function showRawDetail(rawId, entries) {
     `<span class="dk">${esc(k)}</span><span class="dv${k === 'Blob' ? ' blob-full' : ''}">${esc(v)}</span>`
   ).join('');
 
-  // Load provenance
-  const prov = document.getElementById('raw-prov');
-  try {
-    const derived = await api(`/api/provenance/raw/${rawId}`);
-    if (derived.length > 0) {
-      prov.innerHTML = '<strong>Derived memories:</strong><br>' +
-        derived.map(d => `<div class="prov-item">${esc(d.type)}:${esc(truncId(d.id))}</div>`).join('');
-    } else {
-      prov.innerHTML = '<em style="color:var(--text-dim)">No derived memories</em>';
-    }
-  } catch {
-    prov.innerHTML = '';
-  }
+  loadProvGraph(document.getElementById('raw-prov'), 'raw', rawId, 'down');
 
   panel.classList.add('open');
 }
@@ -679,39 +1155,41 @@ const memColumns = {
   },
 };
 
-async function loadMemories(memType) {
-  try {
-    const data = await api(`/api/${memType}`);
-    const def = memColumns[memType];
-    if (!def) return;
-
-    const wrap = document.getElementById('mem-table-wrap');
-    const thead = def.cols.map(c => `<th>${esc(c)}</th>`).join('');
-    const rows = data.map(item => {
-      const cells = def.row(item);
-      return `<tr data-mem-id="${esc(item[def.idField])}" data-mem-type="${esc(def.typeLabel)}">` +
-        cells.map((c, i) => {
-          if (i === def.strengthIdx && c === null) return `<td>${strengthBar(item.strength != null ? item.strength : 1.0)}</td>`;
-          if (i === 0) return `<td class="id-cell" title="${esc(item[def.idField])}">${esc(c)}</td>`;
-          if (c && typeof c === 'object' && c.__safeHtml) return `<td>${c.__safeHtml}</td>`;
-          return `<td>${esc(c)}</td>`;
-        }).join('') +
-        '</tr>';
-    }).join('');
+function memCells(def, item) {
+  return def.row(item).map((c, i) => {
+    if (i === def.strengthIdx && c === null) return `<td>${strengthBar(item.strength != null ? item.strength : 1.0)}</td>`;
+    if (i === 0) return `<td class="id-cell" title="${esc(item[def.idField])}">${esc(c)}</td>`;
+    if (c && typeof c === 'object' && c.__safeHtml) return `<td>${c.__safeHtml}</td>`;
+    return `<td>${esc(c)}</td>`;
+  }).join('') + derivedCell(def.typeLabel, item[def.idField]);
+}
 
-    wrap.innerHTML = `<table><thead><tr>${thead}</tr></thead><tbody>${rows}</tbody></table>`;
+const memTable = virtualTable(document.getElementById('mem-table-wrap'), {
+  status: 'memories-status',
+  head: () => memColumns[currentMemType].cols.map(c => `<th>${esc(c)}</th>`).join('') + '<th>Derived</th>',
+  row: item => memCells(memColumns[currentMemType], item),
+  fetch: cursor => api(`/api/${currentMemType}?limit=500&truncate=120&cursor=${encodeURIComponent(cursor)}`),
+  delta: since => api(`/api/${currentMemType}?truncate=120&since=${encodeURIComponent(since)}`),
+  sortKey: 'created_at',
+  loaded: items => {
+    const def = memColumns[currentMemType];
+    loadDerivedCounts(def.typeLabel, items.map(item => item[def.idField]), () => memTable.render(true));
+  },
+  onClick: item => showMemDetail(memColumns[currentMemType].typeLabel, item[memColumns[currentMemType].idField]),
+});
 
-    wrap.querySelectorAll('tr[data-mem-id]').forEach(tr => {
-      tr.addEventListener('click', () => showMemDetail(tr.dataset.memType, tr.dataset.memId, data));
-    });
-  } catch (e) {
-    console.error('Failed to load memories:', e);
-  }
+function loadMemories() {
+  return memTable.refresh();
 }
 
-async function showMemDetail(memType, memId, data) {
-  const item = data.find(d => d.id === memId);
-  if (!item) return;
+async function showMemDetail(memType, memId) {
+  let item;
+  try {
+    item = await api(`/api/memory/${memType}/${encodeURIComponent(memId)}?fields=*`);
+  } catch (e) {
+    console.error('Failed to load memory:', e);
+    return;
+  }
 
   document.getElementById('mem-detail-title').textContent = `${memType} Detail`;
   const kv = document.getElementById('mem-detail-kv');
@@ -728,31 +1206,60 @@ async function showMemDetail(memType, memId, data) {
     return `<span class="dk">${esc(k)}</span><span class="dv${isLong ? ' blob-full' : ''}">${esc(display)}</span>`;
   }).join('');
 
-  // Load provenance
-  const prov = document.getElementById('mem-prov');
+  loadProvGraph(document.getElementById('mem-prov'), memType, memId, 'both');
+
+  document.getElementById('mem-detail').classList.add('open');
+}
+
+// Derivation counts for loaded rows, keyed "type:id"; one request per page.
+const derivedCounts = {};
+async function loadDerivedCounts(type, ids, done) {
+  if (!ids.length) return;
+  let counts;
   try {
-    const derived = await api(`/api/provenance/${memType}/${memId}`);
-    let html = '';
-    if (item.derived_from && item.derived_from.length > 0) {
-      html += '<strong>Derived from:</strong><br>' +
-        item.derived_from.map(ref => `<div class="prov-item">${esc(ref)}</div>`).join('');
-    }
-    if (derived.length > 0) {
-      html += '<br><strong>Derived memories (children):</strong><br>' +
-        derived.map(d => `<div class="prov-item">${esc(d.type)}:${esc(truncId(d.id))}</div>`).join('');
-    }
-    if (!html) html = '<em style="color:var(--text-dim)">No provenance chain</em>';
-    prov.innerHTML = html;
-  } catch {
-    prov.innerHTML = '';
+    counts = await api(`/api/provenance-counts/${type}?ids=${ids.map(encodeURIComponent).join(',')}`);
+  } catch (e) {
+    return;  // column stays blank, e.g. non-SQLite storage
   }
+  for (const [id, c] of Object.entries(counts)) derivedCounts[`${type}:${id}`] = c;
+  done();
+}
 
-  document.getElementById('mem-detail').classList.add('open');
+// Provenance graph: one column per level, ancestors left, derived right.
+async function loadProvGraph(el, type, id, direction) {
+  let graph;
+  try {
+    graph = await api(`/api/provenance-graph/${type}/${encodeURIComponent(id)}?direction=${direction}&depth=3`);
+  } catch {
+    el.innerHTML = '';
+    return;
+  }
+  if (graph.nodes.length <= 1) {
+    el.innerHTML = '<em style="color:var(--text-dim)">No provenance chain</em>';
+    return;
+  }
+  const levels = {};
+  graph.nodes.forEach(n => (levels[n.depth] = levels[n.depth] || []).push(n));
+  const depthLabel = d => d === 0 ? 'this' : d < 0 ? `source ${-d}` : `derived ${d}`;
+  el.innerHTML = `<strong>Provenance</strong> <span style="color:var(--text-dim)">(${graph.nodes.length} nodes, ${graph.edges.length} edges${graph.truncated ? ', truncated' : ''})</span>
+    <div class="prov-graph">${Object.keys(levels).map(Number).sort((a, b) => a - b).map(d => `
+      <div class="prov-level"><div class="prov-level-label">${depthLabel(d)}</div>
+        ${levels[d].map(n => `<div class="prov-node${d === 0 ? ' root' : ''}${n.missing ? ' missing' : ''}"
+          data-type="${esc(n.type)}" data-id="${esc(n.id)}" title="${esc(n.key)}">
+          <span class="pn-type">${esc(n.type)}</span>${esc(n.missing ? truncId(n.id) : n.label)}</div>`).join('')}
+      </div>`).join('')}
+    </div>`;
+  el.querySelectorAll('.prov-node:not(.root):not(.missing)').forEach(node => {
+    node.addEventListener('click', () => openHit(node.dataset.type, node.dataset.id));
+  });
 }
 
 async function loadSuggestions() {
   try {
-    const data = await api('/api/suggestions');
+    const page = await api(`/api/suggestions?${pageParam('suggestions')}`);
+    if (unchanged('suggestions', page)) return;
+    const data = page.items;
+    renderPager('suggestions', page.next_cursor);
     const tbody = document.getElementById('sug-tbody');
     tbody.innerHTML = data.map(s => {
       const statusColor = s.status === 'pending' ? 'var(--yellow)' :
@@ -795,7 +1302,10 @@ async function loadSuggestions() {
 async function loadAudit() {
   try {
     const limit = document.getElementById('audit-limit').value;
-    const data = await api(`/api/audit?limit=${limit}`);
+    const page = await api(`/api/audit?limit=${limit}&${pageParam('audit')}`);
+    if (unchanged('audit', page)) return;
+    const data = page.items;
+    renderPager('audit', page.next_cursor);
     const tbody = document.getElementById('audit-tbody');
     tbody.innerHTML = data.map(a => {
       const details = typeof a.details === 'object' ? JSON.stringify(a.details) : (a.details || '');
@@ -813,9 +1323,86 @@ async function loadAudit() {
   }
 }
 
+function renderMetrics(rows) {
+  const ms = v => v == null ? '-' : v.toFixed(1);
+  document.getElementById('metrics-body').innerHTML = rows.map(r => `<tr>
+    <td class="id-cell">${esc(r.route)}</td><td>${r.requests}</td><td>${r.errors}</td>
+    <td>${ms(r.p50_ms)}</td><td>${ms(r.p95_ms)}</td>
+    <td>${ms(r.avg_ms.kernle)}</td><td>${ms(r.avg_ms.serialize)}</td><td>${ms(r.avg_ms.write)}</td>
+    <td>${Math.round(r.avg_bytes)}</td>
+  </tr>`).join('');
+}
+
+// Search hits mark matched terms with [ and ].
+function highlight(snippet) {
+  return esc(snippet).replace(/\[/g, '<mark>').replace(/\]/g, '</mark>');
+}
+
+function openHit(type, id) {
+  if (type === 'raw') {
+    document.querySelector('.tab[data-tab="raw"]').click();
+    showRawDetail(id);
+    return;
+  }
+  document.querySelector('.tab[data-tab="memories"]').click();
+  const sub = document.querySelector(`#mem-sub-tabs .sub-tab[data-mem="${type}s"]`);
+  if (sub) sub.click();
+  showMemDetail(type, id);
+}
+
+// While the index is being built the server answers 503; ask again shortly.
+let searchRetry = null;
+function searchStatus(text) {
+  const el = document.getElementById('search-status');
+  el.textContent = text || '';
+  el.classList.toggle('hidden', !text);
+}
+
+async function loadSearch() {
+  const q = document.getElementById('search-input').value.trim();
+  const tbody = document.getElementById('search-tbody');
+  clearTimeout(searchRetry);
+  if (!q) {
+    tbody.innerHTML = '';
+    searchStatus('');
+    renderPager('search', null);
+    return;
+  }
+  try {
+    const type = document.getElementById('search-type').value;
+    const types = type ? `&types=${type}` : '';
+    const page = await api(`/api/search?q=${encodeURIComponent(q)}${types}&limit=50&${pageParam('search')}`);
+    searchStatus(page.indexing ? 'Indexing recent changes; results may be incomplete' : '');
+    if (page.indexing) searchRetry = setTimeout(loadSearch, 2000);
+    if (unchanged('search', page)) return;
+    renderPager('search', page.next_cursor);
+    tbody.innerHTML = page.items.map(h => `<tr data-hit-type="${esc(h.type)}" data-hit-id="${esc(h.id)}">
+      <td>${esc(h.type)}</td>
+      <td class="id-cell" title="${esc(h.id)}">${esc(truncId(h.id))}</td>
+      <td class="blob-preview">${highlight(h.snippet)}</td>
+    </tr>`).join('');
+    tbody.querySelectorAll('tr[data-hit-id]').forEach(tr => {
+      tr.addEventListener('click', () => openHit(tr.dataset.hitType, tr.dataset.hitId));
+    });
+  } catch (e) {
+    if (String(e.message).startsWith('503:')) {
+      const { documents } = JSON.parse(e.message.slice(4));
+      searchStatus(`Building the search index (${documents} documents so far)…`);
+      searchRetry = setTimeout(loadSearch, 2000);
+      return;
+    }
+    console.error('Search failed:', e);
+  }
+}
+
 async function loadSettings() {
   try {
-    const [settings, processing] = await Promise.all([api('/api/settings'), api('/api/processing')]);
+    const [{ settings, processing }, metrics] = await Promise.all([
+      api('/api/batch?q=settings,processing'),
+      api('/api/metrics'),
+    ]);
+    renderMetrics(metrics);
+    if (unchanged('settings', settings, processing)) return;
 
     const sg = document.getElementById('settings-grid');
     sg.innerHTML = Object.entries(settings).map(([k, v]) =>
@@ -834,7 +1421,63 @@ async function loadSettings() {
   }
 }
 
+// ---- Stacks ----
+function stackUrl(id) {
+  return `/s/${encodeURIComponent(id)}/`;
+}
+
+async function loadStacks() {
+  try {
+    const info = await api('/api/stacks');
+    if (!info.multi_stack) return;
+    const picker = document.getElementById('stack-picker');
+    picker.innerHTML = info.stacks.map(id =>
+      `<option value="${esc(id)}"${id === info.current ? ' selected' : ''}>${esc(id)}</option>`
+    ).join('');
+    picker.classList.remove('hidden');
+    document.getElementById('stack-id').classList.add('hidden');
+    document.getElementById('fleet-tab').classList.remove('hidden');
+  } catch (e) {
+    console.error('Failed to load stacks:', e);
+  }
+}
+
+document.getElementById('stack-picker').addEventListener('change', e => {
+  location.href = stackUrl(e.target.value);
+});
+
+const FLEET_COLUMNS = [
+  ['raw', 'Raw'], ['episodes', 'Episodes'], ['beliefs', 'Beliefs'], ['values', 'Values'],
+  ['goals', 'Goals'], ['notes', 'Notes'], ['relationships', 'Relationships'],
+  ['drives', 'Drives'], ['suggestions', 'Suggestions'], ['pending_suggestions', 'Pending'],
+];
+
+async function loadFleet() {
+  try {
+    const fleet = await api('/api/fleet');
+    if (unchanged('fleet', fleet)) return;
+    const current = document.getElementById('stack-picker').value;
+    const wrap = document.getElementById('fleet-table-wrap');
+    const thead = '<th>Stack</th>' + FLEET_COLUMNS.map(([, label]) => `<th>${label}</th>`).join('');
+    const rows = fleet.map(({ stack_id, stats }) =>
+      `<tr data-stack="${esc(stack_id)}"${stack_id === current ? ' class="selected"' : ''}>
+        <td class="id-cell" title="${esc(stack_id)}">${esc(stack_id)}</td>
+        ${FLEET_COLUMNS.map(([key]) => `<td>${stats[key] || 0}</td>`).join('')}
+      </tr>`
+    ).join('');
+    wrap.innerHTML = `<table><thead><tr>${thead}</tr></thead><tbody>${rows}</tbody></table>`;
+  } catch (e) {
+    console.error('Failed to load fleet:', e);
+  }
+}
+
+document.getElementById('fleet-table-wrap').addEventListener('click', e => {
+  const tr = e.target.closest('tr[data-stack]');
+  if (tr) location.href = stackUrl(tr.dataset.stack);
+});
+
 // ---- Init ----
+loadStacks();
 loadHeader();
 loadTab('overview');
 </script>
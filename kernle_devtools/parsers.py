@@ -7,13 +7,40 @@ def add_dashboard_parser(parent_sub):
     dash.add_argument("--port", type=int, default=8420)
     dash.add_argument("--host", default="127.0.0.1")
     dash.add_argument("--no-open", action="store_true")
+    dash.add_argument(
+        "--workers", type=int, default=8, help="Concurrent request workers (default: 8)"
+    )
+    dash.add_argument(
+        "--max-stacks",
+        type=int,
+        default=16,
+        help="Other stacks kept open for /s/<stack_id>/ (default: 16, 0 disables)",
+    )
     return dash
 
 
+def add_export_parser(parent_sub):
+    """Add export subcommand parser."""
+    export = parent_sub.add_parser("export", help="Stream every memory as NDJSON or CSV")
+    export.add_argument("--format", "-f", choices=("ndjson", "csv"), default="ndjson")
+    export.add_argument(
+        "--types", "-t", help="Comma-separated memory types, e.g. raw,belief (default: all)"
+    )
+    export.add_argument(
+        "--output", "-o", default="-", help="Output file (default: stdout; .gz implies --gzip)"
+    )
+    export.add_argument("--gzip", "-z", action="store_true", help="Gzip the output")
+    export.add_argument(
+        "--batch-size", type=int, default=1000, help="Rows read per query (default: 1000)"
+    )
+    return export
+
+
 def add_session_parsers(parent_sub):
     """Add session/report parsers for standalone CLI.
 
-    Uses same grammar as core: 'session start', 'session list', 'report'.
+    Uses same grammar as core: 'session start', 'session list', 'report',
+    plus 'session watch'.
     """
     p_session = parent_sub.add_parser("session", help="Diagnostic sessions")
     session_sub = p_session.add_subparsers(dest="session_action", required=True)
@@ -22,6 +49,39 @@ def add_session_parsers(parent_sub):
     p_start.add_argument("--type", "-t", default="self_requested")
     p_start.add_argument("--access", "-a", default="structural")
     p_start.add_argument("--json", "-j", action="store_true")
+    p_start.add_argument(
+        "--format",
+        choices=["text", "json", "ndjson"],
+        help="Output format; ndjson writes one finding per line as checks finish",
+    )
+    p_start.add_argument(
+        "--jobs", type=int, default=5, help="Structural checks run concurrently (default: 5)"
+    )
+    p_start.add_argument(
+        "--incremental",
+        "-i",
+        action="store_true",
+        help="Only re-run checks affected by changes since the last completed session",
+    )
+
+    p_watch = session_sub.add_parser("watch", help="Run routine sessions on a schedule")
+    p_watch.add_argument(
+        "--interval", default="15m", help="Time between sessions, e.g. 90s, 15m, 2h (default: 15m)"
+    )
+    p_watch.add_argument(
+        "--jitter",
+        type=float,
+        default=0.1,
+        help="Fraction each interval is randomly shortened or lengthened by (default: 0.1)",
+    )
+    p_watch.add_argument(
+        "--jobs", type=int, default=1, help="Structural checks run concurrently (default: 1)"
+    )
+    p_watch.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-run every check each session instead of only those affected by changes",
+    )
 
     p_list = session_sub.add_parser("list", help="List diagnostic sessions")
     p_list.add_argument("--json", "-j", action="store_true")
@@ -29,3 +89,41 @@ def add_session_parsers(parent_sub):
     p_report = parent_sub.add_parser("report", help="Show diagnostic report")
     p_report.add_argument("session_id")
     p_report.add_argument("--json", "-j", action="store_true")
+    p_report.add_argument(
+        "--format",
+        choices=["text", "json", "ndjson"],
+        help="Output format; ndjson writes one finding per line then a summary",
+    )
+
+
+def add_fleet_parser(parent_sub):
+    """Add 'fleet doctor' parser for standalone CLI."""
+    p_fleet = parent_sub.add_parser("fleet", help="Commands across many stacks")
+    fleet_sub = p_fleet.add_subparsers(dest="fleet_action", required=True)
+
+    p_doctor = fleet_sub.add_parser("doctor", help="Run diagnostic sessions across stacks")
+    source = p_doctor.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--stacks-from", metavar="FILE", help="File of stack IDs, one per line ('-' for stdin)"
+    )
+    source.add_argument("--all", action="store_true", help="Every stack in the database")
+    p_doctor.add_argument("--db", help="Database path (default: Kernle's)")
+    p_doctor.add_argument(
+        "--workers", type=int, default=None, help="Stacks checked at once (default: CPU count)"
+    )
+    p_doctor.add_argument(
+        "--timeout",
+        type=float,
+        default=300,
+        help="Seconds each stack's session may take; 0 for no limit (default: 300)",
+    )
+    p_doctor.add_argument(
+        "--jobs", type=int, default=1, help="Structural checks run at once per stack (default: 1)"
+    )
+    p_doctor.add_argument(
+        "--incremental",
+        "-i",
+        action="store_true",
+        help="Only re-run checks affected by changes since each stack's last session",
+    )
+    p_doctor.add_argument("--json", "-j", action="store_true")
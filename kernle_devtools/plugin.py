@@ -1,4 +1,4 @@
-"""DevtoolsPlugin — registers 'dev dashboard' command via PluginProtocol."""
+"""DevtoolsPlugin — registers 'dev dashboard' and 'dev export' via PluginProtocol."""
 
 
 class DevtoolsPlugin:
@@ -15,15 +15,20 @@ class DevtoolsPlugin:
     def register_cli(self, subparsers):
         dev = subparsers.add_parser("dev", help="Admin dev tools")
         dev_sub = dev.add_subparsers(dest="dev_action", required=True)
-        from kernle_devtools.parsers import add_dashboard_parser
+        from kernle_devtools.parsers import add_dashboard_parser, add_export_parser
 
         add_dashboard_parser(dev_sub)
+        add_export_parser(dev_sub)
 
     def handle_cli(self, args, k):
         if args.dev_action == "dashboard":
             from kernle_devtools.cli.dashboard import cmd_dashboard
 
             cmd_dashboard(args, k)
+        elif args.dev_action == "export":
+            from kernle_devtools.cli.export import cmd_export
+
+            cmd_export(args, k)
 
     def activate(self, context):
         self._context = context
@@ -1,13 +1,29 @@
 """Tests for admin health diagnostics (migrated from kernle core)."""
 
 import json
+import signal
+import threading
+import time
 import uuid
 from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
 
 import pytest
 
+from kernle.storage import SQLiteStorage
 from kernle.storage.base import Belief, DiagnosticReport, DiagnosticSession
+from kernle_devtools.admin_health import fleet
+from kernle_devtools.admin_health.checks import (
+    CLOCK_CHECKS,
+    STRUCTURAL_CHECKS,
+    affected_checks,
+    failed_checks,
+    findings_of,
+    run_checks,
+    severity_counts,
+)
 from kernle_devtools.admin_health.diagnostics import (
+    CHECKS_SETTING,
     _check_operator_consent,
     _generate_report_findings,
     _generate_summary,
@@ -15,7 +31,20 @@ from kernle_devtools.admin_health.diagnostics import (
     cmd_doctor_report,
     cmd_doctor_session_list,
     cmd_doctor_session_start,
+    run_session,
+)
+from kernle_devtools.admin_health.fleet import (
+    StackOutcome,
+    StackTimeout,
+    cmd_fleet_doctor,
+    doctor_stack,
+    fleet_summary,
+    list_stacks,
+    rank_outcomes,
+    read_stack_ids,
+    run_fleet,
 )
+from kernle_devtools.admin_health.watch import SessionWatch, parse_interval
 from kernle.structural import StructuralFinding, run_structural_checks
 
 
@@ -386,3 +415,553 @@ class TestRecommendations:
     def test_unknown_recommendation(self):
         result = _recommendation_for("unknown_check")
         assert "Review" in result
+
+
+def _save_low_confidence_beliefs(storage, count):
+    for i in range(count):
+        storage.save_belief(
+            Belief(
+                id=str(uuid.uuid4()),
+                stack_id="test_agent",
+                statement=f"Shaky belief {i}",
+                confidence=0.1,
+                created_at=datetime.now(timezone.utc),
+            )
+        )
+
+
+class TestCheckRunner:
+    """Tests for the concurrent structural check runner."""
+
+    def test_results_in_check_order(self, diag_setup):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 3)
+        results = run_checks(k, jobs=5)
+        assert [r.check for r in results] == list(STRUCTURAL_CHECKS)
+        assert all(r.error is None and r.seconds >= 0 for r in results)
+
+    def test_matches_sequential_checks(self, diag_setup):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 3)
+        expected = [f.to_dict() for f in run_structural_checks(k)]
+        assert [f.to_dict() for f in findings_of(run_checks(k, jobs=5))] == expected
+        assert [f.to_dict() for f in findings_of(run_checks(k, jobs=1))] == expected
+
+    def test_counts_records_scanned(self, diag_setup):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 3)
+        scanned = {r.check: r.scanned for r in run_checks(k)}
+        assert scanned["low_confidence_belief"] == 3
+        assert scanned["belief_contradiction"] == 3
+        assert scanned["stale_goal"] == 0
+        # The counting wrappers never touch the caller's instance
+        assert "get_beliefs" not in vars(k._storage)
+
+    def test_checks_run_on_worker_threads(self, diag_setup):
+        k, _ = diag_setup
+        threads = set()
+
+        def check(kernle):
+            threads.add(threading.current_thread().name)
+            assert kernle is not k
+            return []
+
+        with patch.dict(STRUCTURAL_CHECKS, {name: check for name in STRUCTURAL_CHECKS}):
+            run_checks(k, jobs=5)
+        assert all(name.startswith("doctor-check") for name in threads)
+
+    def test_failed_check_is_reported(self, diag_setup):
+        k, _ = diag_setup
+
+        def broken(kernle):
+            raise RuntimeError("boom")
+
+        with patch.dict(STRUCTURAL_CHECKS, {"stale_goal": broken}):
+            results = run_checks(k)
+        failed = results[-1]
+        assert failed.check == "stale_goal"
+        assert failed.error == "RuntimeError: boom"
+        assert failed.findings == []
+        assert failed.to_dict()["error"] == "RuntimeError: boom"
+
+    def test_session_records_check_timing(self, diag_setup, capsys):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 2)
+
+        class Args:
+            type = "self_requested"
+            access = "structural"
+            json = True
+            jobs = 2
+
+        cmd_doctor_session_start(Args(), k)
+        data = json.loads(capsys.readouterr().out)
+        checks = {c["check"]: c for c in data["checks"]}
+        assert set(checks) == set(STRUCTURAL_CHECKS)
+        assert checks["low_confidence_belief"]["findings"] == 2
+        assert checks["low_confidence_belief"]["scanned"] == 2
+        # Timing is kept out of the report's human summary
+        report = storage.get_diagnostic_report(data["report_id"])
+        assert report.summary == data["summary"] == "Found 2 finding(s): 2 warning(s)"
+        record = json.loads(storage.get_stack_setting(CHECKS_SETTING))
+        assert record["checks"] == data["checks"]
+
+
+class TestIncrementalSession:
+    """Tests for sessions that only re-run checks affected by changes."""
+
+    class Args:
+        type = "routine"
+        access = "structural"
+        json = True
+        incremental = True
+
+    def _start(self, k, capsys):
+        cmd_doctor_session_start(self.Args(), k)
+        return json.loads(capsys.readouterr().out)
+
+    @staticmethod
+    def _rerun(data):
+        return {c["check"] for c in data["checks"] if not c["carried"]}
+
+    def test_first_run_checks_everything(self, diag_setup, capsys):
+        k, _ = diag_setup
+        data = self._start(k, capsys)
+        assert data["previous_session_id"] is None
+        assert self._rerun(data) == set(STRUCTURAL_CHECKS)
+
+    def test_unchanged_stack_carries_findings_over(self, diag_setup, capsys):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 2)
+        storage.save_belief(
+            Belief(
+                id=str(uuid.uuid4()),
+                stack_id="test_agent",
+                statement="Derived from a lost episode",
+                confidence=0.9,
+                derived_from=["episode:missing"],
+                created_at=datetime.now(timezone.utc),
+            )
+        )
+        first = self._start(k, capsys)
+        second = self._start(k, capsys)
+        assert second["previous_session_id"] == first["session_id"]
+        assert self._rerun(second) == CLOCK_CHECKS
+        assert second["findings"] == first["findings"]
+        checks = {c["check"]: c for c in second["checks"]}
+        assert checks["orphaned_reference"]["carried"]
+        # The saved report is complete, not just the re-run checks
+        report = storage.get_diagnostic_report(second["report_id"])
+        categories = [f["category"] for f in report.findings]
+        assert categories.count("orphaned_reference") == 1
+        assert categories.count("low_confidence_belief") == 2
+
+    def test_changed_beliefs_rerun_belief_checks(self, diag_setup, capsys):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 1)
+        self._start(k, capsys)
+        _save_low_confidence_beliefs(storage, 1)
+        data = self._start(k, capsys)
+        assert self._rerun(data) == CLOCK_CHECKS | {
+            "low_confidence_belief",
+            "belief_contradiction",
+            "orphaned_reference",
+        }
+        checks = {c["check"]: c for c in data["checks"]}
+        assert checks["low_confidence_belief"]["findings"] == 2
+
+    def test_deletion_reruns_orphan_check(self, diag_setup, capsys):
+        k, storage = diag_setup
+        raw_id = k.raw("soon gone")
+        self._start(k, capsys)
+        k.raw("another")
+        assert self._rerun(self._start(k, capsys)) == CLOCK_CHECKS
+        storage.delete_raw(raw_id)
+        assert "orphaned_reference" in self._rerun(self._start(k, capsys))
+
+    def test_failed_check_is_rerun(self, diag_setup, capsys):
+        k, _ = diag_setup
+
+        def broken(kernle):
+            raise RuntimeError("boom")
+
+        with patch.dict(STRUCTURAL_CHECKS, {"low_confidence_belief": broken}):
+            self._start(k, capsys)
+        assert "low_confidence_belief" in self._rerun(self._start(k, capsys))
+
+    def test_failed_checks(self):
+        checks = [
+            {"check": "stale_goal", "error": "RuntimeError: boom"},
+            {"check": "stale-relationship", "error": "ValueError: no"},
+            {"check": "low_confidence_belief", "error": None, "carried": True},
+        ]
+        assert failed_checks(checks) == {"stale_goal", "stale-relationship"}
+        assert failed_checks([]) == set()
+
+    def test_check_results_kept_with_report(self, diag_setup, capsys):
+        k, storage = diag_setup
+        data = self._start(k, capsys)
+        record = json.loads(storage.get_stack_setting(CHECKS_SETTING))
+        assert record["report_id"] == data["report_id"]
+        assert record["checks"] == data["checks"]
+
+    def test_missing_check_results_run_everything(self, diag_setup, capsys):
+        k, storage = diag_setup
+        self._start(k, capsys)
+        storage.set_stack_setting(CHECKS_SETTING, json.dumps({"report_id": "other"}))
+        data = self._start(k, capsys)
+        assert data["previous_session_id"] is None
+        assert self._rerun(data) == set(STRUCTURAL_CHECKS)
+
+    def test_unknown_changes_without_sql(self):
+        assert affected_checks(MagicMock(stack_id="s1"), "2026-01-01T00:00:00+00:00") is None
+
+
+class TestSessionWatch:
+    """Tests for scheduled routine sessions."""
+
+    def test_parse_interval(self):
+        assert parse_interval("90") == 90
+        assert parse_interval("30s") == 30
+        assert parse_interval("15m") == 900
+        assert parse_interval("1.5h") == 5400
+        assert parse_interval("1d") == 86400
+        for bad in ("", "0", "-5m", "15x", "m"):
+            with pytest.raises(ValueError):
+                parse_interval(bad)
+
+    def test_jitter_stays_in_bounds(self, diag_setup):
+        k, _ = diag_setup
+        watch = SessionWatch(k, 100, jitter=0.2)
+        waits = [watch.next_wait() for _ in range(200)]
+        assert all(80 <= w <= 120 for w in waits)
+        assert len(set(waits)) > 1
+
+    def test_first_tick_runs_and_saves_report(self, diag_setup):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 1)
+        run = SessionWatch(k, 60).tick()
+        assert run is not None
+        assert run.session.session_type == "routine"
+        report = storage.get_diagnostic_report(run.report.id)
+        assert [f["category"] for f in report.findings] == ["low_confidence_belief"]
+        sessions = storage.get_diagnostic_sessions(status="completed")
+        assert [s.id for s in sessions] == [run.session.id]
+
+    def test_skips_until_stack_changes(self, diag_setup):
+        k, storage = diag_setup
+        watch = SessionWatch(k, 60)
+        first = watch.tick()
+        assert watch.tick() is None
+        assert watch.tick() is None
+        k.raw("something new")
+        second = watch.tick()
+        assert second is not None
+        assert second.previous.id == first.session.id
+        assert watch.tick() is None
+        assert (watch.runs, watch.skips) == (2, 3)
+        assert len(storage.get_diagnostic_sessions()) == 2
+
+    def test_diagnostic_writes_alone_do_not_trigger_runs(self, diag_setup):
+        k, _ = diag_setup
+        watch = SessionWatch(k, 60)
+        watch.tick()
+        # Another tool's session changes the file but no memory
+        SessionWatch(k, 60).tick()
+        assert watch.tick() is None
+
+    def test_run_survives_failed_tick(self, diag_setup):
+        k, _ = diag_setup
+        watch = SessionWatch(k, 0.01, jitter=0)
+        ticks = []
+        with patch.object(watch, "tick", side_effect=[RuntimeError("boom"), None]):
+            watch.run(on_tick=lambda run, seconds: ticks.append(run), max_runs=2)
+        assert ticks == [None]
+
+    def test_stop_ends_wait(self, diag_setup):
+        k, _ = diag_setup
+        watch = SessionWatch(k, 3600)
+        thread = threading.Thread(target=watch.run)
+        thread.start()
+        for _ in range(200):
+            if watch.runs:
+                break
+            threading.Event().wait(0.05)
+        watch.stop()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert watch.runs == 1
+
+
+def _escaped_timeout(stack_id, *args):
+    """Stands in for doctor_stack in pool workers: agent_b times out unhandled."""
+    if stack_id == "agent_b":
+        raise StackTimeout()
+    return StackOutcome(stack_id)
+
+
+class TestFleetDoctor:
+    """Tests for diagnostic sessions across many stacks."""
+
+    @pytest.fixture
+    def fleet_db(self, diag_setup):
+        """A database with test_agent and two more stacks, agent_b the most troubled."""
+        _, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 1)
+        for stack_id, shaky in (("agent_b", 3), ("agent_c", 0)):
+            other = SQLiteStorage(stack_id=stack_id, db_path=storage.db_path)
+            for i in range(shaky):
+                other.save_belief(
+                    Belief(
+                        id=str(uuid.uuid4()),
+                        stack_id=stack_id,
+                        statement=f"Shaky {i}",
+                        confidence=0.1,
+                        created_at=datetime.now(timezone.utc),
+                    )
+                )
+            other.save_raw(f"entry for {stack_id}")
+            other.close()
+        return storage.db_path
+
+    def test_read_stack_ids(self):
+        lines = ["agent_a\n", "\n", "# a comment\n", "agent_b  # trailing\n", "agent_a\n"]
+        assert read_stack_ids(lines) == ["agent_a", "agent_b"]
+
+    def test_list_stacks(self, fleet_db):
+        assert list_stacks(fleet_db) == ["agent_b", "agent_c", "test_agent"]
+
+    def test_run_fleet_saves_reports_and_ranks(self, fleet_db):
+        seen = []
+        outcomes = run_fleet(
+            ["test_agent", "agent_b", "agent_c"], fleet_db, workers=2, on_outcome=seen.append
+        )
+        assert [o.stack_id for o in outcomes] == ["test_agent", "agent_b", "agent_c"]
+        assert sorted(o.stack_id for o in seen) == ["agent_b", "agent_c", "test_agent"]
+        assert all(o.status == "ok" for o in outcomes)
+        by_stack = {o.stack_id: o for o in outcomes}
+        assert by_stack["agent_b"].warnings + by_stack["agent_b"].info == 3
+        # Each stack's report is saved in its own stack
+        storage = SQLiteStorage(stack_id="agent_b", db_path=fleet_db)
+        report = storage.get_diagnostic_report(by_stack["agent_b"].report_id)
+        assert report.session_id == by_stack["agent_b"].session_id
+        storage.close()
+
+        summary = fleet_summary(outcomes)
+        assert summary["stacks"] == 3
+        assert summary["ok"] == 3
+        assert [row["stack_id"] for row in summary["ranked"]] == [
+            "agent_b",
+            "test_agent",
+            "agent_c",
+        ]
+
+    def test_rank_puts_failures_first(self):
+        outcomes = [
+            StackOutcome("quiet"),
+            StackOutcome("noisy", errors=1),
+            StackOutcome("warned", warnings=5),
+            StackOutcome("stuck", status="timeout"),
+        ]
+        ranked = [o.stack_id for o in rank_outcomes(outcomes)]
+        assert ranked == ["stuck", "noisy", "warned", "quiet"]
+        summary = fleet_summary(outcomes)
+        assert (summary["ok"], summary["timeout"], summary["failed"]) == (3, 1, 0)
+
+    @pytest.mark.parametrize("jobs", [1, 3])
+    def test_stack_timeout(self, fleet_db, monkeypatch, jobs):
+        released = threading.Event()
+
+        def slow_check(k):
+            # Keeps reading the stack until the test is over, or for 5s
+            deadline = time.monotonic() + 5
+            while not released.wait(0.01) and time.monotonic() < deadline:
+                k._storage.get_beliefs(limit=10)
+            return []
+
+        monkeypatch.setitem(STRUCTURAL_CHECKS, "stale_goal", slow_check)
+        try:
+            outcome = doctor_stack("agent_b", fleet_db, jobs=jobs, timeout=0.3)
+        finally:
+            released.set()
+        assert outcome.status == "timeout"
+        assert outcome.seconds < 2
+        assert outcome.report_id is None
+        storage = SQLiteStorage(stack_id="agent_b", db_path=fleet_db)
+        assert [s.status for s in storage.get_diagnostic_sessions()] == ["cancelled"]
+        assert storage.get_diagnostic_sessions()[0].completed_at is not None
+
+    def test_alarm_disarmed_once_session_returns(self, fleet_db, monkeypatch):
+        def slow_counts(findings):
+            time.sleep(0.5)
+            return severity_counts(findings)
+
+        monkeypatch.setattr(fleet, "severity_counts", slow_counts)
+        outcome = doctor_stack("agent_c", fleet_db, timeout=0.2)
+        assert outcome.status == "ok"
+        assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+    def test_timeout_escaping_worker_fails_one_stack(self, fleet_db, monkeypatch):
+        monkeypatch.setattr(fleet, "doctor_stack", _escaped_timeout)
+        outcomes = run_fleet(["agent_b", "agent_c"], fleet_db, workers=2, timeout=5)
+        assert [o.status for o in outcomes] == ["timeout", "ok"]
+
+    def test_failed_session_is_cancelled(self, diag_setup):
+        k, storage = diag_setup
+
+        def broken(result):
+            raise RuntimeError("disk full")
+
+        with pytest.raises(RuntimeError):
+            run_session(k, "routine", jobs=1, on_result=broken)
+        assert [s.status for s in storage.get_diagnostic_sessions()] == ["cancelled"]
+        assert storage.get_diagnostic_reports() == []
+
+    def test_bad_stack_fails_alone(self, fleet_db):
+        outcomes = run_fleet(["../escape", "agent_c"], fleet_db, workers=2)
+        assert [o.status for o in outcomes] == ["failed", "ok"]
+        assert "ValueError" in outcomes[0].error
+
+    def test_cmd_fleet_doctor_json(self, fleet_db, tmp_path, capsys):
+        stacks = tmp_path / "stacks.txt"
+        stacks.write_text("agent_b\nagent_c\n")
+
+        class Args:
+            stacks_from = str(stacks)
+            db = str(fleet_db)
+            workers = 2
+            timeout = 60
+            jobs = 1
+            incremental = False
+            json = True
+
+        cmd_fleet_doctor(Args())
+        data = json.loads(capsys.readouterr().out)
+        assert data["stacks"] == 2
+        assert {row["stack_id"] for row in data["ranked"]} == {"agent_b", "agent_c"}
+        assert all(row["report_id"] for row in data["ranked"])
+
+
+class TestNdjsonOutput:
+    """Tests for line-per-finding output of sessions and reports."""
+
+    class Args:
+        type = "self_requested"
+        access = "structural"
+        json = False
+        format = "ndjson"
+
+    @staticmethod
+    def _records(out):
+        return [json.loads(line) for line in out.splitlines()]
+
+    def test_severity_counts(self):
+        findings = [{"severity": "error"}, {"severity": "warning"}, {"severity": "warning"}]
+        assert severity_counts(findings) == {"error": 1, "warning": 2, "info": 0}
+        assert severity_counts([]) == {"error": 0, "warning": 0, "info": 0}
+
+    def test_on_result_sees_every_check(self, diag_setup):
+        k, _ = diag_setup
+        seen = []
+        results = run_checks(k, jobs=3, on_result=lambda result: seen.append(result.check))
+        assert sorted(seen) == sorted(STRUCTURAL_CHECKS)
+        assert [r.check for r in results] == list(STRUCTURAL_CHECKS)
+
+    def test_session_start_ndjson(self, diag_setup, capsys):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 3)
+        cmd_doctor_session_start(self.Args(), k)
+        records = self._records(capsys.readouterr().out)
+        *findings, summary = records
+        assert len(findings) == 3
+        assert all(r["type"] == "finding" for r in findings)
+        assert {r["category"] for r in findings} == {"low_confidence_belief"}
+        assert summary["type"] == "summary"
+        assert summary["total"] == 3
+        assert sum(summary["counts"].values()) == 3
+        assert len(summary["checks"]) == len(STRUCTURAL_CHECKS)
+        report = storage.get_diagnostic_report(summary["report_id"])
+        assert len(report.findings) == 3
+
+    def test_findings_written_before_report_saved(self, diag_setup, capsys):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 1)
+        save = storage.save_diagnostic_report
+        written = []
+
+        def checked_save(report):
+            written.append(capsys.readouterr().out)
+            return save(report)
+
+        with patch.object(storage, "save_diagnostic_report", side_effect=checked_save):
+            cmd_doctor_session_start(self.Args(), k)
+        assert '"type":"finding"' in written[0]
+
+    def test_incremental_ndjson_includes_carried_findings(self, diag_setup, capsys):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 2)
+        args = self.Args()
+        args.incremental = True
+        cmd_doctor_session_start(args, k)
+        first = self._records(capsys.readouterr().out)
+        cmd_doctor_session_start(args, k)
+        *findings, summary = self._records(capsys.readouterr().out)
+        assert summary["previous_session_id"] == first[-1]["session_id"]
+        assert len(findings) == 2
+
+    def test_report_ndjson(self, diag_setup, capsys):
+        k, storage = diag_setup
+        _save_low_confidence_beliefs(storage, 2)
+        cmd_doctor_session_start(self.Args(), k)
+        session_id = self._records(capsys.readouterr().out)[-1]["session_id"]
+
+        class ReportArgs:
+            format = "ndjson"
+
+        ReportArgs.session_id = session_id
+        cmd_doctor_report(ReportArgs(), k)
+        *findings, summary = self._records(capsys.readouterr().out)
+        assert len(findings) == 2
+        assert summary["type"] == "summary"
+        assert summary["session_id"] == session_id
+        assert summary["total"] == 2
+
+    @pytest.mark.parametrize(
+        "field, value, expected",
+        [
+            ("type", "bogus", "Invalid session type 'bogus'"),
+            ("access", "bogus", "Invalid access level 'bogus'"),
+            ("type", "operator_initiated", "Insufficient trust"),
+        ],
+    )
+    def test_session_start_errors_ndjson(self, diag_setup, capsys, field, value, expected):
+        k, storage = diag_setup
+        args = self.Args()
+        setattr(args, field, value)
+        cmd_doctor_session_start(args, k)
+        records = self._records(capsys.readouterr().out)
+        assert len(records) == 1
+        assert records[0]["type"] == "error"
+        assert records[0]["message"].startswith(expected)
+        assert storage.get_diagnostic_sessions() == []
+
+    @pytest.mark.parametrize("session_id", ["latest", "nonexistent"])
+    def test_report_not_found_ndjson(self, diag_setup, capsys, session_id):
+        k, _ = diag_setup
+
+        class ReportArgs:
+            format = "ndjson"
+
+        ReportArgs.session_id = session_id
+        cmd_doctor_report(ReportArgs(), k)
+        records = self._records(capsys.readouterr().out)
+        assert [r["type"] for r in records] == ["error"]
+        assert records[0]["message"].startswith("No ")
+
+    def test_format_overrides_json_flag(self, diag_setup, capsys):
+        k, _ = diag_setup
+        args = self.Args()
+        args.json = True
+        cmd_doctor_session_start(args, k)
+        records = self._records(capsys.readouterr().out)
+        assert records[-1]["type"] == "summary"
@@ -1,11 +1,104 @@
 """Tests for dashboard server and serialization."""
 
+import argparse
+import csv
+import dataclasses
+import gzip
+import http.client
+import io
 import json
-from datetime import datetime
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from io import BytesIO
 from unittest.mock import MagicMock, patch
+from urllib.parse import quote
+from urllib.request import urlopen
 
-from kernle_devtools.dashboard.server import DashboardHandler, serialize
+import pytest
+
+from kernle.core import Kernle
+from kernle.storage import SQLiteStorage
+from kernle.storage.base import Belief, Episode, Goal
+
+from kernle_devtools.dashboard import search as search_module
+from kernle_devtools.dashboard.cache import ResponseCache
+from kernle_devtools.dashboard.changes import stack_version
+from kernle_devtools.dashboard.encoding import EncodedBody, negotiate_encoding
+from kernle_devtools.dashboard.events import ChangeWatcher, format_event
+from kernle_devtools.dashboard.export import csv_columns, export_stack, parse_kinds
+from kernle_devtools.dashboard.metrics import Histogram, RequestMetrics
+from kernle_devtools.dashboard.pool import ThreadLocalKernle
+from kernle_devtools.dashboard.queries import (
+    InvalidCursor,
+    InvalidSince,
+    PageStream,
+    decode_cursor,
+    encode_cursor,
+    list_changes,
+    list_page,
+)
+from kernle_devtools.dashboard.routes import RouteTable
+from kernle_devtools.dashboard.search import IndexBuilding, SearchIndex, fts_query, index_path
+from kernle_devtools.dashboard.serialization import (
+    _SERIALIZERS,
+    TABLE_FIELDS,
+    parse_fields,
+    project,
+)
+from kernle_devtools.dashboard.server import (
+    ROUTES,
+    DashboardHandler,
+    DashboardServer,
+    serialize,
+)
+from kernle_devtools.dashboard.streaming import StreamWriter, json_array, json_envelope
+
+
+# Wall-clock comparisons are noisy on loaded machines, so they only run on request
+benchmark = pytest.mark.skipif(
+    not os.environ.get("KERNLE_DEVTOOLS_BENCHMARKS"),
+    reason="benchmark; set KERNLE_DEVTOOLS_BENCHMARKS=1 to run",
+)
+
+
+@contextmanager
+def serve(k, **kwargs):
+    """Run a DashboardServer for ``k`` on an ephemeral port, yielding its base URL."""
+    handles = ThreadLocalKernle(k, factory=lambda: k)
+    server = DashboardServer(("127.0.0.1", 0), DashboardHandler, handles, **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def fetch(base, path, headers=None):
+    """GET ``path`` without urllib's redirect/error handling; return status, headers, body."""
+    host, port = base.removeprefix("http://").split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=5)
+    try:
+        conn.request("GET", path, headers=headers or {})
+        resp = conn.getresponse()
+        return resp.status, dict(resp.getheaders()), resp.read()
+    finally:
+        conn.close()
+
+
+def wait_for(predicate, timeout=2):
+    """Poll ``predicate`` until it is truthy or ``timeout`` seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
 
 
 class TestSerialize:
@@ -71,3 +164,1611 @@ class TestDashboardHandler:
     def test_get_bool_param_false(self):
         handler = DashboardHandler.__new__(DashboardHandler)
         assert handler._get_bool_param({"processed": ["false"]}, "processed") is False
+
+
+class TestThreadLocalKernle:
+    """Tests for per-thread Kernle handles."""
+
+    def test_same_thread_reuses_instance(self):
+        k = MagicMock(stack_id="s1")
+        handles = ThreadLocalKernle(k, factory=lambda: MagicMock(stack_id="s1"))
+        assert handles.get() is handles.get()
+
+    def test_threads_get_distinct_instances(self):
+        k = MagicMock(stack_id="s1")
+        handles = ThreadLocalKernle(k, factory=lambda: MagicMock(stack_id="s1"))
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(handles.get())) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len({id(inst) for inst in seen}) == 3
+
+    def test_non_sqlite_storage_is_shared(self):
+        k = MagicMock(stack_id="s1")
+        handles = ThreadLocalKernle(k)
+        assert handles.get() is k
+
+    def test_sqlite_storage_is_cloned(self, diag_setup):
+        k, storage = diag_setup
+        handles = ThreadLocalKernle(k)
+        clone = handles.get()
+        assert clone is not k
+        assert clone.stack_id == k.stack_id
+        assert clone._storage.db_path == storage.db_path
+        handles.close()
+
+
+class TestDashboardServer:
+    """Tests for the worker-pool dashboard server."""
+
+    def test_serves_concurrent_requests(self):
+        release = threading.Event()
+        k = MagicMock(stack_id="s1")
+        k.stack.get_stats.return_value = {"raw": 3}
+
+        def slow_anxiety(detailed=True):
+            release.wait(5)
+            return {"overall_score": 1}
+
+        k.get_anxiety_report.side_effect = slow_anxiety
+        with serve(k, workers=2) as (base, _):
+            try:
+                slow = threading.Thread(
+                    target=lambda: urlopen(f"{base}/api/anxiety", timeout=10).read()
+                )
+                slow.start()
+                # A second worker answers while the first is blocked on the anxiety report
+                with urlopen(f"{base}/api/stats", timeout=5) as resp:
+                    assert json.loads(resp.read()) == {"raw": 3}
+            finally:
+                release.set()
+            slow.join(5)
+
+    def test_workers_floor(self):
+        handles = ThreadLocalKernle(MagicMock(stack_id="s1"))
+        server = DashboardServer(("127.0.0.1", 0), DashboardHandler, handles, workers=0)
+        try:
+            assert server.workers == 1
+        finally:
+            server.server_close()
+
+
+class TestResponseCache:
+    """Tests for the LRU/TTL response cache."""
+
+    def test_hit_after_put(self):
+        cache = ResponseCache()
+        key = ("/api/stats", ())
+        assert cache.get(key, "v1") is None
+        cache.put(key, "v1", b"{}", ttl=5)
+        assert cache.get(key, "v1") == b"{}"
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["endpoints"]["/api/stats"] == {"hits": 1, "misses": 1}
+
+    def test_version_change_invalidates(self):
+        cache = ResponseCache()
+        key = ("/api/stats", ())
+        cache.put(key, "v1", b"{}", ttl=5)
+        assert cache.get(key, "v2") is None
+        assert cache.stats()["invalidations"] == 1
+        assert cache.stats()["entries"] == 0
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache()
+        key = ("/api/stats", ())
+        cache.put(key, "v1", b"{}", ttl=0.01)
+        time.sleep(0.02)
+        assert cache.get(key, "v1") is None
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put(("/a", ()), "v", b"a", ttl=5)
+        cache.put(("/b", ()), "v", b"b", ttl=5)
+        cache.get(("/a", ()), "v")
+        cache.put(("/c", ()), "v", b"c", ttl=5)
+        assert cache.get(("/b", ()), "v") is None
+        assert cache.get(("/a", ()), "v") == b"a"
+        assert cache.stats()["evictions"] == 1
+
+
+class TestStackVersion:
+    """Tests for stack change detection."""
+
+    def test_changes_on_write(self, diag_setup):
+        k, _ = diag_setup
+        before = stack_version(k)
+        assert stack_version(k) == before
+        time.sleep(0.01)
+        k.raw("something new happened")
+        assert stack_version(k) != before
+
+    def test_audit_fallback(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_audit_log.return_value = [{"id": "audit-1"}]
+        assert stack_version(k) == "audit-1"
+
+
+class TestCachedEndpoints:
+    """Tests for response caching in the served dashboard."""
+
+    def test_repeated_requests_hit_cache(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_stats.return_value = {"raw": 3}
+        k.stack.get_audit_log.return_value = [{"id": "audit-1"}]
+        with serve(k) as (base, server):
+            for expected in ("MISS", "HIT", "HIT"):
+                with urlopen(f"{base}/api/stats", timeout=5) as resp:
+                    assert resp.headers["X-Cache"] == expected
+                    assert json.loads(resp.read()) == {"raw": 3}
+            assert k.stack.get_stats.call_count == 1
+            with urlopen(f"{base}/api/cache", timeout=5) as resp:
+                stats = json.loads(resp.read())
+            assert stats["hits"] == 2
+
+    def test_stack_change_invalidates(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_stats.return_value = {"raw": 3}
+        k.stack.get_audit_log.return_value = [{"id": "audit-1"}]
+        with serve(k) as (base, _):
+            urlopen(f"{base}/api/stats", timeout=5).read()
+            k.stack.get_audit_log.return_value = [{"id": "audit-2"}]
+            with urlopen(f"{base}/api/stats", timeout=5) as resp:
+                assert resp.headers["X-Cache"] == "MISS"
+            assert k.stack.get_stats.call_count == 2
+
+
+class TestConditionalResponses:
+    """Tests for ETag / If-None-Match handling."""
+
+    def test_etag_and_not_modified(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_stats.return_value = {"raw": 3}
+        with serve(k) as (base, _):
+            status, headers, body = fetch(base, "/api/stats")
+            assert status == 200
+            etag = headers["ETag"]
+            assert etag.startswith('"') and etag.endswith('"')
+
+            status, headers, body = fetch(base, "/api/stats", {"If-None-Match": etag})
+            assert status == 304
+            assert headers["ETag"] == etag
+            assert body == b""
+
+    def test_stale_etag_returns_body(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_stats.return_value = {"raw": 3}
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, "/api/stats", {"If-None-Match": '"stale"'})
+            assert status == 200
+            assert json.loads(body) == {"raw": 3}
+
+    def test_errors_have_no_etag(self):
+        k = MagicMock(stack_id="s1")
+        with serve(k) as (base, _):
+            status, headers, _ = fetch(base, "/api/nope")
+            assert status == 404
+            assert "ETag" not in headers
+
+
+class TestEncoding:
+    """Tests for Accept-Encoding negotiation and encoded bodies."""
+
+    def test_negotiate_prefers_gzip(self):
+        assert negotiate_encoding("gzip, deflate, br") == "gzip"
+        assert negotiate_encoding("deflate") == "deflate"
+        assert negotiate_encoding("*") == "gzip"
+
+    def test_negotiate_honours_q_values(self):
+        assert negotiate_encoding("gzip;q=0.5, deflate;q=0.8") == "deflate"
+        assert negotiate_encoding("gzip;q=0") is None
+        assert negotiate_encoding("br, identity") is None
+        assert negotiate_encoding("") is None
+        assert negotiate_encoding(None) is None
+
+    def test_small_bodies_not_compressed(self):
+        body = EncodedBody(b'{"raw": 3}')
+        data, encoding, tag = body.encoded("gzip")
+        assert data == b'{"raw": 3}'
+        assert encoding is None
+        assert tag == body.etag
+
+    def test_large_bodies_compressed_once(self):
+        raw = json.dumps([{"blob": "the quick brown fox " * 20}] * 50).encode()
+        body = EncodedBody(raw)
+        data, encoding, tag = body.encoded("gzip")
+        assert encoding == "gzip"
+        assert gzip.decompress(data) == raw
+        assert len(data) * 5 < len(raw)
+        assert tag != body.etag
+        assert body.encoded("gzip")[0] is data
+
+    def test_deflate_roundtrip(self):
+        raw = b"x" * 5000
+        data, encoding, _ = EncodedBody(raw).encoded("deflate")
+        assert encoding == "deflate"
+        assert zlib.decompress(data) == raw
+
+
+class TestCompressedTransport:
+    """Tests for compressed responses from the served dashboard."""
+
+    def test_large_json_is_gzipped(self):
+        k = MagicMock(stack_id="s1")
+        entries = [{"id": str(i), "blob": "captured some text " * 10} for i in range(100)]
+        k.stack.list_raw.return_value = entries
+        with serve(k) as (base, _):
+            status, headers, body = fetch(base, "/api/raw", {"Accept-Encoding": "gzip"})
+            assert status == 200
+            assert headers["Content-Encoding"] == "gzip"
+            assert headers["Vary"] == "Accept-Encoding"
+            assert json.loads(gzip.decompress(body)) == entries
+
+    def test_identity_without_accept_encoding(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.list_raw.return_value = [{"blob": "y" * 4000}]
+        with serve(k) as (base, _):
+            _, headers, body = fetch(base, "/api/raw", {})
+            assert "Content-Encoding" not in headers
+            assert json.loads(body) == [{"blob": "y" * 4000}]
+
+    def test_dashboard_html_is_gzipped(self):
+        k = MagicMock(stack_id="s1")
+        with serve(k) as (base, _):
+            status, headers, body = fetch(base, "/", {"Accept-Encoding": "gzip"})
+            assert status == 200
+            assert headers["Content-Encoding"] == "gzip"
+            assert b"Kernle Dashboard" in gzip.decompress(body)
+
+
+class TestKeysetPagination:
+    """Tests for cursor-paginated list queries."""
+
+    def test_cursor_roundtrip(self):
+        token = encode_cursor("2026-01-01T00:00:00+00:00", "abc")
+        assert decode_cursor(token) == ("2026-01-01T00:00:00+00:00", "abc")
+
+    def test_invalid_cursor(self):
+        with pytest.raises(InvalidCursor):
+            decode_cursor("not-a-cursor")
+
+    def test_pages_cover_all_rows_once(self, diag_setup):
+        k, _ = diag_setup
+        ids = {k.raw(f"entry {i}") for i in range(7)}
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = list_page(k, "raw", 3, cursor=cursor)
+            seen.extend(e.id for e in page.items)
+            pages += 1
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+        assert pages == 3
+        assert len(seen) == len(set(seen)) == 7
+        assert set(seen) == ids
+
+    def test_newest_first(self, diag_setup):
+        k, _ = diag_setup
+        for i in range(3):
+            k.raw(f"entry {i}")
+        items = list_page(k, "raw", 10).items
+        captured = [e.captured_at for e in items]
+        assert captured == sorted(captured, reverse=True)
+
+    def test_filters(self, diag_setup):
+        k, _ = diag_setup
+        k.raw("one")
+        k.raw("two")
+        assert len(list_page(k, "raw", 10, filters={"processed": False}).items) == 2
+        assert list_page(k, "raw", 10, filters={"processed": True}).items == []
+        # Filters a list doesn't support are ignored
+        assert len(list_page(k, "raw", 10, filters={"operation": "x"}).items) == 2
+
+    def test_audit_pages(self, diag_setup):
+        k, _ = diag_setup
+        for i in range(4):
+            k.raw(f"entry {i}")
+        first = list_page(k, "audit", 2)
+        second = list_page(k, "audit", 2, cursor=first.next_cursor)
+        assert {a["id"] for a in first.items}.isdisjoint(a["id"] for a in second.items)
+        assert all(isinstance(a, dict) for a in second.items)
+
+    def test_limit_clamped(self, diag_setup):
+        k, _ = diag_setup
+        k.raw("one")
+        assert len(list_page(k, "raw", 0).items) == 1
+
+    def test_legacy_backend_first_page_only(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_drives.return_value = list(range(5))
+        assert list_page(k, "drives", 3).items == [0, 1, 2]
+        assert list_page(k, "drives", 3, cursor=encode_cursor("t", "x")).items == []
+
+
+class TestPaginatedEndpoints:
+    """Tests for the list endpoint response shapes."""
+
+    def test_bare_array_without_cursor(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_relationships.return_value = [{"id": "r1"}]
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, "/api/relationships")
+            assert status == 200
+            assert json.loads(body) == [{"id": "r1"}]
+
+    def test_envelope_with_cursor(self, diag_setup):
+        k, _ = diag_setup
+        for i in range(3):
+            k.raw(f"entry {i}")
+        with serve(k) as (base, _):
+            _, _, body = fetch(base, "/api/raw?limit=2&cursor=")
+            first = json.loads(body)
+            assert len(first["items"]) == 2
+            assert first["next_cursor"]
+            _, _, body = fetch(base, f"/api/raw?limit=2&cursor={first['next_cursor']}")
+            second = json.loads(body)
+            assert len(second["items"]) == 1
+            assert second["next_cursor"] is None
+
+    def test_invalid_cursor_is_400(self, diag_setup):
+        k, _ = diag_setup
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, "/api/raw?cursor=%%%")
+            assert status == 400
+            assert json.loads(body)["error"] == "Invalid cursor"
+
+
+class TestListChanges:
+    """Tests for ``since`` deltas of the list queries."""
+
+    def test_empty_since_returns_mark_only(self, diag_setup):
+        k, _ = diag_setup
+        k.raw("one")
+        delta = list_changes(k, "raw", "")
+        assert delta.items == [] and delta.removed == []
+        assert delta.high_water
+
+    def test_only_rows_written_after_mark(self, diag_setup):
+        k, _ = diag_setup
+        k.raw("older")
+        old_id = k.raw("old")
+        mark = list_changes(k, "raw", "").high_water
+        time.sleep(0.01)
+        new_id = k.raw("new")
+        delta = list_changes(k, "raw", mark)
+        # The row at the mark itself is sent again
+        assert [e.id for e in delta.items] == [old_id, new_id]
+        assert delta.high_water > mark
+        # Nothing written since: the mark stands
+        assert list_changes(k, "raw", delta.high_water).high_water == delta.high_water
+
+    def test_deleted_and_filtered_out_rows_are_removed(self, diag_setup):
+        k, storage = diag_setup
+        gone, done = k.raw("gone"), k.raw("done")
+        mark = list_changes(k, "raw", "").high_water
+        time.sleep(0.01)
+        storage.delete_raw(gone)
+        storage.mark_raw_processed(done, [])
+        delta = list_changes(k, "raw", mark, filters={"processed": False})
+        assert delta.items == []
+        assert set(delta.removed) == {gone, done}
+        # Without the filter the processed row is an update, not a removal
+        delta = list_changes(k, "raw", mark)
+        assert [e.id for e in delta.items] == [done]
+        assert delta.removed == [gone]
+
+    def test_too_many_changes_resets(self, diag_setup):
+        k, _ = diag_setup
+        mark = list_changes(k, "raw", "").high_water or "2000-01-01T00:00:00"
+        for i in range(3):
+            k.raw(f"entry {i}")
+        delta = list_changes(k, "raw", mark, limit=2)
+        assert delta.reset and delta.items == []
+        assert delta.high_water == list_changes(k, "raw", "").high_water
+
+    def test_audit_uses_creation_time(self, diag_setup):
+        k, _ = diag_setup
+        k.raw("one")
+        mark = list_changes(k, "audit", "").high_water
+        time.sleep(0.01)
+        assert len(list_changes(k, "audit", mark).items) == 1
+        k.raw("two")
+        assert len(list_changes(k, "audit", mark).items) == 2
+
+    def test_invalid_since(self, diag_setup):
+        k, _ = diag_setup
+        with pytest.raises(InvalidSince):
+            list_changes(k, "raw", "yesterday")
+
+
+class TestListChangesEndpoint:
+    """Tests for ``?since=`` on the list endpoints."""
+
+    def test_delta_roundtrip(self, diag_setup):
+        k, _ = diag_setup
+        k.raw("old")
+        with serve(k) as (base, _):
+            _, _, body = fetch(base, "/api/raw?since=")
+            mark = json.loads(body)["high_water"]
+            time.sleep(0.01)
+            new_id = k.raw("x" * 100)
+            status, _, body = fetch(base, f"/api/raw?since={quote(mark)}&truncate=40")
+            assert status == 200
+            delta = json.loads(body)
+            assert [e["id"] for e in delta["items"]][-1] == new_id
+            assert delta["items"][-1]["blob"] == "x" * 40 + "…"
+            assert set(delta["items"][-1]) == set(TABLE_FIELDS["raw"])
+            assert delta["removed"] == [] and delta["reset"] is False
+
+    def test_invalid_since_is_400(self, diag_setup):
+        k, _ = diag_setup
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, "/api/raw?since=nope")
+            assert status == 400
+            assert json.loads(body)["error"] == "Invalid since"
+
+    def test_requires_sqlite(self):
+        k = MagicMock(stack_id="s1")
+        with serve(k) as (base, _):
+            status, _, _ = fetch(base, "/api/raw?since=")
+            assert status == 501
+
+
+class TestExport:
+    """Tests for the streaming stack export."""
+
+    @pytest.fixture
+    def stack(self, diag_setup):
+        k, storage = diag_setup
+        raw_ids = {k.raw(f"entry {i}, with a comma") for i in range(5)}
+        k.episode("objective", "outcome", lessons=["one", "two"])
+        storage.save_belief(
+            Belief(id="b-old", stack_id=k.stack_id, statement="superseded", is_active=False)
+        )
+        return k, raw_ids
+
+    def test_ndjson_covers_every_row_across_batches(self, stack):
+        k, raw_ids = stack
+        lines = b"".join(export_stack(k, "ndjson", batch_size=2)).splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert {r["id"] for r in rows if r["type"] == "raw"} == raw_ids
+        assert [r["type"] for r in rows].count("episode") == 1
+        # Unlike the belief list, the export includes inactive beliefs
+        assert [r["id"] for r in rows if r["type"] == "belief"] == ["b-old"]
+
+    def test_csv(self, stack):
+        k, _ = stack
+        body = b"".join(export_stack(k, "csv", kinds=("episodes", "raw"))).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        assert list(rows[0]) == csv_columns(("episodes", "raw"))
+        episode = next(r for r in rows if r["type"] == "episode")
+        assert json.loads(episode["lessons"]) == ["one", "two"]
+        assert {r["blob"] for r in rows if r["type"] == "raw"} == {
+            f"entry {i}, with a comma" for i in range(5)
+        }
+
+    def test_parse_kinds(self):
+        assert parse_kinds("") == parse_kinds(None)
+        assert parse_kinds("belief, raw") == ("raw", "beliefs")
+        with pytest.raises(ValueError):
+            parse_kinds("suggestions")
+
+    def test_requires_sqlite(self):
+        with pytest.raises(NotImplementedError):
+            export_stack(MagicMock(stack_id="s1"))
+
+    def test_endpoint_streams_ndjson(self, stack):
+        k, raw_ids = stack
+        with serve(k) as (base, _):
+            status, headers, body = fetch(base, "/api/export?types=raw")
+            assert status == 200
+            assert headers["Content-Type"] == "application/x-ndjson"
+            assert headers["Transfer-Encoding"] == "chunked"
+            assert {json.loads(line)["id"] for line in body.splitlines()} == raw_ids
+
+    def test_endpoint_gzip_download(self, stack):
+        k, _ = stack
+        with serve(k) as (base, _):
+            status, headers, body = fetch(base, "/api/export?format=csv&gzip=1")
+            assert status == 200
+            assert headers["Content-Type"] == "application/gzip"
+            assert "Content-Encoding" not in headers
+            assert 'filename="test_agent.csv.gz"' in headers["Content-Disposition"]
+            assert gzip.decompress(body).startswith(b"type,")
+
+    def test_endpoint_errors(self, stack):
+        k, _ = stack
+        with serve(k) as (base, _):
+            assert fetch(base, "/api/export?format=xml")[0] == 400
+            assert fetch(base, "/api/export?types=nope")[0] == 400
+        with serve(MagicMock(stack_id="s1")) as (base, _):
+            assert fetch(base, "/api/export")[0] == 501
+
+    def test_cli_writes_gzip_file(self, stack, tmp_path):
+        from kernle_devtools.cli.export import cmd_export
+
+        k, raw_ids = stack
+        out = tmp_path / "export.ndjson.gz"
+        args = argparse.Namespace(format="ndjson", types="raw", output=str(out), gzip=False)
+        cmd_export(args, k)
+        lines = gzip.decompress(out.read_bytes()).splitlines()
+        assert {json.loads(line)["id"] for line in lines} == raw_ids
+
+
+class TestProjection:
+    """Tests for field projection and truncation."""
+
+    def test_parse_fields(self):
+        assert parse_fields(None, ("id",)) == ("id",)
+        assert parse_fields("*", ("id",)) is None
+        assert parse_fields("id, statement,") == ("id", "statement")
+
+    def test_project_dataclass_subset(self):
+        belief = Belief(id="b1", stack_id="s", statement="x", created_at=datetime(2026, 1, 1))
+        assert project(belief, ("id", "created_at", "nope")) == {
+            "id": "b1",
+            "created_at": "2026-01-01T00:00:00",
+        }
+
+    def test_project_all_matches_serialize(self):
+        belief = Belief(id="b1", stack_id="s", statement="x", created_at=datetime(2026, 1, 1))
+        assert project(belief) == serialize(belief)
+
+    def test_project_dict_and_truncate(self):
+        row = {"id": "a1", "details": "d" * 50}
+        assert project(row, ("details",), truncate=10) == {"details": "d" * 10 + "…"}
+
+    def test_project_passthrough(self):
+        assert project(5) == 5
+
+
+class TestProjectedEndpoints:
+    """Tests for ?fields= / ?truncate= on the served dashboard."""
+
+    def _save_belief(self, storage, statement="A belief worth keeping around"):
+        belief = Belief(
+            id=str(uuid.uuid4()),
+            stack_id="test_agent",
+            statement=statement,
+            created_at=datetime.now(timezone.utc),
+        )
+        storage.save_belief(belief)
+        return belief
+
+    def test_list_defaults_to_table_fields(self, diag_setup):
+        k, storage = diag_setup
+        self._save_belief(storage)
+        with serve(k) as (base, _):
+            _, _, body = fetch(base, "/api/beliefs")
+            (item,) = json.loads(body)
+        assert set(item) == set(TABLE_FIELDS["beliefs"])
+
+    def test_fields_star_and_truncate(self, diag_setup):
+        k, storage = diag_setup
+        self._save_belief(storage)
+        with serve(k) as (base, _):
+            _, _, body = fetch(base, "/api/beliefs?fields=*&truncate=5")
+            (item,) = json.loads(body)
+        assert "local_updated_at" in item
+        assert item["statement"] == "A bel…"
+
+    def test_memory_detail(self, diag_setup):
+        k, storage = diag_setup
+        belief = self._save_belief(storage)
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, f"/api/memory/belief/{belief.id}?fields=id,statement")
+            assert status == 200
+            assert json.loads(body) == {"id": belief.id, "statement": belief.statement}
+            status, _, _ = fetch(base, "/api/memory/belief/missing")
+            assert status == 404
+            status, _, _ = fetch(base, f"/api/memory/raw/{belief.id}")
+            assert status == 400
+
+    def test_raw_detail(self, diag_setup):
+        k, storage = diag_setup
+        raw_id = storage.save_raw("Something worth writing down")
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, f"/api/raw/{raw_id}?fields=*")
+            assert status == 200
+            entry = json.loads(body)
+            assert entry["id"] == raw_id
+            assert entry["content"] == "Something worth writing down"
+            status, _, _ = fetch(base, "/api/raw/missing")
+            assert status == 404
+
+
+def _asdict_serialize(obj):
+    """The original asdict-based serialize(), kept as a benchmark baseline."""
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, (list, tuple)):
+        return [_asdict_serialize(item) for item in obj]
+    if isinstance(obj, dict):
+        return {k: _asdict_serialize(v) for k, v in obj.items()}
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {k: _asdict_serialize(v) for k, v in dataclasses.asdict(obj).items()}
+    return str(obj)
+
+
+class TestCompiledSerializers:
+    """Tests for the per-dataclass serializer registry."""
+
+    def _episodes(self, n):
+        now = datetime(2026, 1, 15, 12, 0, 0)
+        return [
+            Episode(
+                id=f"ep-{i}",
+                stack_id="s",
+                objective=f"objective {i}",
+                outcome="outcome text " * 5,
+                lessons=["one", "two"],
+                tags=["a"],
+                created_at=now,
+                derived_from=[f"raw:{i}"],
+                confidence_history=[{"at": now, "value": 0.5}],
+            )
+            for i in range(n)
+        ]
+
+    def test_matches_asdict_output(self):
+        episodes = self._episodes(3)
+        assert serialize(episodes) == _asdict_serialize(episodes)
+
+    def test_nested_dataclass(self):
+        @dataclasses.dataclass
+        class Inner:
+            when: datetime
+
+        @dataclasses.dataclass
+        class Outer:
+            inner: Inner
+            items: list
+
+        obj = Outer(Inner(datetime(2026, 1, 1)), [Inner(datetime(2026, 1, 2))])
+        assert serialize(obj) == _asdict_serialize(obj)
+
+    def test_serializer_is_cached(self):
+        episodes = self._episodes(2)
+        serialize(episodes)
+        assert _SERIALIZERS[Episode].__qualname__ == "serialize_Episode"
+
+    @benchmark
+    def test_benchmark_faster_than_asdict(self):
+        episodes = self._episodes(200)
+
+        def best_of(fn, runs=5):
+            best = float("inf")
+            for _ in range(runs):
+                start = time.perf_counter()
+                fn(episodes)
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        serialize(episodes)  # warm the registry
+        baseline = best_of(_asdict_serialize)
+        compiled = best_of(serialize)
+        assert compiled < baseline, (
+            f"serialize 200 episodes: asdict {baseline * 1e3:.2f}ms, "
+            f"compiled {compiled * 1e3:.2f}ms"
+        )
+
+
+class TestStreaming:
+    """Tests for chunked streaming of large lists."""
+
+    def test_chunk_framing(self):
+        out = BytesIO()
+        writer = StreamWriter(out, buffer_bytes=4)
+        writer.write(b"abcdef")
+        writer.write(b"gh")
+        writer.close()
+        assert out.getvalue() == b"6\r\nabcdef\r\n2\r\ngh\r\n0\r\n\r\n"
+
+    def test_unchunked_gzip_roundtrip(self):
+        out = BytesIO()
+        writer = StreamWriter(out, chunked=False, encoding="gzip")
+        for chunk in json_array(range(1000), str):
+            writer.write(chunk)
+        writer.close()
+        assert json.loads(gzip.decompress(out.getvalue())) == [str(i) for i in range(1000)]
+
+    def test_page_stream_fetches_lazily(self, diag_setup):
+        k, storage = diag_setup
+        for i in range(5):
+            k.raw(f"entry {i}")
+        with patch.object(
+            storage, "_row_to_raw_entry", wraps=storage._row_to_raw_entry
+        ) as convert:
+            stream = iter(PageStream(k, "raw", 10, batch_size=2))
+            next(stream)
+            assert convert.call_count == 2
+            assert len(list(stream)) == 4
+        assert convert.call_count == 5
+
+    def test_page_stream_holds_no_transaction_between_batches(self, diag_setup):
+        k, storage = diag_setup
+        for i in range(5):
+            k.raw(f"entry {i}")
+        stream = PageStream(k, "raw", 10, batch_size=2)
+        rows = iter(stream)
+        seen = [next(rows).id]
+        # Mid-stream, a write's WAL frames can still be checkpointed (busy == 0)
+        k.raw("written mid-stream")
+        conn = sqlite3.connect(storage.db_path, timeout=0.2)
+        try:
+            assert conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0] == 0
+        finally:
+            conn.close()
+        seen.extend(row.id for row in rows)
+        assert len(seen) == len(set(seen)) == 5
+        assert stream.next_cursor is None
+
+    def test_page_stream_cursor_spans_batches(self, diag_setup):
+        k, _ = diag_setup
+        for i in range(5):
+            k.raw(f"entry {i}")
+        first = PageStream(k, "raw", 3, batch_size=2)
+        ids = [row.id for row in first]
+        rest = PageStream(k, "raw", 10, cursor=first.next_cursor, batch_size=2)
+        ids.extend(row.id for row in rest)
+        assert len(ids) == len(set(ids)) == 5
+        assert rest.next_cursor is None
+
+    def test_envelope_cursor_follows_items(self, diag_setup):
+        k, _ = diag_setup
+        for i in range(3):
+            k.raw(f"entry {i}")
+        stream = PageStream(k, "raw", 2)
+        body = json.loads(b"".join(json_envelope(stream, lambda item: item.id)))
+        assert len(body["items"]) == 2
+        assert body["next_cursor"] == stream.next_cursor is not None
+
+    def test_stream_param_sends_chunked(self, diag_setup):
+        k, _ = diag_setup
+        for i in range(3):
+            k.raw(f"entry {i}")
+        with serve(k) as (base, _):
+            status, headers, body = fetch(base, "/api/raw?stream=1&limit=2&cursor=")
+            assert status == 200
+            assert headers["Transfer-Encoding"] == "chunked"
+            assert "ETag" not in headers
+            page = json.loads(body)
+            assert len(page["items"]) == 2
+            assert set(page["items"][0]) == set(TABLE_FIELDS["raw"])
+            assert page["next_cursor"]
+
+    def test_large_limit_streams_compressed(self, diag_setup):
+        k, _ = diag_setup
+        k.raw("only entry")
+        with serve(k) as (base, _):
+            _, headers, body = fetch(
+                base, "/api/raw?limit=5000", headers={"Accept-Encoding": "gzip"}
+            )
+            assert headers["Transfer-Encoding"] == "chunked"
+            assert headers["Content-Encoding"] == "gzip"
+            assert len(json.loads(gzip.decompress(body))) == 1
+
+    def test_stream_invalid_cursor_is_400(self, diag_setup):
+        k, _ = diag_setup
+        with serve(k) as (base, _):
+            status, _, _ = fetch(base, "/api/raw?stream=1&cursor=%%%")
+            assert status == 400
+
+
+class TestChangeWatcher:
+    """Tests for the shared change watcher."""
+
+    def test_format_event(self):
+        assert format_event({"a": 1}, event="change", event_id=3) == (
+            b'id: 3\nevent: change\ndata: {"a":1}\n\n'
+        )
+
+    def test_idle_watcher_never_queries(self):
+        k = MagicMock(stack_id="s1")
+        watcher = ChangeWatcher(ThreadLocalKernle(k, factory=lambda: k))
+        assert watcher.poll(k) is None
+        k.stack.get_stats.assert_not_called()
+        k.stack.get_audit_log.assert_not_called()
+
+    def test_describes_changes_once_per_version(self, diag_setup):
+        k, _ = diag_setup
+        watcher = ChangeWatcher(ThreadLocalKernle(k, factory=lambda: k))
+        with patch.object(ChangeWatcher, "_run"):
+            events = watcher.subscribe()
+        assert watcher.poll(k) is None  # baseline
+        k.raw("something new")
+        event = watcher.poll(k)
+        assert {"raw", "audit", "stats"} <= set(event["topics"])
+        assert event["deltas"]["raw"] == 1
+        assert event["audit"][0]["operation"] == "raw.ingested"
+        assert events.get_nowait() is event
+        with patch.object(k.stack, "get_stats") as get_stats:
+            assert watcher.poll(k) is None
+            get_stats.assert_not_called()
+
+
+class TestEventStream:
+    """Tests for the /api/events endpoint."""
+
+    @contextmanager
+    def _events(self, base):
+        host, port = base.removeprefix("http://").split(":")
+        conn = http.client.HTTPConnection(host, int(port), timeout=5)
+        try:
+            conn.request("GET", "/api/events")
+            yield conn.getresponse()
+        finally:
+            conn.close()
+
+    def test_pushes_changes_without_holding_a_worker(self, diag_setup):
+        k, _ = diag_setup
+        handles = ThreadLocalKernle(k, factory=lambda: k)
+        watcher = ChangeWatcher(handles, interval=0.05)
+        with serve(k, workers=1, watcher=watcher) as (base, _):
+            with self._events(base) as resp:
+                assert resp.status == 200
+                assert resp.getheader("Content-Type") == "text/event-stream"
+                assert resp.readline() == b"retry: 3000\n"
+                assert resp.readline() == b"\n"
+                # The only worker is free again while the feed stays open
+                status, _, _ = fetch(base, "/api/stats")
+                assert status == 200
+                time.sleep(0.2)
+                k.raw("pushed")
+                # A checkpoint can surface as an extra "stack" event first
+                for _ in range(3):
+                    lines = []
+                    while not lines or lines[-1] != b"\n":
+                        lines.append(resp.readline())
+                    assert b"event: change\n" in lines
+                    data = json.loads(lines[-2].removeprefix(b"data: "))
+                    if data["topics"] != ["stack"]:
+                        break
+                assert "raw" in data["topics"]
+
+    def test_client_limit(self, diag_setup):
+        k, _ = diag_setup
+        handles = ThreadLocalKernle(k, factory=lambda: k)
+        watcher = ChangeWatcher(handles, max_clients=0)
+        with serve(k, watcher=watcher) as (base, _):
+            status, _, _ = fetch(base, "/api/events")
+            assert status == 503
+
+
+class TestBatchEndpoint:
+    """Tests for /api/batch."""
+
+    def _kernle(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_stats.return_value = {"raw": 3}
+        k.stack.get_audit_log.return_value = [{"id": "audit-1"}]
+        k.get_anxiety_report.return_value = {"overall_score": 12}
+        k.stack.get_processing_config.return_value = [{"layer_transition": "raw_to_episode"}]
+        return k
+
+    def test_combines_queries(self):
+        k = self._kernle()
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, "/api/batch?q=stats,anxiety,processing")
+            assert status == 200
+            data = json.loads(body)
+            assert data.pop("anxiety")["overall_score"] == 12
+            assert data == {
+                "stats": {"raw": 3},
+                "processing": [{"layer_transition": "raw_to_episode"}],
+            }
+
+    def test_parts_share_endpoint_cache(self):
+        k = self._kernle()
+        with serve(k) as (base, _):
+            fetch(base, "/api/stats")
+            fetch(base, "/api/batch?q=stats,processing")
+            _, headers, body = fetch(base, "/api/processing")
+            assert headers["X-Cache"] == "HIT"
+            assert json.loads(body) == [{"layer_transition": "raw_to_episode"}]
+            assert k.stack.get_stats.call_count == 1
+            assert k.stack.get_processing_config.call_count == 1
+
+    def test_duplicate_names_evaluated_once(self):
+        k = self._kernle()
+        with serve(k) as (base, server):
+            server.response_cache = None
+            _, _, body = fetch(base, "/api/batch?q=stats&q=stats")
+            assert json.loads(body) == {"stats": {"raw": 3}}
+            assert k.stack.get_stats.call_count == 1
+
+    @pytest.mark.parametrize("query", ["", "?q=", "?q=stats,nope"])
+    def test_bad_queries_are_400(self, query):
+        with serve(self._kernle()) as (base, _):
+            status, _, _ = fetch(base, f"/api/batch{query}")
+            assert status == 400
+
+
+class TestRouteTable:
+    """Tests for the route registry."""
+
+    def test_exact_and_pattern_routes(self):
+        table = RouteTable()
+        table.add("/api/stats", "stats", cache_ttl=5)
+        table.add("/api/memory/<mem_type:word>/<mem_id>", "memory", kind="x")
+        route, kwargs = table.match("/api/stats")
+        assert route.handler == "stats" and route.cacheable and kwargs == {}
+        route, kwargs = table.match("/api/memory/belief/b-1")
+        assert route.handler == "memory"
+        assert kwargs == {"kind": "x", "mem_type": "belief", "mem_id": "b-1"}
+
+    def test_no_match(self):
+        table = RouteTable()
+        table.add("/api/raw/<raw_id>", "raw")
+        assert table.match("/api/raw/a/b") == (None, None)
+        assert table.match("/api/memory/x") == (None, None)
+        assert table.match("/api/raw") == (None, None)
+
+    def test_unknown_converter(self):
+        with pytest.raises(ValueError):
+            RouteTable().add("/api/<x:nope>", "x")
+
+    def test_dashboard_routes(self):
+        assert ROUTES.match("")[0].handler is DashboardHandler._get_page
+        route, kwargs = ROUTES.match("/api/raw")
+        assert route.streaming and route.default_limit == 200
+        assert kwargs == {"kind": "raw"}
+        route, kwargs = ROUTES.match("/api/raw/abc")
+        assert route.handler is DashboardHandler._get_raw and kwargs == {"raw_id": "abc"}
+        assert ROUTES.match("/api/nope") == (None, None)
+
+    @benchmark
+    def test_benchmark_faster_than_linear_chain(self):
+        # The previous dispatch: compare against each exact path in turn,
+        # then try every pattern with re.match.
+        exact = [r.path for r in ROUTES if r.regex is None]
+        patterns = [r"^/api/raw/([^/]+)$", r"^/api/memory/(\w+)/([^/]+)$",
+                    r"^/api/provenance/(\w+)/([^/]+)$"]
+
+        def linear(path):
+            for candidate in exact:
+                if path == candidate:
+                    return candidate
+            for pattern in patterns:
+                if m := re.match(pattern, path):
+                    return m
+            return None
+
+        paths = ["/api/audit", "/api/settings", "/api/provenance/belief/b-1", "/api/nope"] * 500
+
+        def best_of(fn, runs=5):
+            best = float("inf")
+            for _ in range(runs):
+                start = time.perf_counter()
+                for path in paths:
+                    fn(path)
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        baseline = best_of(linear)
+        table = best_of(ROUTES.match)
+        assert table < baseline, (
+            f"route {len(paths)} paths: linear {baseline * 1e3:.2f}ms, table {table * 1e3:.2f}ms"
+        )
+
+
+class TestRequestMetrics:
+    """Tests for request instrumentation."""
+
+    def test_histogram_buckets_and_quantile(self):
+        hist = Histogram((1.0, 2.0, 4.0))
+        for value in (0.5, 1.5, 1.5, 3.0, 9.0):
+            hist.observe(value)
+        assert list(hist.cumulative()) == [(1.0, 1), (2.0, 3), (4.0, 4), (float("inf"), 5)]
+        assert hist.quantile(0.5) == pytest.approx(1.75)
+        assert Histogram((1.0,)).quantile(0.5) is None
+
+    def test_render_prometheus_text(self):
+        metrics = RequestMetrics()
+        phases = {"kernle": 0.002, "serialize": 0.001, "write": 0.0005}
+        metrics.observe("/api/stats", "GET", 200, 0.0035, phases, 300)
+        metrics.observe("/api/stats", "GET", 500, 0.2, phases, 40)
+        text = metrics.render()
+        assert 'kernle_dashboard_requests_total{route="/api/stats",method="GET",status="500"} 1' in text
+        assert 'kernle_dashboard_errors_total{route="/api/stats"} 1' in text
+        assert (
+            'kernle_dashboard_request_duration_seconds_bucket{route="/api/stats",le="0.005"} 1'
+            in text
+        )
+        assert 'kernle_dashboard_request_duration_seconds_count{route="/api/stats"} 2' in text
+        assert 'phase="serialize",le="+Inf"} 2' in text
+        assert 'kernle_dashboard_response_size_bytes_sum{route="/api/stats"} 340' in text
+
+    def test_served_requests_are_recorded(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_stats.return_value = {"raw": 3}
+        k.stack.get_audit_log.return_value = [{"id": "audit-1"}]
+        with serve(k) as (base, server):
+            fetch(base, "/api/stats")
+            fetch(base, "/api/nope")
+            # Requests are recorded just after their response is written
+            wait_for(lambda: len(server.metrics.summary()) == 2)
+            status, headers, body = fetch(base, "/metrics")
+            assert status == 200
+            assert headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            text = body.decode()
+            assert 'route="/api/stats",method="GET",status="200"} 1' in text
+            assert 'route="unmatched",method="GET",status="404"} 1' in text
+            _, _, body = fetch(base, "/api/metrics")
+            rows = {row["route"]: row for row in json.loads(body)}
+            stats = rows["/api/stats"]
+            assert stats["requests"] == 1 and stats["errors"] == 0
+            assert stats["avg_bytes"] == len(b'{"raw": 3}')
+            assert set(stats["avg_ms"]) == {"kernle", "serialize", "write"}
+
+    def test_handler_errors_count(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_audit_log.return_value = [{"id": "audit-1"}]
+        k.stack.get_stats.side_effect = RuntimeError("boom")
+        with serve(k) as (base, server):
+            status, _, _ = fetch(base, "/api/stats")
+            assert status == 500
+            wait_for(server.metrics.summary)
+            assert 'kernle_dashboard_errors_total{route="/api/stats"} 1' in server.metrics.render()
+
+
+class TestSearchIndex:
+    """Tests for the full-text search index."""
+
+    def _seed(self, k, storage):
+        k.raw("the quick brown fox")
+        k.episode("debug the fox tracker", "found the bug")
+        k.note("birds migrate south")
+        storage.save_belief(
+            Belief(id="b-fox", stack_id="test_agent", statement="foxes are clever")
+        )
+        storage.save_goal(
+            Goal(id="g-1", stack_id="test_agent", title="learn birds", description="and foxes")
+        )
+
+    def test_fts_query_is_safe(self):
+        assert fts_query('fox AND "bird') == '"fox" "AND" "bird"*'
+        assert fts_query("  ...  ") is None
+
+    def test_search_across_types(self, diag_setup):
+        k, storage = diag_setup
+        self._seed(k, storage)
+        index = SearchIndex()
+        hits, next_cursor = index.search(k, "fox")
+        assert {hit["type"] for hit in hits} == {"raw", "episode", "belief", "goal"}
+        assert next_cursor is None
+        raw_hit = next(hit for hit in hits if hit["type"] == "raw")
+        assert "[fox]" in raw_hit["snippet"]
+        assert [hit["rank"] for hit in hits] == sorted(hit["rank"] for hit in hits)
+
+    def test_type_filter_and_prefix(self, diag_setup):
+        k, storage = diag_setup
+        self._seed(k, storage)
+        hits, _ = SearchIndex().search(k, "bir", types=["note"])
+        assert [hit["type"] for hit in hits] == ["note"]
+
+    def test_pagination(self, diag_setup):
+        k, storage = diag_setup
+        self._seed(k, storage)
+        index = SearchIndex()
+        everything, _ = index.search(k, "fox")
+        seen, cursor = [], None
+        while True:
+            hits, cursor = index.search(k, "fox", limit=1, cursor=cursor)
+            seen += hits
+            if cursor is None:
+                break
+        assert [hit["id"] for hit in seen] == [hit["id"] for hit in everything]
+
+    def test_incremental_sync(self, diag_setup):
+        k, storage = diag_setup
+        self._seed(k, storage)
+        index = SearchIndex()
+        assert index.sync(k) > 0
+        assert index.sync(k) == 0  # unchanged stack costs nothing
+        k.note("a fresh note about otters")
+        assert index.sync(k) >= 1
+        hits, _ = index.search(k, "otters")
+        assert len(hits) == 1
+        raw_id = index.search(k, "quick")[0][0]["id"]
+        storage.delete_raw(raw_id)
+        assert index.search(k, "quick") == ([], None)
+
+    def test_invalid_cursor(self, diag_setup):
+        k, _ = diag_setup
+        with pytest.raises(InvalidCursor):
+            SearchIndex().search(k, "fox", cursor=encode_cursor(1.0, "not-a-rowid"))
+
+    def test_builds_in_batches(self, diag_setup):
+        k, storage = diag_setup
+        self._seed(k, storage)
+        for i in range(5):
+            k.raw(f"walrus number {i}")
+        index = SearchIndex(batch_size=2)
+        hits, _ = index.search(k, "walrus")
+        assert len(hits) == 5
+        assert index.documents == 10
+
+    def test_index_persists(self, diag_setup, monkeypatch):
+        k, storage = diag_setup
+        monkeypatch.setattr(search_module, "SYNC_SLACK", 0)
+        self._seed(k, storage)
+        path = index_path(k)
+        assert path == storage.db_path.parent / "test_diag.search" / "test_agent.db"
+        index = SearchIndex(path)
+        index.sync(k)
+        documents = index.documents
+        index.close()
+
+        reopened = SearchIndex(path)
+        assert reopened.built
+        assert reopened.documents == documents
+        # Only rows written since the index was last synced are read again
+        k.note("otters hold hands")
+        assert reopened.sync(k) == 1
+        assert len(reopened.search(k, "otters")[0]) == 1
+        assert len(reopened.search(k, "fox")[0]) == 4
+        reopened.close()
+
+    def test_search_while_first_build_runs(self, diag_setup):
+        k, storage = diag_setup
+        self._seed(k, storage)
+        index = SearchIndex()
+        release = threading.Event()
+        sync_source = index._sync_source
+
+        def slow_sync_source(*args):
+            release.wait(5)
+            return sync_source(*args)
+
+        with patch.object(index, "_sync_source", side_effect=slow_sync_source):
+            with pytest.raises(IndexBuilding):
+                index.search(k, "fox", wait=0.05)
+            assert index.syncing
+            release.set()
+            hits, _ = index.search(k, "fox", wait=5)
+        assert len(hits) == 4
+        index.close()
+
+    def test_close_stops_build(self, diag_setup):
+        k, _ = diag_setup
+        for i in range(20):
+            k.raw(f"entry {i}")
+        index = SearchIndex(batch_size=1)
+        started = threading.Event()
+        add = index._add
+
+        def slow_add(*args):
+            started.set()
+            time.sleep(0.01)
+            return add(*args)
+
+        with patch.object(index, "_add", side_effect=slow_add):
+            index.start_sync(k)
+            started.wait(5)
+            index.close()
+        assert not index.syncing
+        assert not index.built
+
+
+class TestSearchEndpoint:
+    """Tests for /api/search."""
+
+    def test_search(self, diag_setup):
+        k, _ = diag_setup
+        k.raw("searchable walrus entry")
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, "/api/search?q=walrus&types=raw")
+            assert status == 200
+            page = json.loads(body)
+            assert len(page["items"]) == 1
+            assert page["items"][0]["type"] == "raw"
+            assert page["next_cursor"] is None
+
+    def test_unknown_type_is_400(self, diag_setup):
+        k, _ = diag_setup
+        with serve(k) as (base, _):
+            status, _, _ = fetch(base, "/api/search?q=x&types=drive")
+            assert status == 400
+
+    def test_empty_query(self, diag_setup):
+        k, _ = diag_setup
+        with serve(k) as (base, _):
+            _, _, body = fetch(base, "/api/search?q=")
+            assert json.loads(body) == {"items": [], "next_cursor": None}
+
+    def test_indexing_is_503_until_built(self, diag_setup):
+        k, _ = diag_setup
+        k.raw("searchable walrus entry")
+        with serve(k) as (base, server):
+            index = server.default_stack.search_index
+            release = threading.Event()
+            sync_source = index._sync_source
+
+            def slow_sync_source(*args):
+                release.wait(5)
+                return sync_source(*args)
+
+            with patch.object(index, "_sync_source", side_effect=slow_sync_source):
+                with patch.object(search_module, "SYNC_WAIT", 0.05):
+                    status, _, body = fetch(base, "/api/search?q=walrus")
+                assert status == 503
+                assert json.loads(body)["indexing"] is True
+                release.set()
+                index._thread.join(5)
+            status, _, body = fetch(base, "/api/search?q=walrus")
+            assert status == 200
+            assert len(json.loads(body)["items"]) == 1
+
+
+class TestProvenanceGraph:
+    """Tests for batched provenance traversal."""
+
+    def _chain(self, k, storage, fanout=3):
+        raw_id = k.raw("source material")
+        episodes = [
+            k.episode(f"objective {i}", "outcome", derived_from=[f"raw:{raw_id}"])
+            for i in range(fanout)
+        ]
+        for i, episode_id in enumerate(episodes):
+            storage.save_belief(
+                Belief(
+                    id=f"b-{i}",
+                    stack_id="test_agent",
+                    statement=f"belief {i}",
+                    derived_from=[f"episode:{episode_id}", "context:ignored"],
+                )
+            )
+        return raw_id, episodes
+
+    def test_down_one_query_per_level(self, diag_setup):
+        from kernle_devtools.dashboard import provenance
+
+        k, storage = diag_setup
+        raw_id, episodes = self._chain(k, storage)
+        with patch.object(
+            provenance, "derived_children", wraps=provenance.derived_children
+        ) as step:
+            graph = provenance.provenance_graph(k, "raw", raw_id, depth=5)
+        # Levels 1 and 2 find nodes, level 3 finds none and ends the walk
+        assert step.call_count == 3
+        depths = {node["key"]: node["depth"] for node in graph["nodes"]}
+        assert depths[f"raw:{raw_id}"] == 0
+        assert all(depths[f"episode:{e}"] == 1 for e in episodes)
+        assert all(depths[f"belief:b-{i}"] == 2 for i in range(3))
+        assert len(graph["edges"]) == 6
+        assert not graph["truncated"]
+
+    def test_up_from_belief(self, diag_setup):
+        from kernle_devtools.dashboard.provenance import provenance_graph
+
+        k, storage = diag_setup
+        raw_id, episodes = self._chain(k, storage, fanout=1)
+        graph = provenance_graph(k, "belief", "b-0", direction="up")
+        assert [(n["key"], n["depth"]) for n in graph["nodes"]] == [
+            (f"raw:{raw_id}", -2),
+            (f"episode:{episodes[0]}", -1),
+            ("belief:b-0", 0),
+        ]
+        assert {"from": f"raw:{raw_id}", "to": f"episode:{episodes[0]}"} in graph["edges"]
+
+    def test_up_stops_at_deleted_memory(self, diag_setup):
+        from kernle_devtools.dashboard.provenance import provenance_graph
+
+        k, storage = diag_setup
+        raw_id, episodes = self._chain(k, storage, fanout=1)
+        with storage._connect() as conn:
+            conn.execute("UPDATE episodes SET deleted = 1 WHERE id = ?", (episodes[0],))
+        graph = provenance_graph(k, "belief", "b-0", direction="up")
+        keys = {node["key"] for node in graph["nodes"]}
+        assert f"raw:{raw_id}" not in keys
+        assert {"from": f"raw:{raw_id}", "to": f"episode:{episodes[0]}"} not in graph["edges"]
+
+    def test_node_cap(self, diag_setup):
+        from kernle_devtools.dashboard.provenance import provenance_graph
+
+        k, storage = diag_setup
+        raw_id, _ = self._chain(k, storage)
+        graph = provenance_graph(k, "raw", raw_id, max_nodes=3)
+        assert len(graph["nodes"]) == 3
+        assert graph["truncated"]
+        keys = {node["key"] for node in graph["nodes"]}
+        assert all(edge["from"] in keys and edge["to"] in keys for edge in graph["edges"])
+
+    def test_missing_node(self, diag_setup):
+        from kernle_devtools.dashboard.provenance import provenance_graph
+
+        k, _ = diag_setup
+        graph = provenance_graph(k, "belief", "nope", direction="both")
+        assert graph["nodes"] == [
+            {
+                "key": "belief:nope",
+                "type": "belief",
+                "id": "nope",
+                "depth": 0,
+                "label": None,
+                "missing": True,
+            }
+        ]
+
+    def test_endpoint(self, diag_setup):
+        k, _ = diag_setup
+        raw_id = k.raw("root")
+        k.episode("child", "outcome", derived_from=[f"raw:{raw_id}"])
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, f"/api/provenance-graph/raw/{raw_id}?depth=2")
+            assert status == 200
+            assert len(json.loads(body)["edges"]) == 1
+            status, _, _ = fetch(base, f"/api/provenance-graph/raw/{raw_id}?direction=sideways")
+            assert status == 400
+
+    def test_endpoint_needs_sqlite(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_audit_log.return_value = [{"id": "audit-1"}]
+        with serve(k) as (base, _):
+            status, _, _ = fetch(base, "/api/provenance-graph/raw/x")
+            assert status == 501
+
+
+class TestProvenanceCounts:
+    """Tests for bulk derivation counts."""
+
+    def test_counts_for_page(self, diag_setup):
+        from kernle_devtools.dashboard.provenance import derivation_counts
+
+        k, storage = diag_setup
+        raw_ids = [k.raw(f"entry {i}") for i in range(3)]
+        episode_id = k.episode("obj", "out", derived_from=[f"raw:{raw_ids[0]}"])
+        storage.save_belief(
+            Belief(
+                id="b-1",
+                stack_id="test_agent",
+                statement="belief",
+                derived_from=[f"raw:{raw_ids[0]}", f"raw:{raw_ids[1]}"],
+            )
+        )
+        with patch.object(storage, "_connect", wraps=storage._connect) as connect:
+            counts = derivation_counts(k, "raw", raw_ids)
+        assert connect.call_count == 1
+        assert counts[raw_ids[0]]["count"] == 2
+        assert {"type": "episode", "id": episode_id} in counts[raw_ids[0]]["targets"]
+        assert counts[raw_ids[1]] == {"count": 1, "targets": [{"type": "belief", "id": "b-1"}]}
+        assert counts[raw_ids[2]] == {"count": 0, "targets": []}
+
+    def test_endpoint(self, diag_setup):
+        k, _ = diag_setup
+        raw_id = k.raw("root")
+        k.episode("child", "outcome", derived_from=[f"raw:{raw_id}"])
+        with serve(k) as (base, _):
+            status, _, body = fetch(base, f"/api/provenance-counts/raw?ids={raw_id},missing")
+            assert status == 200
+            data = json.loads(body)
+            assert data[raw_id]["count"] == 1
+            assert data["missing"]["count"] == 0
+            status, _, _ = fetch(base, "/api/provenance-counts/bogus?ids=x")
+            assert status == 400
+            too_many = ",".join(str(i) for i in range(1001))
+            status, _, _ = fetch(base, f"/api/provenance-counts/raw?ids={too_many}")
+            assert status == 400
+
+
+class TestAnxietyRefresher:
+    """Tests for the stale-while-revalidate anxiety report."""
+
+    def test_timed_report_per_dimension(self, diag_setup):
+        from kernle_devtools.dashboard.anxiety import timed_anxiety_report
+
+        k, _ = diag_setup
+        report, timings = timed_anxiety_report(k)
+        assert set(report["dimensions"]) <= set(timings)
+        assert {"recommendations", "other"} <= set(timings)
+        # Wrappers are removed again
+        assert "_get_aging_raw_entries" not in vars(k)
+
+    def test_dimension_timing_on_own_kernle(self, diag_setup):
+        from kernle_devtools.dashboard.anxiety import AnxietyRefresher
+
+        k, _ = diag_setup
+        refresher = AnxietyRefresher(ThreadLocalKernle(k))
+        try:
+            _, freshness = refresher.get(k, timeout=10)
+        finally:
+            refresher.stop()
+        assert "recommendations" in freshness["dimension_ms"]
+
+    def test_shared_kernle_is_not_wrapped(self, diag_setup):
+        from kernle_devtools.dashboard.anxiety import DIMENSION_SOURCES, AnxietyRefresher
+
+        k, _ = diag_setup
+        compute = k.get_anxiety_report
+        wrapped = []
+
+        def checked(detailed=True):
+            wrapped.extend(name for name in DIMENSION_SOURCES if name in vars(k))
+            return compute(detailed=detailed)
+
+        refresher = AnxietyRefresher(ThreadLocalKernle(k, factory=lambda: k))
+        try:
+            with patch.object(k, "get_anxiety_report", side_effect=checked):
+                report, freshness = refresher.get(k, timeout=10)
+        finally:
+            refresher.stop()
+        assert "dimensions" in report
+        assert wrapped == []
+        assert freshness["dimension_ms"] == {}
+
+    def test_serves_stale_while_recomputing(self):
+        from kernle_devtools.dashboard import anxiety
+
+        release = threading.Event()
+        reports = iter([{"overall_score": 1}, {"overall_score": 2}])
+
+        def compute(detailed=True):
+            report = next(reports)
+            if report["overall_score"] == 2:
+                release.wait(5)
+            return report
+
+        k = MagicMock(stack_id="s1")
+        k.get_anxiety_report.side_effect = compute
+        refresher = anxiety.AnxietyRefresher(ThreadLocalKernle(k, factory=lambda: k))
+        version = ["v1"]
+        with patch.object(anxiety, "stack_version", side_effect=lambda _: version[0]):
+            try:
+                report, freshness = refresher.get(k)
+                assert report == {"overall_score": 1}
+                assert not freshness["stale"]
+
+                version[0] = "v2"
+                results = []
+                readers = [
+                    threading.Thread(target=lambda: results.append(refresher.get(k)))
+                    for _ in range(5)
+                ]
+                for t in readers:
+                    t.start()
+                for t in readers:
+                    t.join(5)
+                assert [r for r, _ in results] == [{"overall_score": 1}] * 5
+                assert all(f["stale"] and f["refreshing"] for _, f in results)
+
+                release.set()
+                wait_for(lambda: refresher.computations == 2)
+                report, freshness = refresher.get(k)
+                assert report == {"overall_score": 2}
+                assert not freshness["refreshing"]
+                assert k.get_anxiety_report.call_count == 2
+            finally:
+                release.set()
+                refresher.stop()
+
+    def test_first_failure_raises_then_retries(self):
+        from kernle_devtools.dashboard.anxiety import AnxietyRefresher
+
+        k = MagicMock(stack_id="s1")
+        k.get_anxiety_report.side_effect = [RuntimeError("boom"), {"overall_score": 3}]
+        refresher = AnxietyRefresher(ThreadLocalKernle(k, factory=lambda: k))
+        try:
+            with pytest.raises(RuntimeError, match="boom"):
+                refresher.get(k)
+            assert refresher.get(k)[0] == {"overall_score": 3}
+        finally:
+            refresher.stop()
+
+    def test_endpoint_reports_freshness(self):
+        k = MagicMock(stack_id="s1")
+        k.stack.get_audit_log.return_value = [{"id": "audit-1"}]
+        k.get_anxiety_report.return_value = {"overall_score": 7}
+        with serve(k) as (base, _):
+            _, headers, body = fetch(base, "/api/anxiety")
+            data = json.loads(body)
+            assert data["overall_score"] == 7
+            assert {"computed_at", "age_seconds", "dimension_ms"} <= set(data["freshness"])
+            assert "X-Cache" not in headers
+            fetch(base, "/api/anxiety")
+            assert k.get_anxiety_report.call_count == 1
+            _, _, metrics = fetch(base, "/metrics")
+            assert 'kernle_dashboard_anxiety_seconds_count{dimension="total"} 1' in metrics.decode()
+
+
+class TestMultiStack:
+    """Tests for serving several stacks from one dashboard."""
+
+    def _other_stack(self, storage, stack_id="other_agent", raws=2):
+        other = Kernle(
+            stack_id=stack_id,
+            storage=SQLiteStorage(stack_id=stack_id, db_path=storage.db_path),
+            strict=False,
+        )
+        for i in range(raws):
+            other.raw(f"{stack_id} entry {i}")
+        return other
+
+    def test_split_stack_path(self):
+        from kernle_devtools.dashboard.stacks import split_stack_path
+
+        assert split_stack_path("/api/stats") == (None, "/api/stats")
+        assert split_stack_path("/s/a%20b/api/stats") == ("a b", "/api/stats")
+        assert split_stack_path("/s/agent") == ("agent", "")
+        assert split_stack_path("/s/") == (None, "/s/")
+
+    def test_fleet_stats_match_get_stats(self, diag_setup):
+        from kernle_devtools.dashboard.stacks import fleet_stats
+
+        k, storage = diag_setup
+        k.raw("mine")
+        other = self._other_stack(storage)
+        stats = fleet_stats(storage, ["test_agent", "other_agent", "empty"])
+        assert stats["test_agent"] == k.stack.get_stats()
+        assert stats["other_agent"] == other.stack.get_stats()
+        assert set(stats["empty"].values()) == {0}
+
+    def test_pool_lru_and_leases(self, diag_setup):
+        from kernle_devtools.dashboard.stacks import StackPool
+
+        k, storage = diag_setup
+        self._other_stack(storage, "a", raws=1)
+        self._other_stack(storage, "b", raws=1)
+        pool = StackPool(k, max_stacks=1)
+        try:
+            assert pool.acquire("missing") is None
+            a = pool.acquire("a")
+            assert pool.acquire("a") is a
+            assert a.handles.get().stack_id == "a"
+            b = pool.acquire("b")
+            # Both leased, so neither is closed yet
+            assert pool.open_stack_ids() == ["a", "b"]
+            pool.release(a)
+            pool.release(a)
+            assert pool.open_stack_ids() == ["b"]
+            assert pool.evictions == 1
+            pool.release(b)
+            pool.idle_seconds = 0
+            pool.close_idle()
+            assert pool.open_stack_ids() == []
+        finally:
+            pool.close()
+
+    def test_serves_stacks_by_prefix(self, diag_setup):
+        k, storage = diag_setup
+        k.raw("mine")
+        self._other_stack(storage)
+        with serve(k, max_stacks=4) as (base, server):
+            _, _, body = fetch(base, "/api/stats")
+            assert json.loads(body)["raw"] == 1
+            _, _, body = fetch(base, "/s/other_agent/api/stats")
+            assert json.loads(body)["raw"] == 2
+            _, _, body = fetch(base, "/s/other_agent/api/raw?fields=blob")
+            assert all(e["blob"].startswith("other_agent") for e in json.loads(body))
+            status, headers, _ = fetch(base, "/s/other_agent/")
+            assert status == 200
+            assert headers["Content-Type"].startswith("text/html")
+            status, _, _ = fetch(base, "/s/nobody/api/stats")
+            assert status == 404
+
+            _, _, body = fetch(base, "/s/other_agent/api/stacks")
+            info = json.loads(body)
+            assert info["multi_stack"]
+            assert info["current"] == "other_agent"
+            assert info["stacks"] == ["other_agent", "test_agent"]
+
+            _, _, body = fetch(base, "/api/fleet")
+            fleet = {row["stack_id"]: row["stats"]["raw"] for row in json.loads(body)}
+            assert fleet == {"other_agent": 2, "test_agent": 1}
+            assert server.stacks.open_stack_ids() == ["other_agent"]
+
+    def test_disabled_by_default(self, diag_setup):
+        k, storage = diag_setup
+        self._other_stack(storage)
+        with serve(k) as (base, _):
+            status, _, _ = fetch(base, "/s/other_agent/api/stats")
+            assert status == 404
+            _, _, body = fetch(base, "/api/stacks")
+            assert json.loads(body)["multi_stack"] is False
+            status, _, _ = fetch(base, "/api/fleet")
+            assert status == 404
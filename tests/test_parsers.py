@@ -2,7 +2,14 @@
 
 import argparse
 
-from kernle_devtools.parsers import add_dashboard_parser, add_session_parsers
+import pytest
+
+from kernle_devtools.parsers import (
+    add_dashboard_parser,
+    add_export_parser,
+    add_fleet_parser,
+    add_session_parsers,
+)
 
 
 class TestDashboardParser:
@@ -16,6 +23,8 @@ class TestDashboardParser:
         assert args.port == 8420
         assert args.host == "127.0.0.1"
         assert args.no_open is False
+        assert args.workers == 8
+        assert args.max_stacks == 16
 
     def test_dashboard_parser_custom(self):
         parent = argparse.ArgumentParser()
@@ -26,6 +35,48 @@ class TestDashboardParser:
         assert args.host == "0.0.0.0"
         assert args.no_open is True
 
+    def test_dashboard_parser_workers(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_dashboard_parser(sub)
+        args = parent.parse_args(["dashboard", "--workers", "16"])
+        assert args.workers == 16
+
+    def test_dashboard_parser_max_stacks(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_dashboard_parser(sub)
+        args = parent.parse_args(["dashboard", "--max-stacks", "0"])
+        assert args.max_stacks == 0
+
+
+class TestExportParser:
+    """Tests for export parser builder."""
+
+    def test_export_parser_defaults(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_export_parser(sub)
+        args = parent.parse_args(["export"])
+        assert args.format == "ndjson"
+        assert args.types is None
+        assert args.output == "-"
+        assert args.gzip is False
+        assert args.batch_size == 1000
+
+    def test_export_parser_custom(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_export_parser(sub)
+        args = parent.parse_args(
+            ["export", "-f", "csv", "-t", "raw,belief", "-o", "out.csv", "-z", "--batch-size", "50"]
+        )
+        assert args.format == "csv"
+        assert args.types == "raw,belief"
+        assert args.output == "out.csv"
+        assert args.gzip is True
+        assert args.batch_size == 50
+
 
 class TestSessionParsers:
     """Tests for session/report parser builders."""
@@ -48,6 +99,32 @@ class TestSessionParsers:
         assert args.access == "full"
         assert args.json is True
 
+    def test_session_start_jobs(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_session_parsers(sub)
+        assert parent.parse_args(["session", "start"]).jobs == 5
+        args = parent.parse_args(["session", "start", "--jobs", "2"])
+        assert args.jobs == 2
+
+    def test_session_start_incremental(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_session_parsers(sub)
+        assert parent.parse_args(["session", "start"]).incremental is False
+        assert parent.parse_args(["session", "start", "-i"]).incremental is True
+        assert parent.parse_args(["session", "start", "--incremental"]).incremental is True
+
+    def test_session_start_format(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_session_parsers(sub)
+        assert parent.parse_args(["session", "start"]).format is None
+        args = parent.parse_args(["session", "start", "--format", "ndjson"])
+        assert args.format == "ndjson"
+        with pytest.raises(SystemExit):
+            parent.parse_args(["session", "start", "--format", "xml"])
+
     def test_session_list(self):
         parent = argparse.ArgumentParser()
         sub = parent.add_subparsers(dest="command")
@@ -56,6 +133,29 @@ class TestSessionParsers:
         assert args.session_action == "list"
         assert args.json is True
 
+    def test_session_watch_defaults(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_session_parsers(sub)
+        args = parent.parse_args(["session", "watch"])
+        assert args.session_action == "watch"
+        assert args.interval == "15m"
+        assert args.jitter == 0.1
+        assert args.jobs == 1
+        assert args.full is False
+
+    def test_session_watch_custom(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_session_parsers(sub)
+        args = parent.parse_args(
+            ["session", "watch", "--interval", "2h", "--jitter", "0", "--jobs", "3", "--full"]
+        )
+        assert args.interval == "2h"
+        assert args.jitter == 0.0
+        assert args.jobs == 3
+        assert args.full is True
+
     def test_report_parser(self):
         parent = argparse.ArgumentParser()
         sub = parent.add_subparsers(dest="command")
@@ -63,3 +163,53 @@ class TestSessionParsers:
         args = parent.parse_args(["report", "latest", "-j"])
         assert args.session_id == "latest"
         assert args.json is True
+
+    def test_report_format(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_session_parsers(sub)
+        args = parent.parse_args(["report", "latest", "--format", "ndjson"])
+        assert args.format == "ndjson"
+
+
+class TestFleetParser:
+    """Tests for the fleet parser builder."""
+
+    def test_fleet_doctor_defaults(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_fleet_parser(sub)
+        args = parent.parse_args(["fleet", "doctor", "--all"])
+        assert args.fleet_action == "doctor"
+        assert args.all is True
+        assert args.stacks_from is None
+        assert args.db is None
+        assert args.workers is None
+        assert args.timeout == 300
+        assert args.jobs == 1
+        assert args.incremental is False
+        assert args.json is False
+
+    def test_fleet_doctor_custom(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_fleet_parser(sub)
+        args = parent.parse_args(
+            ["fleet", "doctor", "--stacks-from", "stacks.txt", "--workers", "4", "--timeout", "30"]
+            + ["-i", "-j"]
+        )
+        assert args.stacks_from == "stacks.txt"
+        assert args.all is False
+        assert args.workers == 4
+        assert args.timeout == 30.0
+        assert args.incremental is True
+        assert args.json is True
+
+    def test_fleet_doctor_needs_one_source(self):
+        parent = argparse.ArgumentParser()
+        sub = parent.add_subparsers(dest="command")
+        add_fleet_parser(sub)
+        with pytest.raises(SystemExit):
+            parent.parse_args(["fleet", "doctor"])
+        with pytest.raises(SystemExit):
+            parent.parse_args(["fleet", "doctor", "--all", "--stacks-from", "stacks.txt"])